@@ -8,7 +8,7 @@ The tool TaskCoach is a freely available time tracker and task manager (https://
 """
 
 __author__ = "emm"
-__version__ = "20220206"  # "20200607"
+__version__ = "20261019"  # "20220206" "20200607"
 
 
 import argparse
@@ -16,27 +16,50 @@ from enum import Enum
 import logging
 import os
 import sys
+from typing import List, Union
 from tcm_utils.__init__ import logger
-from tcm_utils import task_cleaner, task_summary
-from tcm_utils.task_utils import IO
+from tcm_utils import task_checker, task_cleaner, task_compactor, task_diff, task_fingerprint, task_index, \
+    task_partial, task_splitter
+from tcm_utils.task_utils import CLEANER_ENGINE, HEATMAP_RESOLUTION, IO, PERIOD, NoEffortError, TaskFileError
 
 
 class MODUS(Enum):
     CLEANER = "cleaner"
     CSV_SUMMARY = "csv_summary"
     XLSX_SUMMARY = "xlsx_summary"
+    DIFF = "diff"
+    CHECK = "check"
+    PARTIAL = "partial"
+    MERGE = "merge"
+    HEATMAP = "heatmap"
+    FINGERPRINT = "fingerprint"
+    COMPACT = "compact"
+    SPLIT = "split"
+    INDEX = "index"
+    SEARCH = "search"
 
 
 def get_arguments(args):
     
     parser = argparse.ArgumentParser(description="This TaskCoach-manager makes the use of TaskCoach more convenient.")
-    parser.add_argument("input_fn",
-                        help="Input filename with file extension .tsk.")
+    parser.add_argument("input_fn", nargs="+",
+                        help=f"Input filename with file extension .tsk; "
+                             f"in modus '{MODUS.MERGE.value}' one or more partial aggregates with file extension .json; "
+                             f"in modus '{MODUS.INDEX.value}' one or more .tsk files; "
+                             f"in modus '{MODUS.SEARCH.value}' the index with file extension .json.")
     parser.add_argument("-o", "--output_fn",
                         help=f"Output filename. "
-                             f"This should have the file extension '.tsk' in modus '{MODUS.CLEANER.value}', "
+                             f"This should have the file extension '.tsk' in modi "
+                             f"'{MODUS.CLEANER.value}'/'{MODUS.COMPACT.value}', "
                              f"and the file extension '.csv'/'.xlsx' in modi "
-                             f"'{MODUS.CSV_SUMMARY.value}'/'{MODUS.XLSX_SUMMARY.value}' respectively. "
+                             f"'{MODUS.CSV_SUMMARY.value}'/'{MODUS.XLSX_SUMMARY.value}' respectively, "
+                             f"and the file extension '.csv' in modus '{MODUS.DIFF.value}', "
+                             f"and the file extension '.json' in modus '{MODUS.PARTIAL.value}', "
+                             f"and one of the file extensions '.json'/'.csv'/'.xlsx' in modus '{MODUS.MERGE.value}', "
+                             f"and one of the file extensions '.csv'/'.xlsx' in modus '{MODUS.HEATMAP.value}', "
+                             f"and the file extension '.json' in modi "
+                             f"'{MODUS.FINGERPRINT.value}'/'{MODUS.SPLIT.value}'/'{MODUS.INDEX.value}', "
+                             f"and the file extension '.csv' in modus '{MODUS.SEARCH.value}' (only written if given). "
                              f"If not given, the outputs will be automatically saved in the folder of the input file "
                              f"with the expected file extension.")
     modus = parser.add_mutually_exclusive_group(required=True)
@@ -50,17 +73,166 @@ def get_arguments(args):
     modus.add_argument("-x", "--xlsx", action="store_true", dest="xlsx_summary",
                        help="Summary modus with xlsx output: "
                             "a table-formatted per-day summary on the efforts will be extracted")
+    modus.add_argument("--diff", metavar="OLD_INPUT_FN", dest="diff_fn",
+                       help="Diff modus with csv output: the given older .tsk file is compared with the input file; "
+                            "added, removed and modified tasks, efforts and categories, and the effort minute "
+                            "deltas per task and category will be reported. "
+                            "Usage: --diff <old_fn.tsk> <new_fn.tsk>")
+    modus.add_argument("-k", "--check", action="store_true", dest="check",
+                       help="Check modus: the .tsk file is validated in a single pass without building any summary "
+                            "(running timers, negative durations, efforts over multiple days, overlapping efforts, "
+                            "missing categories, duplicate ids, non-empty effort tags); the exit code is "
+                            "0 if no issue, 1 if only warnings and 2 if errors were found (e.g. for pre-commit hooks).")
+    modus.add_argument("-p", "--partial", action="store_true", dest="partial",
+                       help="Partial aggregate modus with json output: the tracked time per day x task x category, "
+                            "the start and stop time per day and the effort ids will be extracted; "
+                            "the partial aggregates of many task-files can be merged in the merge modus.")
+    modus.add_argument("--merge", action="store_true", dest="merge",
+                       help="Merge modus: the given partial aggregates are merged (each effort is counted once) "
+                            "into a partial aggregate (.json output) or into a summary (.csv/.xlsx output).")
+    modus.add_argument("-t", "--heatmap", action="store_true", dest="heatmap",
+                       help="Heatmap modus with csv (default) or xlsx output: the tracked minutes per weekday and "
+                            "hour (or minute, see --resolution) of the day will be extracted for all efforts and "
+                            "for each category.")
+    modus.add_argument("-f", "--fingerprint", action="store_true", dest="fingerprint",
+                       help="Fingerprint modus: Merkle-style fingerprints of all task and category subtrees are "
+                            "written into a sidecar index (.json); if the sidecar index already exists, the changed "
+                            "subtrees since its computation are reported.")
+    modus.add_argument("--compact", action="store_true", dest="compact",
+                       help="Compaction modus: for each task and day before the cutoff day (see --cutoff), the "
+                            "efforts are replaced with one effort of the same tracked minutes, so the task-file "
+                            "shrinks, but the summary totals are kept.")
+    modus.add_argument("--split", action="store_true", dest="split",
+                       help="Split modus: the .tsk file is split into partitions per period (see --period), each "
+                            "with the task tree, the categories and the efforts of its period, and a manifest "
+                            "(.json) of the partitions is written.")
+    modus.add_argument("--index", action="store_true", dest="index",
+                       help="Index modus: the tokens of the task subjects, descriptions and category names of the "
+                            "given .tsk files are indexed (with the effort totals of the tasks) into an index (.json) "
+                            "next to the files; an existing index is updated with the new or changed files only.")
+    modus.add_argument("--search", metavar="QUERY", dest="search_query",
+                       help="Search modus: the tasks matching all words of the query (e.g. a ticket id) are looked "
+                            "up in the given index (.json) and reported with their effort totals over all indexed "
+                            "files, without reading the .tsk files. Usage: --search <query> <index_fn.json>")
+    parser.add_argument("-a", "--archive", nargs="?", const=True, metavar="ARCHIVE_FN",
+                        help=f"Only in modus '{MODUS.CLEANER.value}': the removed done tasks and efforts are "
+                             f"written into an archive .tsk file in the same pass. If no filename is given, "
+                             f"the archive will be saved in the folder of the input file.")
+    parser.add_argument("-e", "--engine", choices=[engine.value for engine in CLEANER_ENGINE],
+                        default=CLEANER_ENGINE.LINES.value,
+                        help=f"Only in modus '{MODUS.CLEANER.value}': the cleaner engine. "
+                             f"'{CLEANER_ENGINE.LINES.value}' (default) assumes each tag on a separate line, "
+                             f"'{CLEANER_ENGINE.EVENTS.value}' streams the xml events with bounded memory and handles "
+                             f"any tag layout (e.g. multi-line tags), "
+                             f"'{CLEANER_ENGINE.RANGES.value}' copies the unchanged byte ranges of the input file "
+                             f"(keeping its layout) and rewrites only the changed ones.")
+    parser.add_argument("-r", "--resolution", choices=[resolution.value for resolution in HEATMAP_RESOLUTION],
+                        default=HEATMAP_RESOLUTION.HOUR.value,
+                        help=f"Only in modus '{MODUS.HEATMAP.value}': the bin size of the time of the day.")
+    parser.add_argument("--out", type=parse_output_formats, metavar="FORMATS",
+                        help=f"Only in the summary modi: comma-separated output formats, e.g. 'csv,xlsx,parquet'; "
+                             f"the summary is computed once and written in each format (with the file name of the "
+                             f"output filename and the extension of the format). The format 'parquet' needs pyarrow.")
+    parser.add_argument("-m", "--memory_cap", type=float, metavar="MB",
+                        help=f"Only in the summary modi: build the summary out-of-core, i.e. the efforts are "
+                             f"partitioned per day and spilled into temporary files as soon as the buffered efforts "
+                             f"exceed the given memory cap in MB (e.g. for multi-year task-files).")
+    parser.add_argument("-l", "--description_length", type=int, metavar="N",
+                        help=f"Only in the summary modi: truncate the task descriptions to N characters "
+                             f"(0: no descriptions).")
+    parser.add_argument("-j", "--jobs", type=int, default=1, metavar="N",
+                        help=f"Only in the summary modi: build the daily timelines with N processes "
+                             f"(e.g. for task-files of long periods).")
+    parser.add_argument("--depth", type=int, metavar="N",
+                        help=f"Only in the summary modi: summarize the tasks up to level N of the task hierarchy "
+                             f"(0: top-level tasks); the efforts of deeper subtasks are rolled up into their ancestor "
+                             f"on level N, with one row per category type (e.g. the not working time of a subtask "
+                             f"stays in a NO-WORK row of its ancestor).")
+    parser.add_argument("--cutoff", metavar="YYYY-MM-DD",
+                        help=f"Only in modus '{MODUS.COMPACT.value}': the efforts started before this day are "
+                             f"compacted (default: {task_compactor.DEFAULT_CUTOFF_DAYS} days ago).")
+    parser.add_argument("--short", type=int, default=15, metavar="N", dest="short_effort_minutes",
+                        help=f"Only in the summary modi: efforts shorter than N minutes are counted as short efforts "
+                             f"in the daily metrics (default: %(default)s).")
+    parser.add_argument("--period", choices=[period.value for period in PERIOD], default=PERIOD.WEEK.value,
+                        help=f"Only in modus '{MODUS.SPLIT.value}': the period of the partitions "
+                             f"(default: '%(default)s', i.e. ISO weeks).")
     parser.add_argument("-d", "--debug", action="store_true",
                         help="for printing debugging information")
     return parser.parse_args(args)
 
 
-def main_cleaner(input_fn: str, output_fn: str) -> None:
-    task_cleaner.clean_tasks(input_fn, output_fn)
+def parse_output_formats(output_formats: str) -> List[str]:
+    """
+    :param output_formats: comma-separated output formats, e.g. 'csv,xlsx'
+    :return: file extensions of the output formats, without duplicates, e.g. ['.csv', '.xlsx']
+    :raise argparse.ArgumentTypeError: if an output format is unknown
+    """
+    
+    # the summary sinks (task_summary.OUTPUT_SINKS) are not imported here, so that the modi without summary don't
+    # load pandas; there is a sink for each IO extension
+    known_formats = [io.value[1:] for io in IO]
+    formats = list(dict.fromkeys(output_format.strip().lower() for output_format in output_formats.split(",")))
+    unknown_formats = [output_format for output_format in formats if output_format not in known_formats]
+    if unknown_formats:
+        raise argparse.ArgumentTypeError(f"unknown output formats {unknown_formats}, known formats: {known_formats}")
+    return ["." + output_format for output_format in formats]
+
+
+def main_cleaner(input_fn: str, output_fn: str, archive: bool, archive_fn: str, engine: str) -> None:
+    task_cleaner.clean_tasks(input_fn, output_fn, archive=archive, archive_task_xml_fn=archive_fn, engine=engine)
+
+
+def main_summary(input_fn: str, output_fn: str, extensions: Union[str, List[str]], memory_cap: float = None,
+                 description_length: int = None, jobs: int = 1, depth: int = None,
+                 short_effort_minutes: int = 15) -> None:
+    # imported here, so that the modi without summary (e.g. check) don't load pandas
+    from tcm_utils import task_summary
+    task_summary.summarize_tasks(input_fn, output_fn, extensions, memory_cap=memory_cap,
+                                 description_length=description_length, jobs=jobs, depth=depth,
+                                 short_effort_minutes=short_effort_minutes)
+
+
+def main_diff(old_input_fn: str, input_fn: str, output_fn: str) -> None:
+    task_diff.diff_tasks(old_input_fn, input_fn, output_fn)
+
+
+def main_partial(input_fn: str, output_fn: str) -> None:
+    task_partial.aggregate_tasks(input_fn, output_fn)
+
+
+def main_merge(input_fns: List[str], output_fn: str) -> None:
+    task_partial.merge_partials(input_fns, output_fn)
+
 
+def main_heatmap(input_fn: str, output_fn: str, resolution: str) -> None:
+    # imported here, so that the modi without summary (e.g. check) don't load pandas
+    from tcm_utils import task_heatmap
+    task_heatmap.heatmap_tasks(input_fn, output_fn, resolution)
 
-def main_summary(input_fn: str, output_fn: str, extension:str) -> None:
-    task_summary.summarize_tasks(input_fn, output_fn, extension)
+
+def main_fingerprint(input_fn: str, output_fn: str) -> None:
+    task_fingerprint.fingerprint_tasks(input_fn, output_fn)
+
+
+def main_compact(input_fn: str, output_fn: str, cutoff_day: str) -> None:
+    task_compactor.compact_tasks(input_fn, output_fn, cutoff_day)
+
+
+def main_split(input_fn: str, output_fn: str, period_type: str) -> None:
+    task_splitter.split_tasks(input_fn, output_fn, period_type)
+
+
+def main_index(input_fns: List[str], output_fn: str) -> None:
+    task_index.index_tasks(input_fns, output_fn)
+
+
+def main_search(query: str, index_fn: str, output_fn: str) -> None:
+    task_index.search_tasks(index_fn, query, output_fn)
+
+
+def main_check(input_fn: str) -> int:
+    return task_checker.check_tasks(input_fn)
 
 
 if __name__ == "__main__":
@@ -73,20 +245,73 @@ if __name__ == "__main__":
     cleaner = arguments.cleaner
     csv_summary = arguments.summary
     xlsx_summary = arguments.xlsx_summary
-    input_fn = arguments.input_fn
+    diff_fn = arguments.diff_fn
+    check = arguments.check
+    archive = arguments.archive is not None
+    archive_fn = arguments.archive if isinstance(arguments.archive, str) else None
+    partial = arguments.partial
+    merge = arguments.merge
+    heatmap = arguments.heatmap
+    fingerprint = arguments.fingerprint
+    compact = arguments.compact
+    split = arguments.split
+    index = arguments.index
+    search_query = arguments.search_query
+    input_fns = arguments.input_fn
+    input_fn = input_fns[0]
+    if len(input_fns) > 1 and not (merge or index):
+        sys.exit(f"Several input files are only processed in the modi '{MODUS.MERGE.value}' and '{MODUS.INDEX.value}'.")
     
     output_fn = None
     if arguments.output_fn:
         output_fn = arguments.output_fn
-        if os.path.realpath(output_fn) == os.path.realpath(input_fn):
+    real_input_fns = [os.path.realpath(fn) for fn in input_fns + [diff_fn] if fn]
+    for fn in [output_fn, archive_fn]:
+        if fn and os.path.realpath(fn) in real_input_fns:
             msg = f"The outputs would overwrite the input file '{input_fn}'!\n" \
                   f"Please take another file name for the outputs."
             sys.exit(msg)
+    if archive and not cleaner:
+        sys.exit(f"The archive is only written in modus '{MODUS.CLEANER.value}'.")
+    
+    summary_extensions = IO.CSV_EXTENSION.value if csv_summary else IO.XLSX_EXTENSION.value
+    if arguments.out:
+        if not (csv_summary or xlsx_summary):
+            sys.exit(f"The output formats are only given in the modi "
+                     f"'{MODUS.CSV_SUMMARY.value}' and '{MODUS.XLSX_SUMMARY.value}'.")
+        summary_extensions = arguments.out
+    if arguments.depth is not None and arguments.depth < 0:
+        sys.exit("The depth of the task hierarchy should be 0 or more.")
     
-    if cleaner:
-        main_cleaner(input_fn, output_fn)
-    elif csv_summary:
-        main_summary(input_fn, output_fn, IO.CSV_EXTENSION.value)
-    elif xlsx_summary:
-        main_summary(input_fn, output_fn, IO.XLSX_EXTENSION.value)
-        
+    try:
+        if cleaner:
+            main_cleaner(input_fn, output_fn, archive, archive_fn, arguments.engine)
+        elif csv_summary or xlsx_summary:
+            main_summary(input_fn, output_fn, summary_extensions, arguments.memory_cap,
+                         arguments.description_length, arguments.jobs, arguments.depth,
+                         arguments.short_effort_minutes)
+        elif diff_fn:
+            main_diff(diff_fn, input_fn, output_fn)
+        elif partial:
+            main_partial(input_fn, output_fn)
+        elif merge:
+            main_merge(input_fns, output_fn)
+        elif heatmap:
+            main_heatmap(input_fn, output_fn, arguments.resolution)
+        elif fingerprint:
+            main_fingerprint(input_fn, output_fn)
+        elif compact:
+            main_compact(input_fn, output_fn, arguments.cutoff)
+        elif split:
+            main_split(input_fn, output_fn, arguments.period)
+        elif index:
+            main_index(input_fns, output_fn)
+        elif search_query is not None:
+            main_search(search_query, input_fn, output_fn)
+        elif check:
+            sys.exit(main_check(input_fn))
+    except NoEffortError as e:
+        sys.exit(logger.warning(f"{e} -> quit."))
+    except (TaskFileError, ImportError) as e:
+        logger.error(e)
+        sys.exit(1)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+"""
+This script validates a task-file in a single streaming pass, without building any summary structures.
+- Running timers (efforts without a stop time).
+- Negative effort durations.
+- Efforts over multiple days.
+- Overlapping efforts.
+- Tasks with efforts, but without any category.
+- Duplicate ids.
+- Non-empty effort tags (the cleaner expects empty effort tags).
+
+NOTE:
+- pandas is not needed (and not imported) here, so the check is fast enough to be run on every save.
+- like in the summary, the overlaps are checked per day: efforts over midnight are split into the days they span (see
+  task_days).
+- the returned exit codes are defined in task_utils.CHECK.
+"""
+
+__author__ = "emm"
+__version__ = "20261019"
+
+
+from datetime import datetime
+from typing import Dict, List, Tuple
+import xml.etree.ElementTree as ET
+
+from tcm_utils.__init__ import logger
+from tcm_utils.task_days import format_offset, get_day_names, split_efforts_by_day, to_seconds
+from tcm_utils.task_utils import CHECK, FORMAT
+
+# typing aliases
+ISSUE = Tuple[CHECK, str]
+EFFORT_INTERVAL = Tuple[str, str, str]  # start, stop, task subject
+DAY_INTERVAL = Tuple[int, int, str]  # begin and end second from the begin of the day, task subject
+
+
+def check_tasks(input_task_xml_fn: str) -> int:
+
+    logger.info(f"CHECKING '{input_task_xml_fn}'")
+    issues = __collect_issues(input_task_xml_fn)
+
+    for severity, message in issues:
+        if severity == CHECK.ERROR:
+            logger.error(message)
+        else:
+            logger.warning(message)
+
+    exit_code = max([severity.value for severity, _ in issues], default=CHECK.OK.value)
+    logger.info(f"DONE. {sum(1 for severity, _ in issues if severity == CHECK.ERROR)} errors, "
+                f"{sum(1 for severity, _ in issues if severity == CHECK.WARNING)} warnings found "
+                f"(exit code {exit_code}).")
+    return exit_code
+
+
+def __collect_issues(input_fn: str) -> List[ISSUE]:
+
+    issues = []
+    seen_ids = set()
+    task_stack = []  # (task id, task subject) of the currently open task elements
+    tasks_with_effort = {}  # task id : task subject
+    categorized_task_ids = set()
+    effort_intervals = []  # (start, stop, task subject)
+
+    try:
+        for event, element in ET.iterparse(input_fn, events=("start", "end")):
+            if event == "start":
+                element_id = element.get(FORMAT.ID.value)
+                if element_id is not None:
+                    if element_id in seen_ids:
+                        issues.append((CHECK.ERROR, f"Duplicate id '{element_id}' in a '{element.tag}' element."))
+                    seen_ids.add(element_id)
+
+                if element.tag == FORMAT.TASK.value:
+                    task_stack.append((element_id, element.get(FORMAT.SUBJECT.value, "")))
+                elif element.tag == FORMAT.CATEGORY.value:
+                    categorized_task_ids.update(element.get(FORMAT.CATEGORIZABLES.value, "").split())
+                continue
+
+            if element.tag == FORMAT.TASK.value:
+                task_stack.pop()
+            elif element.tag == FORMAT.EFFORT.value:
+                task_id, task_subject = task_stack[-1] if task_stack else (None, "")
+                tasks_with_effort[task_id] = task_subject
+                if len(element) or (element.text and element.text.strip()):
+                    issues.append((CHECK.ERROR, f"Effort '{element.get(FORMAT.ID.value)}' of task '{task_subject}' "
+                                                f"is not an empty tag, the cleaner would reject it."))
+                issues.extend(__check_effort(element.get(FORMAT.START.value), element.get(FORMAT.STOP.value),
+                                             task_subject, effort_intervals))
+            # the elements are not needed any more
+            element.clear()
+
+    except ET.ParseError as e:
+        issues.append((CHECK.ERROR, f"NOT ASSUMED xml FORMAT: {e}"))
+
+    for task_id, task_subject in tasks_with_effort.items():
+        if task_id not in categorized_task_ids:
+            issues.append((CHECK.WARNING, f"Task '{task_subject}' {task_id} with efforts has no category."))
+
+    for day, day_intervals in sorted(__get_intervals_per_day(effort_intervals).items()):
+        issues.extend(__check_overlaps(day, day_intervals))
+
+    return issues
+
+
+def __check_effort(start_val: str, stop_val: str, task_subject: str,
+                   effort_intervals: List[EFFORT_INTERVAL]) -> List[ISSUE]:
+
+    if start_val is None:
+        return [(CHECK.ERROR, f"An effort of task '{task_subject}' does not have a start time.")]
+    if stop_val is None:
+        return [(CHECK.ERROR, f"An effort of task '{task_subject}' (started {start_val}) does not have a stop time. "
+                              f"Make sure you are not currently running the time tracker.")]
+    try:
+        start = datetime.fromisoformat(start_val)
+        stop = datetime.fromisoformat(stop_val)
+    except ValueError:
+        return [(CHECK.ERROR, f"NOT ASSUMED effort time FORMAT for task '{task_subject}': {start_val} -> {stop_val}")]
+
+    if stop < start:
+        return [(CHECK.ERROR, f"Negative duration for task '{task_subject}': {start_val} -> {stop_val}")]
+
+    issues = []
+    if start.date() != stop.date():
+        issues.append((CHECK.WARNING, f"Effort done over multiple days for task '{task_subject}' "
+                                      f"({start_val} -> {stop_val})."))
+    effort_intervals.append((start_val, stop_val, task_subject))
+
+    return issues
+
+
+def __get_intervals_per_day(effort_intervals: List[EFFORT_INTERVAL]) -> Dict[str, List[DAY_INTERVAL]]:
+    """
+    :return: {day: [(begin second, end second, task subject)]} of the pieces of the efforts in each day they span
+    """
+
+    if not effort_intervals:
+        return {}
+    start_vals, stop_vals, task_subjects = zip(*effort_intervals)
+    effort_indices, days, begin_offsets, end_offsets = split_efforts_by_day(to_seconds(start_vals),
+                                                                            to_seconds(stop_vals))
+    intervals_per_day = {}
+    for effort_idx, day, begin_offset, end_offset in zip(effort_indices.tolist(), get_day_names(days).tolist(),
+                                                          begin_offsets.tolist(), end_offsets.tolist()):
+        intervals_per_day.setdefault(day, []).append((begin_offset, end_offset, task_subjects[effort_idx]))
+
+    return intervals_per_day
+
+
+def __check_overlaps(day: str, day_intervals: List[DAY_INTERVAL]) -> List[ISSUE]:
+
+    # the latest end is kept for comparison with the following efforts
+    issues = []
+    tracked_end = None
+    tracked_task = None
+    for begin_offset, end_offset, task_subject in sorted(day_intervals):
+        if tracked_end is not None and begin_offset < tracked_end:
+            clash_end = min(end_offset, tracked_end)
+            # durations under one minute are discarded like in the summary
+            minutes = (clash_end - begin_offset) // 60
+            if minutes > 0:
+                issues.append((CHECK.WARNING, f"On {day}, {minutes} minutes are tracked multiple times "
+                                              f"({format_offset(begin_offset)}-{format_offset(clash_end)}) "
+                                              f"for tasks '{tracked_task}' and '{task_subject}'."))
+        if tracked_end is None or end_offset > tracked_end:
+            tracked_end = end_offset
+            tracked_task = task_subject
+
+    return issues
@@ -4,53 +4,549 @@
 This script prepares the task-file from the previous week for being used in the current week.
 - Delete done items.
 - Clear timer.
+- Optionally archive the deleted items and efforts into another task-file.
+
+NOTE:
+- there are three cleaner engines (task_utils.CLEANER_ENGINE): the line-based one assumes each tag on a separate line,
+  the xml event-based one streams the task-file with any tag layout and with bounded memory, and the byte-range one
+  copies the unchanged byte ranges of the task-file and rewrites only the task tags (keeping the layout). The outputs
+  of the engines are identical, except that the byte-range one keeps the whitespace at the begin and end of the lines.
 """
 
 
 __author__ = "emm"
-__version__ = "20220206"  # "20200621" "20200217"
+__version__ = "20261019"  # "20220206" "20200621" "20200217"
 
 
+import mmap
 import os
 import re
-import sys
-from typing import List, Tuple, Union
+from typing import BinaryIO, Dict, List, TextIO, Tuple, Union
+import xml.parsers.expat
+import xml.sax
+from xml.sax.handler import ContentHandler, LexicalHandler, property_lexical_handler
+from xml.sax.saxutils import escape
 
 from tcm_utils.__init__ import logger
-from tcm_utils.task_utils import FORMAT, SPECIAL_CATEGORIES
+from tcm_utils.task_utils import CLEANER_ENGINE, FORMAT, SPECIAL_CATEGORIES, FileExtensionError, TaskFormatError
 
-# typing aliases
-LINES_WITH_AMOUNT_OF_CHANGES = Tuple[List[str], int]
 TSK_EXTENSION = ".tsk"
 OUTPUT_EXTENSION = "_cleaned" + TSK_EXTENSION
+ARCHIVE_EXTENSION = "_archived" + TSK_EXTENSION
+DONE_STATUS_ATTRIBUTES = [FORMAT.PERCENTAGE_COMPLETE.value, FORMAT.COMPLETION_DATE.value,
+                          FORMAT.ACTUALSTART_DATE.value]
+# byte-range engine: the scanned tokens (task and effort tags; comments and CDATA sections are skipped) ...
+TASK_NAME = FORMAT.TASK.value.encode()
+ATTRIBUTES = rb'(?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|\'[^\']*\'))*'
+TOKEN_PATTERN = re.compile(rb'<(?:(?P<name>task|effort)(?P<attributes>' + ATTRIBUTES + rb')\s*(?P<empty>/?)>'
+                           rb'|/(?P<end_name>task|effort)\s*>|!--.*?-->|!\[CDATA\[.*?\]\]>)', re.DOTALL)
+CATEGORY_TAG_PATTERN = re.compile(rb'<category(?P<attributes>' + ATTRIBUTES + rb')\s*/?>')
+ATTRIBUTE_PATTERN = re.compile(rb'(?P<attribute>[^\s=]+)\s*=\s*(?:"(?P<value>[^"]*)"|\'(?P<value2>[^\']*)\')')
+# ... and the 'done' status of a task tag
+DONE_PATTERN = re.compile(rb'\s' + FORMAT.PERCENTAGE_COMPLETE.value.encode() + rb'\s*=\s*["\']'
+                          + FORMAT.DONE_VALUE.value.encode() + rb'["\']')
+
+
+def clean_tasks(input_task_xml_fn: str, output_task_xml_fn: Union[str, None],
+                archive: bool = False, archive_task_xml_fn: Union[str, None] = None,
+                engine: str = CLEANER_ENGINE.LINES.value) -> None:
+    
+    msg = f"The output file name extension should be '{TSK_EXTENSION}'."
+    for fn in [output_task_xml_fn, archive_task_xml_fn]:
+        if not (fn is None or fn.endswith(TSK_EXTENSION)):
+            raise FileExtensionError(msg)
+    
+    if output_task_xml_fn is None:
+        output_task_xml_fn = os.path.splitext(input_task_xml_fn)[0] + OUTPUT_EXTENSION
+    if archive and archive_task_xml_fn is None:
+        archive_task_xml_fn = os.path.splitext(input_task_xml_fn)[0] + ARCHIVE_EXTENSION
+    for fn in [output_task_xml_fn, archive_task_xml_fn]:
+        if fn is not None:
+            os.makedirs(os.path.realpath(os.path.dirname(fn)), exist_ok=True)
+    
+    # clear done tasks and efforts, and archive the removed ones in the same pass
+    if engine == CLEANER_ENGINE.RANGES.value:
+        logger.info("COPYING unchanged byte ranges from '{}'.".format(input_task_xml_fn))
+        found_done_tasks, found_efforts = clean_ranges(input_task_xml_fn, output_task_xml_fn,
+                                                       archive_task_xml_fn if archive else None)
+    else:
+        with open(output_task_xml_fn, "w", encoding="utf-8") as cleaned_f:
+            archive_f = open(archive_task_xml_fn, "w", encoding="utf-8") if archive else None
+            try:
+                if engine == CLEANER_ENGINE.EVENTS.value:
+                    logger.info("STREAMING xml events from '{}'.".format(input_task_xml_fn))
+                    found_done_tasks, found_efforts = clean_events(input_task_xml_fn, cleaned_f, archive_f)
+                else:
+                    lines = __read_lines(input_task_xml_fn)
+                    logger.info("READ {} lines from '{}'.".format(len(lines), input_task_xml_fn))
+                    found_done_tasks, found_efforts = clean_lines(lines, cleaned_f, archive_f)
+            finally:
+                if archive_f is not None:
+                    archive_f.close()
+    logger.info("- cleared {} done tasks".format(found_done_tasks))
+    logger.info("- cleared {} efforts additionally".format(found_efforts))
+    
+    logger.info("DONE. SEE cleared tasks in '{}'.".format(output_task_xml_fn))
+    if archive:
+        logger.info("SEE removed tasks and efforts in '{}'.".format(archive_task_xml_fn))
 
 
-def clean_tasks(input_task_xml_fn: str, output_task_xml_fn: Union[str, None]) -> None:
+def clean_lines(lines: List[str], cleaned_f: TextIO, archive_f: Union[TextIO, None] = None) -> Tuple[int, int]:
+    """
+    Clean the lines of a task-file into the given file objects (e.g. also io.StringIO objects).
     
-    msg = f"The output file name extension should be '{TSK_EXTENSION}'."
-    if not (output_task_xml_fn is None or output_task_xml_fn.endswith(TSK_EXTENSION)):
-        logger.error(msg)
-        sys.exit(1)
+    :return: amount of the done tasks, amount of the removed efforts (besides the efforts of the done tasks)
+    :raise TaskFormatError: if the lines have not the assumed format
+    """
+    
+    # get task ids with recurring category
+    recurring_task_ids = __get_task_ids_with_recurrent_category(lines, SPECIAL_CATEGORIES.RECURRING.value) or []
     
-    lines = __read_lines(input_task_xml_fn)
-    logger.info("READ {} lines from '{}'.".format(len(lines), input_task_xml_fn))
+    return __clean_lines(lines, recurring_task_ids, cleaned_f, archive_f)
 
-    # clear done tasks
-    cleared_lines, found_done_tasks = __remove_done_tasks(lines)
-    logger.info("- cleared {} done tasks".format(found_done_tasks))
 
-    # clear done efforts
-    cleared_lines, found_efforts = __remove_efforts(cleared_lines)
-    logger.info("- cleared {} efforts additionally".format(found_efforts))
+def clean_events(input_task_xml_fn: str, cleaned_f: TextIO, archive_f: Union[TextIO, None] = None) -> Tuple[int, int]:
+    """
+    Clean a task-file into the given file objects with an xml event-based parser.
     
-    if output_task_xml_fn is None:
-        output_task_xml_fn = os.path.splitext(input_task_xml_fn)[0] + OUTPUT_EXTENSION
-    else:
-        output_path = os.path.realpath(os.path.dirname(output_task_xml_fn))
-        os.makedirs(output_path, exist_ok=True)
+    The task-file is read in two streaming passes (the recurring category is usually stored after the tasks) and the
+    outputs are written incrementally, so the memory is bounded independently of the file size.
+    
+    :return: amount of the done tasks, amount of the removed efforts (besides the efforts of the done tasks)
+    :raise TaskFormatError: if the task-file is not a well-formed xml file
+    """
+    
+    recurring_task_ids = __get_task_ids_with_recurrent_category_streaming(input_task_xml_fn,
+                                                                          SPECIAL_CATEGORIES.RECURRING.value)
+    handler = CleaningHandler(recurring_task_ids, cleaned_f, archive_f)
+    parser = xml.sax.make_parser()
+    parser.setContentHandler(handler)
+    parser.setProperty(property_lexical_handler, handler)
+    try:
+        parser.parse(input_task_xml_fn)
+    except xml.sax.SAXParseException as e:
+        raise TaskFormatError(f"NOT ASSUMED xml FORMAT: {e}") from e
+    
+    return handler.done_tasks, handler.efforts
+
+
+class CleaningHandler(ContentHandler, LexicalHandler):
+    """
+    SAX handler writing the cleaned task-file -- and the archive of the removed tasks and efforts -- while parsing.
+    
+    The cleaned task-file is the task-file without
+    - done tasks, together with their subtasks and efforts (recurring done tasks lose only their 'done' status);
+    - efforts of the not done tasks;
+    - 'done' and 'already started' marks of the remaining tasks.
+    
+    The archive contains the removed tasks and efforts embedded into their parent tasks and the elements outside of
+    the tasks (e.g. the categories).
+    """
+    
+    def __init__(self, recurring_task_ids, cleaned_f: TextIO, archive_f: Union[TextIO, None] = None):
+        super().__init__()
+        self.recurring_task_ids = set(recurring_task_ids)
+        self.cleaned = TaskFileWriter(cleaned_f, rewritten_names=[FORMAT.TASK.value])
+        self.archive = TaskFileWriter(archive_f) if archive_f else None
+        self.done_tasks = 0
+        self.efforts = 0
+        self._depth = 0
+        self._removed_depth = 0  # > 0 inside of a removed done task or effort
+        self._open_tasks = []  # [name, attributes, already archived] of the currently open (not removed) tasks
+        self._pending_text = ""  # written before the next tag, when it is known whether it is only whitespace
+    
+    def startDocument(self):
+        self.cleaned.startDocument()
+        if self.archive:
+            self.archive.startDocument()
+    
+    def endDocument(self):
+        self._flush_text()
+        for generator in [self.cleaned, self.archive]:
+            if generator:
+                generator.ignorableWhitespace(FORMAT.NL.value)
+                generator.endDocument()
+    
+    def processingInstruction(self, target, data):
+        self._write_markup("processingInstruction", target, data)
+    
+    def comment(self, content):
+        self._write_markup("comment", content)
+    
+    def startElement(self, name, attrs):
+        self._depth += 1
+        if self._depth == 1:
+            # the whitespace outside of the root element is not reported: TaskCoach's blank line of the prolog
+            for generator in [self.cleaned, self.archive]:
+                if generator:
+                    generator.ignorableWhitespace(FORMAT.NL.value * 2)
         
-    write_lines(cleared_lines, output_task_xml_fn)
-    logger.info("DONE. SEE cleared tasks in '{}'.".format(output_task_xml_fn))
+        if self._removed_depth > 0:
+            self._removed_depth += 1
+            self.archive and self.archive.startElement(name, attrs)
+            return
+        
+        self._flush_text()
+        if name == FORMAT.TASK.value and attrs.get(FORMAT.PERCENTAGE_COMPLETE.value) == FORMAT.DONE_VALUE.value:
+            self.done_tasks += 1
+            if attrs.get(FORMAT.ID.value) not in self.recurring_task_ids:
+                self._start_removed_element(name, attrs)
+                return
+        elif name == FORMAT.EFFORT.value:
+            self.efforts += 1
+            self._start_removed_element(name, attrs)
+            return
+        
+        if name == FORMAT.TASK.value:
+            self._open_tasks.append([name, attrs, False])
+            attrs = {att: val for att, val in attrs.items() if att not in DONE_STATUS_ATTRIBUTES}
+        elif not self._open_tasks and self.archive:
+            self.archive.startElement(name, attrs)
+        self.cleaned.startElement(name, attrs)
+    
+    def endElement(self, name):
+        self._depth -= 1
+        
+        if self._removed_depth > 0:
+            self._removed_depth -= 1
+            self.archive and self.archive.endElement(name)
+            return
+        
+        self._flush_text()
+        self.cleaned.endElement(name)
+        if name == FORMAT.TASK.value:
+            if self._open_tasks.pop()[2]:
+                self.archive.endElement(name)
+        elif not self._open_tasks and self.archive:
+            self.archive.endElement(name)
+    
+    def characters(self, content):
+        if self._removed_depth > 0:
+            self.archive and self.archive.characters(content)
+        else:
+            self._pending_text += content
+    
+    def ignorableWhitespace(self, whitespace):
+        self.characters(whitespace)
+    
+    def _flush_text(self):
+        if not self._pending_text:
+            return
+        if self._pending_text.isspace():
+            # the line breaks between the tags: only the blank lines outside of the tasks are archived
+            self.cleaned.ignorableWhitespace(self._pending_text)
+            if self.archive:
+                self.archive.ignorableWhitespace(self._pending_text, keep_blank_lines=not self._open_tasks)
+        else:
+            self.cleaned.characters(self._pending_text)
+            if not self._open_tasks and self.archive:
+                self.archive.characters(self._pending_text)
+        self._pending_text = ""
+    
+    def _write_markup(self, method, *args):
+        # the processing instructions and comments are kept (and archived) like the elements at their position
+        if self._removed_depth > 0:
+            self.archive and getattr(self.archive, method)(*args)
+            return
+        self._flush_text()
+        for generator in [self.cleaned] + ([self.archive] if self.archive and not self._open_tasks else []):
+            getattr(generator, method)(*args)
+            if self._depth == 0:
+                generator.ignorableWhitespace(FORMAT.NL.value)
+    
+    def _start_removed_element(self, name, attrs):
+        self._removed_depth = 1
+        if self.archive:
+            for open_task in self._open_tasks:
+                if not open_task[2]:
+                    self.archive.startElement(open_task[0], open_task[1])
+                    self.archive.ignorableWhitespace(FORMAT.NL.value)
+                    open_task[2] = True
+            self.archive.startElement(name, attrs)
+
+
+class TaskFileWriter:
+    """
+    Serializes the xml events of a task-file line by line like the line-based engine: the tags with their attributes
+    in the given order, empty elements as '<x ... />' (as written by TaskCoach), the tags named in rewritten_names as
+    the line-based engine rewrites them ('<task ... >'), and the lines stripped of their indentation.
+    
+    The whitespace between two tags ends the line of the first tag -- only if this tag was written -- and keeps the
+    blank lines (optionally), so the removed tags leave no empty lines like in the line-based engine.
+    """
+    
+    ATTRIBUTE_ENTITIES = {'"': "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#09;"}
+    
+    def __init__(self, output_f: TextIO, rewritten_names=()):
+        self.output_f = output_f
+        self.rewritten_names = set(rewritten_names)
+        self._open_start_tag = None  # name of the last start tag, if it can still become an empty element
+        self._text = ""  # character data, stripped per line when the next tag is written
+        self._line_open = False  # something is written in the current line
+    
+    def startDocument(self):
+        self._write('<?xml version="1.0" encoding="utf-8"?>' + FORMAT.NL.value)
+    
+    def endDocument(self):
+        self._flush()
+        self.output_f.flush()
+    
+    def processingInstruction(self, target, data):
+        self._flush()
+        self._write(f"<?{target} {data}?>")
+    
+    def comment(self, content):
+        self._flush()
+        self._write(f"<!--{content}-->")
+    
+    def startElement(self, name, attrs):
+        self._flush()
+        self._write(FORMAT.TAG_MARK_OPENING.value + name + "".join(
+            f' {att}="{escape(val, self.ATTRIBUTE_ENTITIES)}"' for att, val in attrs.items()))
+        self._open_start_tag = name
+    
+    def endElement(self, name):
+        if self._open_start_tag == name and not self._text:
+            self._write(FORMAT.SPACE.value + FORMAT.TAG_EMPTY_END.value)
+            self._open_start_tag = None
+            return
+        self._flush()
+        self._write(f"</{name}>")
+    
+    def characters(self, content):
+        self._close_start_tag()
+        self._text += content
+    
+    def ignorableWhitespace(self, whitespace, keep_blank_lines=True):
+        self._flush()
+        line_breaks = whitespace.count(FORMAT.NL.value)
+        if line_breaks == 0:
+            self._write(whitespace)
+            return
+        if self._line_open:
+            self._write(FORMAT.NL.value)
+        if keep_blank_lines:
+            self._write(FORMAT.NL.value * (line_breaks - 1))
+    
+    def _flush(self):
+        self._close_start_tag()
+        if self._text:
+            lines = self._text.split(FORMAT.NL.value)
+            if len(lines) > 1:
+                lines = [lines[0].rstrip()] + [line.strip() for line in lines[1:-1]] + [lines[-1].lstrip()]
+            if not self._line_open:
+                lines[0] = lines[0].lstrip()
+            self._text = ""
+            self._write(escape(FORMAT.NL.value.join(lines)))
+    
+    def _close_start_tag(self):
+        if self._open_start_tag is not None:
+            if self._open_start_tag in self.rewritten_names:
+                self._write(FORMAT.SPACE.value)
+            self._write(FORMAT.TAG_MARK_CLOSING.value)
+            self._open_start_tag = None
+    
+    def _write(self, data: str):
+        if data:
+            self.output_f.write(data)
+            self._line_open = not data.endswith(FORMAT.NL.value)
+
+
+def clean_ranges(input_task_xml_fn: str, output_task_xml_fn: str,
+                 archive_task_xml_fn: Union[str, None] = None) -> Tuple[int, int]:
+    """
+    Clean a task-file by copying the unchanged byte ranges of the input file directly into the output file(s).
+    
+    The memory mapped task-file is scanned (by regular expressions) for the task and effort tags only, in order to get
+    the byte ranges to delete (done tasks, efforts) or to rewrite (task tags, formatted like by the line-based engine);
+    everything else -- including the original indentation -- is copied from the input file with
+    os.copy_file_range (or from memoryview slices of the memory map), without decoding it.
+    NOTE that the task-file is not validated as xml file.
+    
+    :return: amount of the done tasks, amount of the removed efforts (besides the efforts of the done tasks)
+    :raise TaskFormatError: if the task and effort tags are not balanced
+    """
+    
+    with open(input_task_xml_fn, "rb") as input_f, open(output_task_xml_fn, "wb", buffering=0) as cleaned_f:
+        archive_f = open(archive_task_xml_fn, "wb", buffering=0) if archive_task_xml_fn else None
+        try:
+            content = mmap.mmap(input_f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            raise TaskFormatError(f"NOT ASSUMED FORMAT: {e}") from e
+        try:
+            recurring_task_ids = __get_task_ids_with_recurrent_category_from_bytes(
+                content, SPECIAL_CATEGORIES.RECURRING.value)
+            cleaner = RangeCleaner(recurring_task_ids, content, ByteRangeWriter(input_f, content, cleaned_f),
+                                   ByteRangeWriter(input_f, content, archive_f) if archive_f else None)
+            cleaner.clean()
+        finally:
+            content.close()
+            if archive_f is not None:
+                archive_f.close()
+    
+    return cleaner.done_tasks, cleaner.efforts
+
+
+class ByteRangeWriter:
+    """
+    Writes byte ranges of an input file into an unbuffered binary output file: with os.copy_file_range (in the
+    kernel) where available, otherwise from memoryview slices of the memory mapped input file.
+    """
+    
+    def __init__(self, input_f: BinaryIO, content: mmap.mmap, output_f: BinaryIO):
+        self.input_fd = input_f.fileno()
+        self.content = content
+        self.output_f = output_f
+        self.cursor = 0  # the input is handled upto this offset
+        self.zero_copy = hasattr(os, "copy_file_range")
+    
+    def copy_until(self, offset: int) -> None:
+        self.copy_range(self.cursor, offset)
+        self.cursor = max(self.cursor, offset)
+    
+    def skip_until(self, offset: int) -> None:
+        self.cursor = max(self.cursor, offset)
+    
+    def copy_range(self, start: int, end: int) -> None:
+        while start < end and self.zero_copy:
+            try:
+                copied = os.copy_file_range(self.input_fd, self.output_f.fileno(), end - start, start)
+            except OSError:
+                # e.g. not supported by the file systems
+                self.zero_copy = False
+                break
+            if copied == 0:
+                break
+            start += copied
+        if start < end:
+            self.write(memoryview(self.content)[start:end])
+    
+    def write(self, data) -> None:
+        view = memoryview(data)
+        while view:
+            view = view[self.output_f.write(view):]
+
+
+class RangeCleaner:
+    """
+    Determines the byte ranges to delete or to rewrite in the cleaned task-file, and the byte ranges of the archive
+    (the removed tasks and efforts embedded into their parent tasks, and the content outside of the tasks).
+    """
+    
+    def __init__(self, recurring_task_ids, content: mmap.mmap, cleaned: ByteRangeWriter,
+                 archive: Union[ByteRangeWriter, None] = None):
+        self.recurring_task_ids = set(recurring_task_ids)
+        self.content = content
+        self.cleaned = cleaned
+        self.archive = archive
+        self.done_tasks = 0
+        self.efforts = 0
+        self._open_elements = []  # names of the open task and effort elements
+        self._removed_depth = 0  # > 0 inside of a removed done task or effort
+        self._removed_start = 0
+        self._open_tasks = []  # [start tag range, already archived] of the currently open (not removed) tasks
+    
+    def clean(self) -> None:
+        for token in TOKEN_PATTERN.finditer(self.content):
+            if token.group("name"):
+                self._start_element(token)
+                if token.group("empty"):
+                    self._end_element(token.group("name"), token.end(), token.end())
+            elif token.group("end_name"):
+                self._end_element(token.group("end_name"), token.start(), token.end())
+        
+        if self._open_elements:
+            raise TaskFormatError(f"NOT ASSUMED FORMAT: unclosed {self._open_elements[-1].decode()} element")
+        self.cleaned.copy_until(len(self.content))
+        if self.archive:
+            self.archive.copy_until(len(self.content))
+    
+    def _start_element(self, token) -> None:
+        name = token.group("name")
+        top_level = not self._open_elements
+        self._open_elements.append(name)
+        if self._removed_depth > 0:
+            self._removed_depth += 1
+            return
+        
+        tag_start, tag_end = token.span()
+        is_task = name == TASK_NAME
+        if is_task and top_level and self.archive:
+            # the content between the top level tasks (e.g. the categories) is archived
+            self.archive.copy_until(self._get_line_start(tag_start))
+        
+        if is_task and DONE_PATTERN.search(token.group("attributes")):
+            self.done_tasks += 1
+            if self._get_attributes(token.group("attributes")).get(FORMAT.ID.value) not in self.recurring_task_ids:
+                self._start_removed_element(tag_start)
+                return
+        elif not is_task:
+            self.efforts += 1
+            self._start_removed_element(tag_start)
+            return
+        
+        self._open_tasks.append([(self._get_line_start(tag_start), self._get_line_end(tag_end)), False])
+        # the task tags are rewritten like by the line-based engine, so the outputs are identical
+        self.cleaned.copy_until(tag_start)
+        self.cleaned.write(self._get_cleaned_task_tag(token))
+        self.cleaned.skip_until(tag_end)
+    
+    def _end_element(self, name: bytes, tag_start: int, tag_end: int) -> None:
+        if not self._open_elements or self._open_elements.pop() != name:
+            raise TaskFormatError(f"NOT ASSUMED FORMAT: unexpected end of {name.decode()} element at byte {tag_start}")
+        top_level = not self._open_elements
+        
+        if self._removed_depth > 0:
+            self._removed_depth -= 1
+            if self._removed_depth == 0:
+                removed_end = self._get_line_end(tag_end)
+                self.cleaned.copy_until(self._removed_start)
+                self.cleaned.skip_until(removed_end)
+                if self.archive:
+                    self.archive.copy_range(self._removed_start, removed_end)
+                    if top_level:
+                        self.archive.skip_until(removed_end)
+            return
+        
+        if name == TASK_NAME:
+            task_end = self._get_line_end(tag_end)
+            if self._open_tasks.pop()[1]:
+                self.archive.copy_range(self._get_line_start(tag_start), task_end)
+            if top_level and self.archive:
+                self.archive.skip_until(task_end)
+    
+    def _start_removed_element(self, tag_start: int) -> None:
+        self._removed_depth = 1
+        self._removed_start = self._get_line_start(tag_start)
+        if self.archive:
+            for open_task in self._open_tasks:
+                if not open_task[1]:
+                    self.archive.copy_range(*open_task[0])
+                    open_task[1] = True
+    
+    def _get_line_start(self, offset: int) -> int:
+        # the begin of the line, if only whitespace is before the offset in its line
+        line_start = self.content.rfind(b"\n", 0, offset) + 1
+        return line_start if not self.content[line_start:offset].strip() else offset
+    
+    def _get_line_end(self, offset: int) -> int:
+        # the begin of the next line, if only whitespace is after the offset in its line
+        line_end = self.content.find(b"\n", offset)
+        line_end = len(self.content) if line_end == -1 else line_end + 1
+        return line_end if not self.content[offset:line_end].strip() else offset
+    
+    @staticmethod
+    def _get_cleaned_task_tag(token) -> bytes:
+        attributes = [match.group("attribute") + b'="' + (match.group("value") if match.group("value") is not None
+                                                           else match.group("value2").replace(b'"', b"&quot;")) + b'"'
+                      for match in ATTRIBUTE_PATTERN.finditer(token.group("attributes"))
+                      if match.group("attribute").decode() not in DONE_STATUS_ATTRIBUTES]
+        return b" ".join([b"<" + TASK_NAME, b" ".join(attributes), b"/>" if token.group("empty") else b">"])
+    
+    @staticmethod
+    def _get_attributes(attributes: bytes) -> Dict[str, str]:
+        return {match.group("attribute").decode(): (match.group("value") or match.group("value2") or b"").decode()
+                for match in ATTRIBUTE_PATTERN.finditer(attributes)}
 
 
 def __read_lines(input_fn: str) -> List[str]:
@@ -88,19 +584,47 @@ def __get_task_ids_with_recurrent_category(lines, recurring_category):
         if line.startswith(FORMAT.CATEGORY_LINE_BEGIN.value):
             att2val_dict = __get_att2val_dict(line, FORMAT.CATEGORY.value)
             if FORMAT.SUBJECT.value not in att2val_dict or FORMAT.CATEGORIZABLES.value not in att2val_dict:
-                logger.error(f"NOT ASSUMED category line FORMAT. LINE = '{line}'")
-                sys.exit(1)
+                raise TaskFormatError(f"NOT ASSUMED category line FORMAT. LINE = '{line}'")
             subject = att2val_dict[FORMAT.SUBJECT.value]
             if subject == recurring_category:
                 return att2val_dict[FORMAT.CATEGORIZABLES.value].split()
                
 
+def __get_task_ids_with_recurrent_category_streaming(input_fn, recurring_category):
+    
+    recurrent_task_ids = set()
+    
+    def start_element(name, attributes):
+        if name == FORMAT.CATEGORY.value and attributes.get(FORMAT.SUBJECT.value) == recurring_category:
+            recurrent_task_ids.update(attributes.get(FORMAT.CATEGORIZABLES.value, "").split())
+    
+    parser = xml.parsers.expat.ParserCreate()
+    parser.StartElementHandler = start_element
+    try:
+        with open(input_fn, "rb") as f:
+            parser.ParseFile(f)
+    except xml.parsers.expat.ExpatError as e:
+        raise TaskFormatError(f"NOT ASSUMED xml FORMAT: {e}") from e
+    
+    return recurrent_task_ids
+
+
+def __get_task_ids_with_recurrent_category_from_bytes(content, recurring_category):
+    
+    recurrent_task_ids = set()
+    for tag in CATEGORY_TAG_PATTERN.finditer(content):
+        attributes = RangeCleaner._get_attributes(tag.group("attributes"))
+        if attributes.get(FORMAT.SUBJECT.value) == recurring_category:
+            recurrent_task_ids.update(attributes.get(FORMAT.CATEGORIZABLES.value, "").split())
+    
+    return recurrent_task_ids
+
+
 def __get_task_id(line):
     att2val_dict = __get_att2val_dict(line, FORMAT.TASK.value)
     
     if not FORMAT.ID.value in att2val_dict:
-        logger.error(f"NOT ASSUMED task line FORMAT. LINE = '{line}'")
-        sys.exit(1)
+        raise TaskFormatError(f"NOT ASSUMED task line FORMAT. LINE = '{line}'")
     return att2val_dict[FORMAT.ID.value]
 
 
@@ -115,8 +639,7 @@ def __get_line_start_and_end(line):
         try:
             ending_idx = line.index(FORMAT.TAG_MARK_CLOSING.value)
         except ValueError:
-            logger.error(f"NOT ASSUMED line FORMAT: '{line}'")
-            sys.exit(1)
+            raise TaskFormatError(f"NOT ASSUMED line FORMAT: '{line}'")
     line_end = line[ending_idx:]
     
     return line_start, line_end
@@ -139,81 +662,96 @@ def __remove_done_status(line):
                     line_end])
 
 
-def __remove_done_tasks(lines: List[str], recurring_category=SPECIAL_CATEGORIES.RECURRING.value) \
-        -> LINES_WITH_AMOUNT_OF_CHANGES: # List[str]:
-
-    # Stragtegy: We search for a FORMAT.PERTCENTAGE_100.value value, which is assumed to be in a task tag.
-    # then try to find the beginning and end of the current tag.
-    # We always remove only one case of "done", and continue to do changes till there is no "done" case any more.
-    IS_THERE_ANY_DONE_CASE = True
-    CHANGES = 0
-    cleared_lines = lines
+def __clean_lines(lines: List[str], recurring_task_ids: List[str], cleaned_f: TextIO,
+                  archive_f: Union[TextIO, None] = None) -> Tuple[int, int]:
+    """
+    Write the cleaned lines, and -- if an archive file is given -- the removed lines in one pass over the lines.
     
-    # get task ids with recurring category
-    recurring_task_ids = __get_task_ids_with_recurrent_category(lines, recurring_category)
-    
-    while IS_THERE_ANY_DONE_CASE == True:
-        CHANGE = False
-        for idx, line in enumerate(cleared_lines):
-            line = line.strip()
-            if FORMAT.PERCENTAGE_100.value in line:
-                CHANGES += 1
-                # check whether the task is recurring
-                task_id = __get_task_id(line)
-                # remove only the 'done' status
-                if task_id in recurring_task_ids:
-                    cleared_lines[idx] = __remove_done_status(line)
-                # remove the whole task
-                else:
-                    CHANGE = True
-                    # print("\t* candidate in {}. line: '{}'".format(idx, line))
-                    # search for the beginning and end
-                    start_idx = idx
-                    if not line.startswith(FORMAT.TASK_LINE_BEGIN.value):
-                        msg = f"PERCENTAGE ATTRIBUTE IS ASSUMED IN THE OPENING task TAG. " \
-                              f"CURRENT {idx}. LINE IS NOT EXPECTED:\n{line}"
-                        raise ValueError(msg)
-    
-                    end_idx = start_idx  # if task tag is empty
-                    if not line.endswith(FORMAT.TAG_EMPTY_END.value):
-                        # task tag is not empty -> search for the closing tag
-                        while cleared_lines[end_idx].strip() != FORMAT.TASK_TAG_CLOSING.value:
-                            #print("\t\tSEARCH FOR CLOSING: {}.: '{}'".format(end_idx, lines[end_idx]))
-                            end_idx += 1
-                            assert end_idx < len(lines)
-            if CHANGE == True:
-                # change the lines list
-                # print("\t--> get lines from {}-{}".format(start_idx, end_idx))
-                cleared_lines = cleared_lines[:start_idx] + cleared_lines[end_idx + 1:]
-                break
-
-        if CHANGE == False:
-            IS_THERE_ANY_DONE_CASE = False
-
-    return cleared_lines, CHANGES
-
-
-def __remove_efforts(lines: List[str]) -> LINES_WITH_AMOUNT_OF_CHANGES: # List[str]:
-
-    line_idx_not_relevant = []
+    The cleaned lines are the lines without
+    - done tasks (marked with FORMAT.PERCENTAGE_100.value), together with their subtasks and efforts;
+    - efforts of the not done tasks;
+    - 'done' and 'already started' marks of the remaining tasks (e.g. of the recurring tasks).
+    
+    The archive contains a valid task-file with the removed tasks and efforts. The efforts and the done tasks are
+    embedded into the (not cleaned) opening lines of their parent tasks; the lines outside of the tasks (e.g. the
+    categories) are also kept.
+    
+    :param lines: stripped lines of the task-file
+    :param recurring_task_ids: ids of the tasks which are not removed, but only their 'done' status
+    :param cleaned_f: file for the cleaned lines
+    :param archive_f: file for the removed lines (optional)
+    :return: amount of the done tasks, amount of the removed efforts (besides the efforts of the done tasks)
+    """
+    
+    def archive_line(line):
+        if archive_f is not None:
+            archive_f.write(line)
+            archive_f.write(FORMAT.NL.value)
+    
+    def archive_parent_task_lines():
+        for parent_task in parent_task_stack:
+            if not parent_task[1]:
+                archive_line(parent_task[0])
+                parent_task[1] = True
+    
+    done_tasks = 0
+    efforts = 0
+    parent_task_stack = []  # [opening line, already archived] for each currently open task
+    removed_task_depth = 0  # > 0 inside of a removed done task
     
     for idx, line in enumerate(lines):
         line = line.strip()
+        
+        # inside of a removed done task: everything is archived
+        if removed_task_depth > 0:
+            archive_line(line)
+            if line.startswith(FORMAT.TASK_LINE_BEGIN.value) and not line.endswith(FORMAT.TAG_EMPTY_END.value):
+                removed_task_depth += 1
+            elif line == FORMAT.TASK_TAG_CLOSING.value:
+                removed_task_depth -= 1
+            continue
+        
+        if FORMAT.PERCENTAGE_100.value in line:
+            done_tasks += 1
+            # remove the whole task, if it is not recurring (a recurring task loses only its 'done' status below)
+            if __get_task_id(line) not in recurring_task_ids:
+                if not line.startswith(FORMAT.TASK_LINE_BEGIN.value):
+                    msg = f"PERCENTAGE ATTRIBUTE IS ASSUMED IN THE OPENING task TAG. " \
+                          f"CURRENT {idx}. LINE IS NOT EXPECTED:\n{line}"
+                    raise TaskFormatError(msg)
+                archive_parent_task_lines()
+                archive_line(line)
+                if not line.endswith(FORMAT.TAG_EMPTY_END.value):
+                    removed_task_depth = 1
+                continue
+        
         # remove all efforts
         if line.startswith(FORMAT.EFFORT_TAG_BEGIN.value):
             if not line.endswith(FORMAT.TAG_EMPTY_END.value):
                 msg = "EFFORT TAG IS ASSUMED TO BE EMPTY. CURRENT {}. LINE HAS A NOT EXPECTED FORMAT:\n{}".format(
                     idx, line)
-                raise ValueError(msg)
-
-            line_idx_not_relevant.append(idx)
+                raise TaskFormatError(msg)
+            efforts += 1
+            archive_parent_task_lines()
+            archive_line(line)
+            continue
+        
         # remove all starting marks
-        elif line.startswith(FORMAT.TASK_LINE_BEGIN.value):
-            lines[idx] = __remove_done_status(line)
-    # change the lines list
-    cleared_lines = [line for idx, line in enumerate(lines) if idx not in line_idx_not_relevant]
-
-    return cleared_lines, len(line_idx_not_relevant)
+        if line.startswith(FORMAT.TASK_LINE_BEGIN.value):
+            if not line.endswith(FORMAT.TAG_EMPTY_END.value):
+                parent_task_stack.append([line, False])
+            line = __remove_done_status(line)
+        elif line == FORMAT.TASK_TAG_CLOSING.value:
+            if parent_task_stack.pop()[1]:
+                archive_line(line)
+        elif not parent_task_stack:
+            # e.g. categories
+            archive_line(line)
+        
+        cleaned_f.write(line)
+        cleaned_f.write(FORMAT.NL.value)
+    
+    return done_tasks, efforts
 
 
 def write_lines(lines: List[str], output_fn: str) -> None:
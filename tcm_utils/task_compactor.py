@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+
+"""
+This script compacts the efforts of a task-file, e.g. to keep TaskCoach fast with task-files of long periods.
+- For each task and day before a cutoff day with several efforts, the efforts are replaced with one synthetic effort
+  of the same tracked minutes (as counted in the summary), at the position of the first of them in the task-file.
+- The efforts since the cutoff day, and the only effort of a task and day, are kept unchanged.
+
+NOTE:
+- the summary totals per task and day are kept; the single efforts (e.g. in the daily timelines or in the heatmaps)
+  are not. The synthetic efforts of a day are laid out only in the free time of the day, i.e. between the unchanged
+  efforts (and the pieces of the efforts over midnight) of the day and the other synthetic efforts, so compacting
+  doesn't add any overlap, and not over midnight. A synthetic effort is put as close as possible to the first of its
+  efforts, and between the start and the stop of the day (starting at the start or stopping at the stop of the day,
+  if its efforts do), so that the start and the stop of each day are kept, too.
+- efforts with negative duration, without stop time or over midnight (which the summary splits into the days they
+  span) are not compacted, and neither are the efforts of a task and day if their synthetic effort doesn't fit into
+  the free time of the day.
+- the task-file is streamed twice (first for the layout of the synthetic efforts, then for writing) as xml events,
+  like in the event-based cleaner.
+"""
+
+__author__ = "emm"
+__version__ = "20261019"
+
+
+from datetime import date, datetime, timedelta, timezone
+import os
+from typing import Dict, List, TextIO, Tuple, Union
+import uuid
+import xml.etree.ElementTree as ET
+import xml.sax
+from xml.sax.handler import ContentHandler
+from xml.sax.saxutils import XMLGenerator
+
+from tcm_utils.__init__ import logger
+from tcm_utils.task_days import DAY_SECONDS, get_day_names, split_efforts_by_day, to_seconds
+from tcm_utils.task_utils import DAY, FORMAT, FileExtensionError, TaskFormatError
+
+TSK_EXTENSION = ".tsk"
+OUTPUT_EXTENSION = "_compacted" + TSK_EXTENSION
+DEFAULT_CUTOFF_DAYS = 28  # default: efforts older than four weeks are compacted
+
+# typing aliases
+# task id : day : start timestamp, seconds of the synthetic effort, amount of the compacted efforts
+LAYOUT = Dict[str, Dict[str, Tuple[int, int, int]]]
+INTERVAL = Tuple[int, int]  # start and stop timestamp
+
+
+def compact_tasks(input_task_xml_fn: str, output_task_xml_fn: Union[str, None],
+                  cutoff_day: Union[str, None] = None) -> None:
+    """
+    :param input_task_xml_fn:
+    :param output_task_xml_fn: default: in the folder of the input file
+    :param cutoff_day: efforts started before this day (YYYY-MM-DD) are compacted;
+        default: DEFAULT_CUTOFF_DAYS days ago
+    """
+
+    msg = f"The output file name extension should be '{TSK_EXTENSION}'."
+    if not (output_task_xml_fn is None or output_task_xml_fn.endswith(TSK_EXTENSION)):
+        raise FileExtensionError(msg)
+
+    if cutoff_day is None:
+        cutoff_day = (date.today() - timedelta(days=DEFAULT_CUTOFF_DAYS)).isoformat()
+    try:
+        datetime.strptime(cutoff_day + FORMAT.SPACE.value + DAY.BEGIN.value, FORMAT.DATETIME.value)
+    except ValueError as e:
+        raise TaskFormatError(f"NOT ASSUMED cutoff day FORMAT (YYYY-MM-DD): '{cutoff_day}'") from e
+
+    if output_task_xml_fn is None:
+        output_task_xml_fn = os.path.splitext(input_task_xml_fn)[0] + OUTPUT_EXTENSION
+    os.makedirs(os.path.realpath(os.path.dirname(output_task_xml_fn)), exist_ok=True)
+
+    logger.info(f"COMPACTING efforts before {cutoff_day} in '{input_task_xml_fn}'")
+    with open(output_task_xml_fn, "w", encoding="utf-8") as compacted_f:
+        compacted_efforts, synthetic_efforts = compact_events(input_task_xml_fn, compacted_f, cutoff_day)
+    logger.info(f"- compacted {compacted_efforts} efforts into {synthetic_efforts} efforts")
+
+    logger.info("DONE. SEE compacted tasks in '{}'.".format(output_task_xml_fn))
+
+
+def compact_events(input_task_xml_fn: str, compacted_f: TextIO, cutoff_day: str) -> Tuple[int, int]:
+    """
+    :return: amount of the compacted efforts, amount of the synthetic efforts replacing them
+    :raise TaskFormatError: if the task-file is not a well-formed xml file
+    """
+
+    layout = get_compaction_layout(input_task_xml_fn, cutoff_day)
+    handler = CompactingHandler(cutoff_day, layout, compacted_f)
+    try:
+        xml.sax.parse(input_task_xml_fn, handler)
+    except xml.sax.SAXParseException as e:
+        raise TaskFormatError(f"NOT ASSUMED xml FORMAT: {e}") from e
+
+    return handler.compacted_efforts, handler.synthetic_efforts
+
+
+def get_compaction_layout(input_task_xml_fn: str, cutoff_day: str) -> LAYOUT:
+    """
+    Sum up the minutes of the efforts to compact per task and day (like in the summary: in whole minutes per effort),
+    and lay out the synthetic efforts of the tasks and days with several efforts in the free time of each day (the
+    only effort of a task and day is kept where it is, like the efforts which are not compactable).
+
+    :return: {task id: {day: (start timestamp, seconds, amount of the compacted efforts) of the synthetic effort}}
+    :raise TaskFormatError: if the task-file is not a well-formed xml file
+    """
+
+    day_groups = {}  # day : task id : [minutes, [(start, stop timestamp) of the efforts]]
+    kept_vals = []  # (start, stop) of the kept efforts started before the cutoff day
+    task_stack = []  # ids of the currently open tasks
+    try:
+        for event, element in ET.iterparse(input_task_xml_fn, events=("start", "end")):
+            if element.tag == FORMAT.TASK.value:
+                if event == "start":
+                    task_stack.append(element.get(FORMAT.ID.value))
+                else:
+                    task_stack.pop()
+            elif element.tag == FORMAT.EFFORT.value and event == "end" and task_stack:
+                start_val = element.get(FORMAT.START.value)
+                stop_val = element.get(FORMAT.STOP.value)
+                if is_compactable_effort(element.attrib, cutoff_day):
+                    group = day_groups.setdefault(start_val.split(FORMAT.SPACE.value)[0], {}) \
+                        .setdefault(task_stack[-1], [0, []])
+                    group[0] += __get_effort_minutes(start_val, stop_val)
+                    group[1].append((__get_timestamp(start_val), __get_timestamp(stop_val)))
+                elif start_val is not None and stop_val is not None and start_val <= stop_val \
+                        and start_val.split(FORMAT.SPACE.value)[0] < cutoff_day:
+                    kept_vals.append((start_val, stop_val))
+            if event == "end":
+                element.clear()
+    except ET.ParseError as e:
+        raise TaskFormatError(f"NOT ASSUMED xml FORMAT: {e}") from e
+
+    kept_intervals_per_day = __get_intervals_per_day(kept_vals)
+    layout = {}
+    not_compacted = 0
+    for day, task_groups in day_groups.items():
+        kept_intervals = kept_intervals_per_day.get(day, [])
+        # the only effort of a task and day is kept
+        kept_intervals.extend(intervals[0] for _, intervals in task_groups.values() if len(intervals) == 1)
+        compacted_groups = {task_id: group for task_id, group in task_groups.items() if len(group[1]) > 1}
+        placements = __lay_out_day(__get_timestamp(day + FORMAT.SPACE.value + DAY.BEGIN.value), compacted_groups,
+                                   kept_intervals)
+        for task_id in compacted_groups.keys() - placements.keys():
+            logger.debug(f"- Efforts of {compacted_groups[task_id][0]} minutes of task {task_id} on {day} don't "
+                         f"fit into the free time of the day -> not compacted.")
+            not_compacted += 1
+        for task_id, placement in placements.items():
+            layout.setdefault(task_id, {})[day] = placement
+    if not_compacted:
+        logger.info(f"- the efforts of {not_compacted} tasks and days are kept, their synthetic effort would not fit "
+                    f"into the free time of the day")
+
+    return layout
+
+
+class CompactingHandler(ContentHandler):
+    """
+    SAX handler writing the compacted task-file while parsing.
+
+    The first effort of a task and day with a synthetic effort (see get_compaction_layout) is replaced with the
+    synthetic effort, and the further efforts of the task and day are dropped; everything else is written unchanged.
+    """
+
+    def __init__(self, cutoff_day: str, layout: LAYOUT, compacted_f: TextIO):
+        super().__init__()
+        self.cutoff_day = cutoff_day
+        self.layout = layout
+        self.compacted = XMLGenerator(compacted_f, encoding="utf-8", short_empty_elements=True)
+        self.compacted_efforts = 0
+        self.synthetic_efforts = 0
+        self._skipped_depth = 0  # > 0 inside of a replaced or dropped effort
+        self._open_tasks = []  # [task id, days with written synthetic effort] of the currently open tasks
+        self._pending_whitespace = ""  # written lazily, so that it can be dropped before a dropped effort
+
+    def startDocument(self):
+        self.compacted.startDocument()
+
+    def endDocument(self):
+        self._flush_whitespace()
+        self.compacted.ignorableWhitespace(FORMAT.NL.value)
+        self.compacted.endDocument()
+
+    def processingInstruction(self, target, data):
+        self.compacted.processingInstruction(target, data)
+        if not self._open_tasks:
+            self.compacted.ignorableWhitespace(FORMAT.NL.value)
+
+    def startElement(self, name, attrs):
+        if self._skipped_depth > 0:
+            self._skipped_depth += 1
+            return
+
+        if name == FORMAT.EFFORT.value and self._open_tasks and is_compactable_effort(attrs, self.cutoff_day):
+            task_id, synthetic_days = self._open_tasks[-1]
+            start_day = attrs[FORMAT.START.value].split(FORMAT.SPACE.value)[0]
+            placement = self.layout.get(task_id, {}).get(start_day)
+            if placement is not None:
+                self._skipped_depth = 1
+                if start_day in synthetic_days:
+                    self._pending_whitespace = ""
+                    return
+                synthetic_days.add(start_day)
+                start_ts, seconds, efforts = placement
+                self._flush_whitespace()
+                self.compacted.startElement(name, compact_day_efforts(dict(attrs), start_ts, seconds))
+                self.compacted.endElement(name)
+                self.compacted_efforts += efforts
+                self.synthetic_efforts += 1
+                return
+
+        self._flush_whitespace()
+        if name == FORMAT.TASK.value:
+            self._open_tasks.append([attrs.get(FORMAT.ID.value), set()])
+        self.compacted.startElement(name, attrs)
+
+    def endElement(self, name):
+        if self._skipped_depth > 0:
+            self._skipped_depth -= 1
+            return
+
+        if name == FORMAT.TASK.value:
+            self._open_tasks.pop()
+        self._flush_whitespace()
+        self.compacted.endElement(name)
+
+    def characters(self, content):
+        if self._skipped_depth > 0:
+            return
+        if content.isspace():
+            self._pending_whitespace += content
+            return
+        self._flush_whitespace()
+        self.compacted.characters(content)
+
+    def ignorableWhitespace(self, whitespace):
+        self.characters(whitespace)
+
+    def _flush_whitespace(self):
+        if self._pending_whitespace:
+            self.compacted.ignorableWhitespace(self._pending_whitespace)
+            self._pending_whitespace = ""
+
+
+def compact_day_efforts(first_effort: Dict[str, str], start_ts: int, seconds: int) -> Dict[str, str]:
+    """
+    :param first_effort: attributes of the first of the efforts of a task started on the same day
+    :param start_ts: start timestamp of the synthetic effort
+    :param seconds: duration of the synthetic effort (the summed minutes of the efforts)
+    :return: attributes of the synthetic effort: the attributes of the first effort with a new id and the new start and
+        stop time
+    """
+
+    synthetic_effort = dict(first_effort)
+    synthetic_effort[FORMAT.ID.value] = str(uuid.uuid1())
+    synthetic_effort[FORMAT.START.value] = datetime.fromtimestamp(start_ts, timezone.utc) \
+        .strftime(FORMAT.DATETIME.value)
+    synthetic_effort[FORMAT.STOP.value] = datetime.fromtimestamp(start_ts + seconds, timezone.utc) \
+        .strftime(FORMAT.DATETIME.value)
+
+    return synthetic_effort
+
+
+def is_compactable_effort(attrs, cutoff_day: str) -> bool:
+    """an effort with start and stop time on the same day (and no negative duration) started before the cutoff day"""
+    start_val = attrs.get(FORMAT.START.value)
+    stop_val = attrs.get(FORMAT.STOP.value)
+    if start_val is None or stop_val is None:
+        return False
+    start_day = start_val.split(FORMAT.SPACE.value)[0]
+    return start_day < cutoff_day and start_val <= stop_val and stop_val.split(FORMAT.SPACE.value)[0] == start_day
+
+
+def __get_intervals_per_day(effort_vals) -> Dict[str, List[INTERVAL]]:
+    """
+    :param effort_vals: [(start, stop)] of efforts, e.g. over midnight
+    :return: {day: [(start, stop timestamp)]} of the pieces of the efforts in each day they span
+    """
+
+    if not effort_vals:
+        return {}
+    start_vals, stop_vals = zip(*effort_vals)
+    _, days, begin_offsets, end_offsets = split_efforts_by_day(to_seconds(start_vals), to_seconds(stop_vals))
+    intervals_per_day = {}
+    for day, day_begin, begin_offset, end_offset in zip(get_day_names(days).tolist(), (days * DAY_SECONDS).tolist(),
+                                                         begin_offsets.tolist(), end_offsets.tolist()):
+        intervals_per_day.setdefault(day, []).append((day_begin + begin_offset, day_begin + end_offset))
+
+    return intervals_per_day
+
+
+def __lay_out_day(day_begin_ts: int, compacted_groups: Dict[str, list],
+                  kept_intervals: List[INTERVAL]) -> Dict[str, Tuple[int, int, int]]:
+    """
+    Place the synthetic efforts of a day one at a time (in the order of their first efforts) into the free time of
+    the day. If a synthetic effort doesn't fit, its efforts are kept, and the day is laid out again without it.
+
+    :param compacted_groups: {task id: [minutes, [(start, stop timestamp) of the efforts]]}
+    :param kept_intervals: (start, stop timestamp) of the kept efforts of the day
+    :return: {task id: (start timestamp, seconds, amount of the compacted efforts) of the synthetic effort}
+    """
+
+    # not over midnight, so that the minutes stay on their day in the summary
+    day_end_ts = day_begin_ts + DAY_SECONDS - 1
+    day_start_ts = min([start_ts for _, intervals in compacted_groups.values() for start_ts, _ in intervals]
+                       + [start_ts for start_ts, _ in kept_intervals])
+    day_stop_ts = max([stop_ts for _, intervals in compacted_groups.values() for _, stop_ts in intervals]
+                      + [stop_ts for _, stop_ts in kept_intervals])
+    groups = sorted(compacted_groups.items(), key=lambda x: min(x[1][1]))
+    not_compacted = set()
+    while True:
+        occupied = list(kept_intervals) + [interval for task_id, (_, intervals) in groups if task_id in not_compacted
+                                           for interval in intervals]
+        placements = {}
+        for task_id, (minutes, intervals) in groups:
+            if task_id in not_compacted:
+                continue
+            seconds = minutes * 60
+            first_start_ts = min(intervals)[0]
+            last_stop_ts = max(stop_ts for _, stop_ts in intervals)
+            # between the start and the stop of the day, and starting at the start (or stopping at the stop) of the
+            # day, if the efforts do, so that the start and the stop of the day are kept
+            begin_ts = day_start_ts
+            end_ts = min(day_stop_ts, day_end_ts)
+            if first_start_ts == day_start_ts:
+                end_ts = min(end_ts, day_start_ts + seconds)
+            if last_stop_ts == day_stop_ts:
+                begin_ts = max(begin_ts, day_stop_ts - seconds)
+            # as close as possible to the first effort
+            start_ts = __find_free_start(occupied, begin_ts, end_ts, seconds, first_start_ts)
+            if start_ts is None:
+                not_compacted.add(task_id)
+                break
+            placements[task_id] = (start_ts, seconds, len(intervals))
+            occupied.append((start_ts, start_ts + seconds))
+        else:
+            return placements
+
+
+def __find_free_start(occupied: List[INTERVAL], begin_ts: int, end_ts: int, seconds: int,
+                      target_ts: int) -> Union[int, None]:
+    """
+    :return: start timestamp between begin_ts and end_ts, as close as possible to target_ts, of a free interval of the
+        given seconds (not overlapping any occupied interval); None if there is no such interval
+    """
+
+    best_start_ts = None
+    gap_begin_ts = begin_ts
+    for start_ts, stop_ts in sorted(occupied) + [(end_ts, end_ts)]:
+        gap_end_ts = min(start_ts, end_ts)
+        if gap_end_ts - gap_begin_ts >= seconds:
+            candidate_ts = min(max(target_ts, gap_begin_ts), gap_end_ts - seconds)
+            if best_start_ts is None or abs(candidate_ts - target_ts) < abs(best_start_ts - target_ts):
+                best_start_ts = candidate_ts
+        gap_begin_ts = max(gap_begin_ts, stop_ts)
+
+    return best_start_ts
+
+
+def __get_effort_minutes(start_val: str, stop_val: str) -> int:
+    # like in the summary: in whole minutes per effort
+    return int(__get_timestamp(stop_val) - __get_timestamp(start_val)) // 60
+
+
+def __get_timestamp(datetime_val: str) -> int:
+    # like in the summary: the times of the task-file are taken without time zone (see task_days)
+    return int(datetime.strptime(datetime_val, FORMAT.DATETIME.value).replace(tzinfo=timezone.utc).timestamp())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+"""
+This script splits efforts into the calendar days they span (interval-to-day bucketing), e.g. for efforts over
+midnight or for timers running for days.
+- All efforts are split at once with array operations on integer timestamps (seconds since the epoch), so an effort
+  over a week is as cheap as an effort of some minutes.
+- Each piece of an effort gets its day and its begin and end second from the begin of that day (0 .. DAY_SECONDS).
+
+NOTE:
+- the times are taken as they are written in the task-file, i.e. without time zone: every day has DAY_SECONDS seconds
+  (also the days of a daylight saving time change).
+- an effort with negative duration (stop before start) is not split: it is a single piece on its start day, with its
+  negative duration.
+"""
+
+__author__ = "emm"
+__version__ = "20261019"
+
+
+from typing import Sequence, Tuple
+
+import numpy as np
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+def to_seconds(datetime_vals: Sequence[str]) -> np.ndarray:
+    """
+    :param datetime_vals: times like '2020-05-29 11:44:10'
+    :return: seconds since the epoch
+    """
+
+    return np.array(datetime_vals, dtype="datetime64[s]").astype(np.int64)
+
+
+def split_efforts_by_day(start_seconds: np.ndarray,
+                         stop_seconds: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    :param start_seconds: start of each effort in seconds since the epoch
+    :param stop_seconds: stop of each effort in seconds since the epoch
+    :return: per piece of the efforts (ordered by effort and day): index of its effort, its day (days since the epoch),
+        its begin and end second from the begin of its day
+    """
+
+    start_seconds = np.asarray(start_seconds, dtype=np.int64)
+    stop_seconds = np.asarray(stop_seconds, dtype=np.int64)
+
+    first_days = start_seconds // DAY_SECONDS
+    # an effort stopping at midnight ends on the day before
+    last_days = np.maximum((stop_seconds - 1) // DAY_SECONDS, first_days)
+    piece_counts = last_days - first_days + 1
+
+    effort_indices = np.repeat(np.arange(len(start_seconds)), piece_counts)
+    # number of each piece within its effort
+    piece_numbers = np.arange(len(effort_indices)) - np.repeat(np.cumsum(piece_counts) - piece_counts, piece_counts)
+    days = first_days[effort_indices] + piece_numbers
+    day_begins = days * DAY_SECONDS
+    begin_offsets = np.maximum(start_seconds[effort_indices], day_begins) - day_begins
+    end_offsets = np.minimum(stop_seconds[effort_indices], day_begins + DAY_SECONDS) - day_begins
+
+    return effort_indices, days, begin_offsets, end_offsets
+
+
+def get_day_names(days: np.ndarray) -> np.ndarray:
+    """
+    :param days: days since the epoch
+    :return: days like '2020-05-29'
+    """
+
+    return np.asarray(days, dtype=np.int64).astype("datetime64[D]").astype(str)
+
+
+def format_offset(offset: int) -> str:
+    """
+    :param offset: second from the begin of a day
+    :return: hh:mm:ss; the next midnight (DAY_SECONDS) is shown as the end of the day (task_utils.DAY.END)
+    """
+
+    offset = min(offset, DAY_SECONDS - 1) % DAY_SECONDS
+    return f"{offset // 3600:02d}:{offset % 3600 // 60:02d}:{offset % 60:02d}"
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+"""
+This script compares two task-files, e.g. the file of the previous week with the file of the current week.
+- Tasks, efforts and categories are indexed by their 'id' attributes (hash join, linear in the file sizes).
+- Added, removed and modified items are reported.
+- The tracked effort minutes are compared per task and per category.
+
+NOTE:
+- bookkeeping attributes (modification date, expanded view contexts) are not considered as a modification.
+- like in the summary, the minutes are counted in whole minutes per effort and day (see task_days).
+"""
+
+__author__ = "emm"
+__version__ = "20261019"
+
+
+import csv
+import os
+import xml.dom.minidom as mdom
+from xml.parsers.expat import ExpatError
+from typing import Dict, List, Union
+
+import numpy as np
+
+from tcm_utils.__init__ import logger
+from tcm_utils.task_days import split_efforts_by_day, to_seconds
+from tcm_utils.task_utils import FORMAT, FileExtensionError, TaskFormatError
+
+# typing aliases
+Document = mdom.Document
+ITEM_INDEX = Dict[str, Dict]
+
+DIFF_EXTENSION = ".csv"
+OUTPUT_EXTENSION = "_diff" + DIFF_EXTENSION
+IGNORED_ATTRIBUTES = [FORMAT.MODIFICATION_DATETIME.value, FORMAT.EXPANDED_CONTEXTS.value]
+
+ADDED = "added"
+REMOVED = "removed"
+MODIFIED = "modified"
+
+
+def diff_tasks(old_task_xml_fn: str, new_task_xml_fn: str, output_fn: Union[str, None]) -> None:
+
+    msg = f"The output file name extension should be '{DIFF_EXTENSION}'."
+    if not (output_fn is None or output_fn.endswith(DIFF_EXTENSION)):
+        raise FileExtensionError(msg)
+
+    logger.info(f"READING doctrees from '{old_task_xml_fn}' and '{new_task_xml_fn}'")
+    old_index = __build_index(__read_xml(old_task_xml_fn))
+    new_index = __build_index(__read_xml(new_task_xml_fn))
+
+    logger.info("COMPARING tasks, efforts and categories")
+    change_rows = []
+    for entity in [FORMAT.TASK.value, FORMAT.EFFORT.value, FORMAT.CATEGORY.value]:
+        entity_rows = __diff_items(entity, old_index[entity], new_index[entity])
+        logger.info(f"- {entity}: "
+                    f"{sum(1 for row in entity_rows if row[1] == ADDED)} {ADDED}, "
+                    f"{sum(1 for row in entity_rows if row[1] == REMOVED)} {REMOVED}, "
+                    f"{sum(1 for row in entity_rows if row[1] == MODIFIED)} {MODIFIED}")
+        change_rows.extend(entity_rows)
+
+    old_task_minutes = __get_minutes_per_task(old_index)
+    new_task_minutes = __get_minutes_per_task(new_index)
+    task_delta_rows = __get_delta_rows(old_task_minutes, new_task_minutes,
+                                       old_index[FORMAT.TASK.value], new_index[FORMAT.TASK.value])
+    category_delta_rows = __get_delta_rows(__get_minutes_per_category(old_index, old_task_minutes),
+                                           __get_minutes_per_category(new_index, new_task_minutes),
+                                           old_index[FORMAT.CATEGORY.value], new_index[FORMAT.CATEGORY.value])
+
+    if output_fn is None:
+        output_fn = os.path.splitext(new_task_xml_fn)[0] + OUTPUT_EXTENSION
+    else:
+        output_path = os.path.realpath(os.path.dirname(output_fn))
+        os.makedirs(output_path, exist_ok=True)
+
+    logger.info(f"WRITING DIFF to '{output_fn}'")
+    with open(output_fn, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Item", "Change", "Id", "Name", "Details"])
+        writer.writerows(change_rows)
+        f.write(FORMAT.NL.value)
+        writer.writerow(["Task name", "Old (min)", "New (min)", "Delta (min)"])
+        writer.writerows(task_delta_rows)
+        f.write(FORMAT.NL.value)
+        writer.writerow(["Category", "Old (min)", "New (min)", "Delta (min)"])
+        writer.writerows(category_delta_rows)
+
+    logger.info("DONE. SEE differences in '{}'.".format(output_fn))
+
+
+def __read_xml(input_fn: str) -> Document:
+
+    try:
+        return mdom.parse(input_fn)
+    except ExpatError as e:
+        raise TaskFormatError(f"NOT ASSUMED xml FORMAT: {e}") from e
+
+
+def __build_index(doctree: Document) -> Dict[str, ITEM_INDEX]:
+    """
+    Index all tasks, efforts and categories of a doctree by their ids.
+
+    :param doctree:
+    :return: {entity : {id : {"name": ..., "parent": ..., "attributes": {...}}}}
+    """
+    index = {FORMAT.TASK.value: {}, FORMAT.EFFORT.value: {}, FORMAT.CATEGORY.value: {}}
+
+    root = doctree.documentElement
+    for element in root.childNodes:
+        if element.nodeType == mdom.Node.ELEMENT_NODE:
+            if element.tagName in (FORMAT.TASK.value, FORMAT.CATEGORY.value):
+                __index_node_rec(element, parent_id=None, parent_name=None, index=index)
+
+    return index
+
+
+def __index_node_rec(current_node, parent_id, parent_name, index):
+
+    if current_node.nodeType != mdom.Node.ELEMENT_NODE:
+        return
+    if current_node.tagName not in index:
+        return
+
+    attributes = dict(current_node.attributes.items())
+    item_id = attributes.get(FORMAT.ID.value)
+    if item_id is None:
+        raise TaskFormatError(f"Node '{current_node}' doesn't have an id attribute")
+
+    name = attributes.get(FORMAT.SUBJECT.value, "")
+    if current_node.tagName == FORMAT.CATEGORY.value and parent_name is not None:
+        # nested categories are named like in the summary
+        name = "->".join([parent_name, name])
+    elif current_node.tagName == FORMAT.EFFORT.value:
+        name = f"{parent_name}: {attributes.get(FORMAT.START.value)} - {attributes.get(FORMAT.STOP.value)}"
+
+    for child_node in current_node.childNodes:
+        if child_node.nodeType == mdom.Node.ELEMENT_NODE and child_node.tagName == FORMAT.DESCRIPTION.value:
+            attributes[FORMAT.DESCRIPTION.value] = "".join(node.data for node in child_node.childNodes
+                                                           if node.nodeType == mdom.Node.TEXT_NODE).strip()
+
+    index[current_node.tagName][item_id] = {"name": name,
+                                            "parent": parent_id,
+                                            "attributes": attributes}
+
+    for child_node in current_node.childNodes:
+        __index_node_rec(child_node, parent_id=item_id, parent_name=name, index=index)
+
+
+def __diff_items(entity: str, old_items: ITEM_INDEX, new_items: ITEM_INDEX) -> List[List[str]]:
+
+    rows = []
+    for item_id, new_item in new_items.items():
+        old_item = old_items.get(item_id)
+        if old_item is None:
+            rows.append([entity, ADDED, item_id, new_item["name"], ""])
+            continue
+
+        changed = [att for att in sorted(old_item["attributes"].keys() | new_item["attributes"].keys())
+                   if att not in IGNORED_ATTRIBUTES
+                   and old_item["attributes"].get(att) != new_item["attributes"].get(att)]
+        if old_item["parent"] != new_item["parent"]:
+            changed.append("parent")
+        if changed:
+            rows.append([entity, MODIFIED, item_id, new_item["name"], " ".join(changed)])
+
+    for item_id, old_item in old_items.items():
+        if item_id not in new_items:
+            rows.append([entity, REMOVED, item_id, old_item["name"], ""])
+
+    return rows
+
+
+def __get_effort_minutes(start_vals: List[str], stop_vals: List[str]) -> List[int]:
+    """
+    :return: minutes of each effort, in whole minutes per day it spans (like in the summary)
+    """
+
+    effort_indices, _, begin_offsets, end_offsets = split_efforts_by_day(to_seconds(start_vals), to_seconds(stop_vals))
+
+    return np.bincount(effort_indices, weights=(end_offsets - begin_offsets) // 60,
+                       minlength=len(start_vals)).astype(np.int64).tolist()
+
+
+def __get_minutes_per_task(index: Dict[str, ITEM_INDEX]) -> Dict[str, int]:
+
+    task_ids, start_vals, stop_vals = [], [], []
+    for effort in index[FORMAT.EFFORT.value].values():
+        start_val = effort["attributes"].get(FORMAT.START.value)
+        stop_val = effort["attributes"].get(FORMAT.STOP.value)
+        if start_val is None or stop_val is None:
+            logger.warning(f"- Effort '{effort['name']}' without start or stop time is ignored.")
+            continue
+        task_ids.append(effort["parent"])
+        start_vals.append(start_val)
+        stop_vals.append(stop_val)
+
+    minutes_per_task = {}
+    for task_id, minutes in zip(task_ids, __get_effort_minutes(start_vals, stop_vals)):
+        minutes_per_task[task_id] = minutes_per_task.get(task_id, 0) + minutes
+
+    return minutes_per_task
+
+
+def __get_minutes_per_category(index: Dict[str, ITEM_INDEX], minutes_per_task: Dict[str, int]) -> Dict[str, int]:
+
+    minutes_per_category = {}
+    for category_id, category in index[FORMAT.CATEGORY.value].items():
+        task_ids = category["attributes"].get(FORMAT.CATEGORIZABLES.value, "").split()
+        minutes_per_category[category_id] = sum(minutes_per_task.get(task_id, 0) for task_id in task_ids)
+
+    return minutes_per_category
+
+
+def __get_delta_rows(old_minutes: Dict[str, int], new_minutes: Dict[str, int],
+                     old_items: ITEM_INDEX, new_items: ITEM_INDEX) -> List[List]:
+
+    rows = []
+    for item_id in list(new_minutes) + [item_id for item_id in old_minutes if item_id not in new_minutes]:
+        old_value = old_minutes.get(item_id, 0)
+        new_value = new_minutes.get(item_id, 0)
+        if old_value == new_value:
+            continue
+        item = new_items.get(item_id) or old_items.get(item_id)
+        rows.append([item["name"], old_value, new_value, new_value - old_value])
+
+    return rows
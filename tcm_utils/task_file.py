@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+"""
+This script provides the task-file functionalities as a library, e.g. for long-running services.
+- A task-file can be given as file name, as file-like object or as bytes.
+- The results (tasks, efforts, categories, summary tables, daily timelines, cleaned document) are computed lazily
+  on first access and kept in memory; nothing is written into files.
+- Errors are raised as task_utils.TaskFileError exceptions instead of quitting the process.
+
+Example:
+    task_file = TaskFile(tsk_bytes)
+    summary_df = task_file.summary_table
+"""
+
+__author__ = "emm"
+__version__ = "20261019"
+
+
+import io
+import os
+import xml.dom.minidom as mdom
+from xml.parsers.expat import ExpatError
+from typing import BinaryIO, Dict, List, TextIO, Union
+
+import pandas as pd
+
+from tcm_utils import task_cleaner, task_summary
+from tcm_utils.task_utils import FORMAT, SUMMARY, TaskFormatError
+
+# typing aliases
+TASK_FILE_SOURCE = Union[str, os.PathLike, bytes, BinaryIO, TextIO]
+
+
+class TaskFile:
+
+    def __init__(self, source: TASK_FILE_SOURCE):
+        """
+        :param source: file name, bytes, or a binary or text file-like object of a task-file
+        """
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, "rb") as f:
+                content = f.read()
+        elif isinstance(source, (bytes, bytearray)):
+            content = bytes(source)
+        else:
+            content = source.read()
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+
+        self._content = content
+        self._cache = {}
+
+    def _get(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    @property
+    def content(self) -> bytes:
+        return self._content
+
+    @property
+    def doctree(self) -> mdom.Document:
+        def compute():
+            try:
+                return mdom.parseString(self._content)
+            except ExpatError as e:
+                raise TaskFormatError(f"NOT ASSUMED xml FORMAT: {e}") from e
+        return self._get("doctree", compute)
+
+    @property
+    def _parsed(self):
+        return self._get("parsed", lambda: task_summary.get_categories_and_tasks(self.doctree))
+
+    @property
+    def categories(self) -> Dict[str, List[str]]:
+        """{category: task ids}, nested categories are named as 'parent->child'"""
+        return self._parsed[0]
+
+    @property
+    def category_parents(self) -> Dict[str, Union[str, None]]:
+        """{category: parent category or None}"""
+        return self._parsed[1]
+
+    @property
+    def tasks(self) -> Dict[str, Dict]:
+        """{task id: task infos with efforts and durations per day}"""
+        return self._parsed[2]
+
+    @property
+    def efforts(self) -> List[Dict[str, str]]:
+        """list of the efforts with their task id, start and stop time"""
+        def compute():
+            return [{FORMAT.TASK.value: task_id, FORMAT.START.value: start_val, FORMAT.STOP.value: stop_val}
+                    for task_id, task_infos in self.tasks.items()
+                    for start2stop_dict in task_infos[SUMMARY.EFFORTS.value].values()
+                    for start_val, stop_val in start2stop_dict.items()]
+        return self._get("efforts", compute)
+
+    def summary_table_at_depth(self, depth: int) -> pd.DataFrame:
+        """per-task summary table up to the given level of the task hierarchy (0: top-level tasks), with the durations
+        of the deeper subtasks rolled up; raises NoEffortError if there is no effort"""
+        return self._get(("summary_tables", depth),
+                         lambda: task_summary.build_summary_tables(self.categories, self.category_parents, self.tasks,
+                                                                   depth=depth))[0]
+
+    @property
+    def _summary_tables(self):
+        return self._get("summary_tables",
+                         lambda: task_summary.build_summary_tables(self.categories, self.category_parents, self.tasks))
+
+    @property
+    def summary_table(self) -> pd.DataFrame:
+        """per-task summary table; raises NoEffortError if there is no effort"""
+        return self._summary_tables[0]
+
+    @property
+    def category_summary_table(self) -> pd.DataFrame:
+        """per-category summary table; raises NoEffortError if there is no effort"""
+        return self._summary_tables[1]
+
+    @property
+    def _daily_timelines_and_metrics(self):
+        def compute():
+            daily_metrics = []
+            daily_timelines = task_summary.build_daily_timelines(self.tasks, daily_metrics=daily_metrics)
+            return daily_timelines, pd.DataFrame(daily_metrics, columns=task_summary.DAILY_METRICS_COLUMNS)
+        return self._get("daily_timelines", compute)
+
+    @property
+    def daily_timelines(self) -> Dict[str, pd.DataFrame]:
+        """{day: timeline of the day}; raises NoEffortError if there is no effort"""
+        return self._daily_timelines_and_metrics[0]
+
+    @property
+    def daily_metrics(self) -> pd.DataFrame:
+        """focus metrics per day (task switches, uninterrupted blocks, short efforts); raises NoEffortError if there
+        is no effort"""
+        return self._daily_timelines_and_metrics[1]
+
+    @property
+    def _cleaned_and_archived(self):
+        def compute():
+            lines = [line.strip() for line in self._content.decode("utf-8").splitlines()]
+            cleaned_f = io.StringIO()
+            archive_f = io.StringIO()
+            task_cleaner.clean_lines(lines, cleaned_f, archive_f)
+            return cleaned_f.getvalue(), archive_f.getvalue()
+        return self._get("cleaned", compute)
+
+    @property
+    def cleaned(self) -> str:
+        """the cleaned task-file document (without done tasks and efforts)"""
+        return self._cleaned_and_archived[0]
+
+    @property
+    def archived(self) -> str:
+        """the task-file document with the tasks and efforts removed by the cleaning"""
+        return self._cleaned_and_archived[1]
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+"""
+This script computes Merkle-style fingerprints of a task-file, e.g. to detect quickly what changed between two saves
+of the same task-file.
+- Each task and each category gets two fingerprints: the fingerprint of its own content (attributes, description,
+  efforts and other non-task children) and the fingerprint of its subtree (its own fingerprint and the subtree
+  fingerprints of its subtasks or subcategories); the root fingerprint covers the whole task-file.
+- The fingerprints are stored in a small sidecar index (.json) next to the task-file.
+- Comparing two indexes starts with the root fingerprints, and only the changed subtrees are reported (added, removed,
+  modified or moved tasks and categories).
+
+NOTE:
+- the task-file is read in a single streaming pass, without pandas.
+- bookkeeping attributes (modification date, expanded view contexts) are not part of the fingerprints
+  (like in task_diff).
+"""
+
+__author__ = "emm"
+__version__ = "20261019"
+
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Union
+import xml.etree.ElementTree as ET
+
+from tcm_utils.__init__ import logger
+from tcm_utils.task_diff import ADDED, IGNORED_ATTRIBUTES, MODIFIED, REMOVED
+from tcm_utils.task_utils import FORMAT, FileExtensionError, TaskFormatError
+
+# typing aliases
+FINGERPRINTS = Dict[str, Dict]
+
+FINGERPRINT_EXTENSION = ".json"
+OUTPUT_EXTENSION = "_fingerprints" + FINGERPRINT_EXTENSION
+FINGERPRINT_VERSION = 1
+DIGEST_SIZE = 16  # bytes of a fingerprint
+ENTITIES = [FORMAT.TASK.value, FORMAT.CATEGORY.value]  # items with fingerprints of their own
+
+MOVED = "moved"
+
+# index keys
+VERSION = "version"
+ROOT = "root"
+SUBTREE = "subtree"
+OWN = "own"
+PARENT = "parent"
+NAME = "name"
+
+
+def fingerprint_tasks(input_task_xml_fn: str, output_fn: Union[str, None]) -> None:
+    """
+    :param input_task_xml_fn:
+    :param output_fn: sidecar index (.json); default: next to the input file. If the sidecar index already exists,
+        the changed subtrees since its computation are reported before it is overwritten.
+    """
+
+    msg = f"The output file name extension should be '{FINGERPRINT_EXTENSION}'."
+    if not (output_fn is None or output_fn.endswith(FINGERPRINT_EXTENSION)):
+        raise FileExtensionError(msg)
+    if output_fn is None:
+        output_fn = os.path.splitext(input_task_xml_fn)[0] + OUTPUT_EXTENSION
+
+    logger.info(f"FINGERPRINTING '{input_task_xml_fn}'")
+    fingerprints = build_fingerprints(input_task_xml_fn)
+    logger.info(f"- {len(fingerprints[FORMAT.TASK.value])} tasks, "
+                f"{len(fingerprints[FORMAT.CATEGORY.value])} categories, root fingerprint {fingerprints[ROOT]}")
+
+    if os.path.exists(output_fn):
+        logger.info(f"COMPARING with '{output_fn}'")
+        rows = get_changed_subtrees(read_fingerprints(output_fn), fingerprints)
+        if not rows:
+            logger.info("- no change")
+        for entity, change, item_id, name in rows:
+            logger.info(f"- {entity} {change}: '{name}' ({item_id})")
+
+    write_fingerprints(fingerprints, output_fn)
+
+    logger.info("DONE. SEE fingerprints in '{}'.".format(output_fn))
+
+
+def build_fingerprints(input_task_xml_fn: str) -> FINGERPRINTS:
+    """
+    :return: {VERSION: ..., ROOT: root fingerprint,
+              entity: {id: {SUBTREE: ..., OWN: ..., PARENT: parent id or None, NAME: subject}}}
+    """
+
+    fingerprints = {VERSION: FINGERPRINT_VERSION, ROOT: None, FORMAT.TASK.value: {}, FORMAT.CATEGORY.value: {}}
+    # per open element: [hashes of the own children (e.g. efforts), subtree fingerprints of the subitems, item id]
+    stack = []
+
+    try:
+        for event, element in ET.iterparse(input_task_xml_fn, events=("start", "end")):
+            if event == "start":
+                stack.append([[], [], element.get(FORMAT.ID.value)])
+                continue
+
+            own_hashes, subtree_fingerprints, item_id = stack.pop()
+            content_hash = __get_hash(__get_hash(__get_content(element)), *own_hashes)
+
+            if not stack:
+                fingerprints[ROOT] = __get_hash(content_hash, *subtree_fingerprints)
+            elif element.tag in ENTITIES:
+                if item_id is None:
+                    raise TaskFormatError(f"A {element.tag} doesn't have an id attribute.")
+                subtree_fingerprint = __get_hash(content_hash, *subtree_fingerprints)
+                parent_id = stack[-1][2] if len(stack) > 1 else None
+                fingerprints[element.tag][item_id] = {SUBTREE: subtree_fingerprint,
+                                                      OWN: content_hash,
+                                                      PARENT: parent_id,
+                                                      NAME: element.get(FORMAT.SUBJECT.value, "")}
+                stack[-1][1].append(subtree_fingerprint)
+            else:
+                stack[-1][0].append(__get_hash(content_hash, *subtree_fingerprints))
+
+            # the elements are not needed any more
+            element.clear()
+    except ET.ParseError as e:
+        raise TaskFormatError(f"NOT ASSUMED xml FORMAT: {e}") from e
+
+    return fingerprints
+
+
+def get_changed_subtrees(old_fingerprints: FINGERPRINTS, new_fingerprints: FINGERPRINTS) -> List[List[str]]:
+    """
+    Only the roots of the changed subtrees are reported: e.g. an added task with all its subtasks is one added task,
+    and a task whose subtree fingerprint changed only because of a changed subtask is not reported.
+
+    :return: [[entity, change, id, name]], change is one of ADDED, REMOVED, MODIFIED, MOVED (or 'modified moved')
+    """
+
+    rows = []
+    if old_fingerprints[ROOT] == new_fingerprints[ROOT]:
+        return rows
+
+    for entity in ENTITIES:
+        old_items = old_fingerprints[entity]
+        new_items = new_fingerprints[entity]
+
+        for item_id, new_item in new_items.items():
+            old_item = old_items.get(item_id)
+            if old_item is None:
+                if new_item[PARENT] is None or new_item[PARENT] in old_items:
+                    rows.append([entity, ADDED, item_id, new_item[NAME]])
+                continue
+            if old_item[SUBTREE] == new_item[SUBTREE] and old_item[PARENT] == new_item[PARENT]:
+                continue
+            changes = []
+            if old_item[OWN] != new_item[OWN]:
+                changes.append(MODIFIED)
+            if old_item[PARENT] != new_item[PARENT]:
+                changes.append(MOVED)
+            if changes:
+                rows.append([entity, " ".join(changes), item_id, new_item[NAME]])
+
+        for item_id, old_item in old_items.items():
+            if item_id not in new_items and (old_item[PARENT] is None or old_item[PARENT] in new_items):
+                rows.append([entity, REMOVED, item_id, old_item[NAME]])
+
+    return rows
+
+
+def read_fingerprints(input_fn: str) -> FINGERPRINTS:
+
+    with open(input_fn, encoding="utf-8") as f:
+        fingerprints = json.load(f)
+    if fingerprints.get(VERSION) != FINGERPRINT_VERSION:
+        raise TaskFormatError(f"NOT ASSUMED fingerprint index FORMAT in '{input_fn}'.")
+
+    return fingerprints
+
+
+def write_fingerprints(fingerprints: FINGERPRINTS, output_fn: str) -> None:
+
+    os.makedirs(os.path.realpath(os.path.dirname(output_fn)), exist_ok=True)
+    with open(output_fn, "w", encoding="utf-8") as f:
+        json.dump(fingerprints, f)
+
+
+def __get_content(element) -> bytes:
+
+    attributes = sorted((attname, attval) for attname, attval in element.attrib.items()
+                        if attname not in IGNORED_ATTRIBUTES)
+    return json.dumps([element.tag, attributes, (element.text or "").strip()]).encode("utf-8")
+
+
+def __get_hash(*parts: Union[bytes, str]) -> str:
+
+    hasher = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for part in parts:
+        hasher.update(part if isinstance(part, bytes) else bytes.fromhex(part))
+    return hasher.hexdigest()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+"""
+This script builds heatmaps of the tracked time over the week, e.g. to see focus hours, pause patterns or after-hours
+work across many weeks.
+- The tracked time of all efforts is binned per weekday and per hour (or minute) of the day.
+- A heatmap is built for all efforts and for each category.
+- The heatmaps are written as matrices (rows: time of the day, columns: weekdays, values: tracked minutes) into a
+  .csv file (one table per category) or into a .xlsx file (one sheet per category).
+
+NOTE:
+- the heatmaps are accumulated with difference arrays over the seconds of the week (no per-minute python loop).
+- like in the summary, efforts over midnight are split into the days they span (see task_days), and efforts with
+  negative duration are ignored.
+"""
+
+__author__ = "emm"
+__version__ = "20261019"
+
+
+import os
+import xml.dom.minidom as mdom
+from xml.parsers.expat import ExpatError
+from typing import Dict, Union
+
+import numpy as np
+import pandas as pd
+
+from tcm_utils.__init__ import logger
+from tcm_utils import task_summary
+from tcm_utils.task_days import DAY_SECONDS, split_efforts_by_day, to_seconds
+from tcm_utils.task_utils import FORMAT, HEATMAP_RESOLUTION, IO, SPECIAL_CATEGORIES, SUMMARY, FileExtensionError, \
+    NoEffortError, TaskFormatError
+
+OUTPUT_SUFFIX = "_heatmap"
+ALL_CATEGORIES = "ALL"
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+WEEK_SECONDS = len(WEEKDAYS) * DAY_SECONDS
+BIN_SECONDS = {HEATMAP_RESOLUTION.HOUR.value: 60 * 60,
+               HEATMAP_RESOLUTION.MINUTE.value: 60}
+EPOCH_WEEKDAY = 3  # 1970-01-01 was a Thursday
+XLSX_SHEET_NAME_LENGTH = 31
+
+
+def heatmap_tasks(input_task_xml_fn: str, output_fn: Union[str, None],
+                  resolution: str = HEATMAP_RESOLUTION.HOUR.value) -> None:
+    """
+    :param input_task_xml_fn:
+    :param output_fn: .csv or .xlsx file; default: .csv file in the folder of the input file
+    :param resolution: bin size of the time of the day (task_utils.HEATMAP_RESOLUTION)
+    """
+
+    extensions = [IO.CSV_EXTENSION.value, IO.XLSX_EXTENSION.value]
+    msg = f"The output file name extension should be one of these values: '{extensions}'."
+    if not (output_fn is None or os.path.splitext(output_fn)[1] in extensions):
+        raise FileExtensionError(msg)
+
+    if output_fn is None:
+        output_fn = os.path.splitext(input_task_xml_fn)[0] + OUTPUT_SUFFIX + IO.CSV_EXTENSION.value
+    else:
+        output_path = os.path.realpath(os.path.dirname(output_fn))
+        os.makedirs(output_path, exist_ok=True)
+
+    logger.info(f"READING doctree from '{input_task_xml_fn}'")
+    category_dict, _, task_dict = task_summary.get_categories_and_tasks(__read_xml(input_task_xml_fn))
+
+    logger.info(f"BUILDING HEATMAPS per {resolution}")
+    heatmap_df_dict = build_heatmaps(category_dict, task_dict, resolution)
+
+    logger.info(f"WRITING HEATMAPS to '{output_fn}'")
+    if os.path.splitext(output_fn)[1] == IO.XLSX_EXTENSION.value:
+        __write_multi_sheet_heatmaps(heatmap_df_dict, output_fn)
+    else:
+        __write_heatmaps(heatmap_df_dict, output_fn)
+
+    logger.info("DONE. SEE heatmaps in '{}'.".format(output_fn))
+
+
+def build_heatmaps(category_dict, task_dict,
+                   resolution: str = HEATMAP_RESOLUTION.HOUR.value) -> Dict[str, pd.DataFrame]:
+    """
+    :param category_dict: {category: task ids}
+    :param task_dict: {task id: task infos with efforts per day}
+    :param resolution: bin size of the time of the day (task_utils.HEATMAP_RESOLUTION)
+    :return: {category or ALL_CATEGORIES: heatmap with the tracked minutes per time of the day (rows) and weekday}
+    :raise NoEffortError: if there is no effort in the tasks
+    """
+
+    task_categories = {}
+    for category, task_ids in category_dict.items():
+        for task_id in task_ids:
+            task_categories.setdefault(task_id, []).append(category)
+
+    categories = [ALL_CATEGORIES]
+    category_indices = {ALL_CATEGORIES: 0}
+    start_vals = []
+    stop_vals = []
+    effort_categories = []
+    for task_id, task_infos in task_dict.items():
+        for start2stop_dict in task_infos[SUMMARY.EFFORTS.value].values():
+            for start_val, stop_val in start2stop_dict.items():
+                # each effort is counted once for all categories, and once for each category of its task
+                for category in [ALL_CATEGORIES] + task_categories.get(task_id, [SPECIAL_CATEGORIES.MISSING.value]):
+                    if category not in category_indices:
+                        category_indices[category] = len(categories)
+                        categories.append(category)
+                    start_vals.append(start_val)
+                    stop_vals.append(stop_val)
+                    effort_categories.append(category_indices[category])
+
+    if not start_vals:
+        raise NoEffortError("NO EFFORT detected")
+
+    effort_indices, days, begin_offsets, end_offsets = split_efforts_by_day(to_seconds(start_vals),
+                                                                            to_seconds(stop_vals))
+    effort_categories = np.array(effort_categories, dtype=np.int64)[effort_indices]
+
+    # the pieces of the efforts are within their day (upto the next midnight), and no negative durations
+    weekdays = (days + EPOCH_WEEKDAY) % len(WEEKDAYS)
+    start_offsets = weekdays * DAY_SECONDS + begin_offsets
+    stop_offsets = start_offsets + np.maximum(end_offsets - begin_offsets, 0)
+
+    bin_seconds = BIN_SECONDS[resolution]
+    time_labels = [f"{offset // 3600:02d}:{offset % 3600 // 60:02d}" for offset in range(0, DAY_SECONDS, bin_seconds)]
+
+    heatmap_df_dict = {}
+    for category_index, category in enumerate(categories):
+        mask = effort_categories == category_index
+        # difference array over the seconds of the week: +1 at the effort starts, -1 at the effort stops
+        differences = np.bincount(start_offsets[mask], minlength=WEEK_SECONDS + 1) \
+            - np.bincount(stop_offsets[mask], minlength=WEEK_SECONDS + 1)
+        tracked_seconds = np.cumsum(differences[:WEEK_SECONDS])
+        tracked_seconds_per_bin = tracked_seconds.reshape(len(WEEKDAYS), -1, bin_seconds).sum(axis=2)
+
+        heatmap_df = pd.DataFrame((tracked_seconds_per_bin.T / 60).round(2), columns=WEEKDAYS)
+        heatmap_df.insert(0, category, time_labels)
+        heatmap_df_dict[category] = heatmap_df
+
+    return heatmap_df_dict
+
+
+def __read_xml(input_fn: str) -> mdom.Document:
+
+    try:
+        return mdom.parse(input_fn)
+    except ExpatError as e:
+        raise TaskFormatError(f"NOT ASSUMED xml FORMAT: {e}") from e
+
+
+def __write_heatmaps(heatmap_df_dict: Dict[str, pd.DataFrame], output_fn: str) -> None:
+
+    with open(output_fn, "w", encoding="utf-8") as f:
+        for idx, heatmap_df in enumerate(heatmap_df_dict.values()):
+            if idx > 0:
+                f.write(FORMAT.NL.value)
+            heatmap_df.to_csv(f, index=False)
+
+
+def __write_multi_sheet_heatmaps(heatmap_df_dict: Dict[str, pd.DataFrame], output_fn: str) -> None:
+
+    writer = pd.ExcelWriter(output_fn, engine='xlsxwriter')  # python -m pip install XlsxWriter
+
+    sheet_names = set()
+    for category, heatmap_df in heatmap_df_dict.items():
+        # xlsx sheet names are restricted in length and characters
+        sheet_name = "".join("_" if char in "[]:*?/\\" else char for char in category)[:XLSX_SHEET_NAME_LENGTH]
+        base_name, number = sheet_name, 1
+        while sheet_name in sheet_names:
+            number += 1
+            sheet_name = f"{base_name[:XLSX_SHEET_NAME_LENGTH - len(str(number)) - 1]}_{number}"
+        sheet_names.add(sheet_name)
+        heatmap_df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+    writer.close()
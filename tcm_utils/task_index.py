@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+
+"""
+This script builds a full-text index over a set of task-files, e.g. to find all the time spent on anything mentioning
+a ticket like 'ABC-123' across many weekly task-files.
+- The tokens of the task subjects, the task descriptions and the names of the categories of the tasks are mapped to
+  the task ids (inverted index), per task-file, together with the tracked minutes and the amount of efforts per task.
+- The index (.json) is kept next to the task-files and updated incrementally: only new or changed task-files are read
+  again, and task-files which don't exist any more are dropped.
+- A search returns the matching tasks (with all tokens of the query) with their effort totals over all indexed
+  task-files, straight from the index.
+
+NOTE:
+- the tokens are lower-case words; compound tokens like 'abc-123/fix' or 'v1.2' are indexed as a whole, in their
+  parts and in their sub-compounds (e.g. 'abc-123' and '123/fix'), so that a ticket is found within a longer compound.
+- the categories can be written before or after their tasks in the task-file.
+- like in the summary, the minutes are counted in whole minutes per effort and day (see task_days); an effort
+  contained in several indexed task-files (e.g. in a copy of a task-file) is counted once per task-file.
+- the task-files are read in a single streaming pass each, without pandas.
+"""
+
+__author__ = "emm"
+__version__ = "20261019"
+
+
+import csv
+import json
+import os
+import re
+from typing import Dict, List, Set, Tuple, Union
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from tcm_utils.__init__ import logger
+from tcm_utils.task_days import split_efforts_by_day, to_seconds
+from tcm_utils.task_utils import FORMAT, SPECIAL_CATEGORIES, FileExtensionError, TaskFormatError
+
+# typing aliases
+INDEX = Dict[str, Union[int, Dict]]
+
+INDEX_EXTENSION = ".json"
+INDEX_FN = "tasks_index" + INDEX_EXTENSION
+SEARCH_EXTENSION = ".csv"
+INDEX_VERSION = 2  # 2: with the sub-compounds of the tokens
+TOKEN_PATTERN = re.compile(r"\w+(?:[-./]\w+)*")
+TOKEN_PART_PATTERN = re.compile(r"([-./])")
+
+# index keys
+VERSION = "version"
+FILES = "files"
+MTIME = "mtime"
+SIZE = "size"
+TASKS = "tasks"
+TOKENS = "tokens"
+NAME = "name"
+CATEGORIES = "categories"
+MINUTES = "minutes"
+EFFORTS = "efforts"
+
+SEARCH_COLUMNS = ["Task name", "Id", "Categories", "Duration (min)", "Efforts", "Task-files"]
+
+
+def index_tasks(input_task_xml_fns: List[str], output_fn: Union[str, None]) -> None:
+    """
+    :param input_task_xml_fns: task-files to add to the index (or to update in the index)
+    :param output_fn: index (.json); default: INDEX_FN in the folder of the first task-file.
+        If the index already exists, it is updated.
+    """
+
+    msg = f"The output file name extension should be '{INDEX_EXTENSION}'."
+    if not (output_fn is None or output_fn.endswith(INDEX_EXTENSION)):
+        raise FileExtensionError(msg)
+    if output_fn is None:
+        output_fn = os.path.join(os.path.dirname(input_task_xml_fns[0]), INDEX_FN)
+
+    index = read_index(output_fn, rebuild_outdated=True) if os.path.exists(output_fn) \
+        else {VERSION: INDEX_VERSION, FILES: {}}
+    logger.info(f"INDEXING {len(input_task_xml_fns)} task-files into '{output_fn}'")
+    indexed_fns, removed_fns = update_index(index, input_task_xml_fns, os.path.dirname(output_fn))
+    logger.info(f"- {len(indexed_fns)} task-files indexed, "
+                f"{len(set(map(os.path.realpath, input_task_xml_fns))) - len(indexed_fns)} unchanged, "
+                f"{len(removed_fns)} removed; {len(index[FILES])} task-files in the index")
+    write_index(index, output_fn)
+
+    logger.info("DONE. SEE index in '{}'.".format(output_fn))
+
+
+def search_tasks(index_fn: str, query: str, output_fn: Union[str, None] = None) -> List[List]:
+    """
+    :param index_fn:
+    :param query: e.g. 'ABC-123'; a task matches if it has all tokens of the query
+    :param output_fn: if given, the matching tasks are written into this .csv file
+    :return: matching tasks (SEARCH_COLUMNS), the task with the most minutes first
+    """
+
+    msg = f"The output file name extension should be '{SEARCH_EXTENSION}'."
+    if not (output_fn is None or output_fn.endswith(SEARCH_EXTENSION)):
+        raise FileExtensionError(msg)
+
+    logger.info(f"SEARCHING '{query}' in '{index_fn}'")
+    rows = search(read_index(index_fn), query)
+    for task_name, task_id, categories, minutes, efforts, task_fns in rows:
+        logger.info(f"- '{task_name}' ({task_id}): {minutes} minutes in {efforts} efforts "
+                    f"of {len(task_fns)} task-files")
+    logger.info(f"- {len(rows)} matching tasks, {sum(row[3] for row in rows)} minutes")
+
+    if output_fn is not None:
+        os.makedirs(os.path.realpath(os.path.dirname(output_fn)), exist_ok=True)
+        with open(output_fn, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(SEARCH_COLUMNS)
+            writer.writerows([row[:2] + [",".join(row[2])] + row[3:5] + [",".join(row[5])] for row in rows])
+        logger.info("DONE. SEE search results in '{}'.".format(output_fn))
+    else:
+        logger.info("DONE.")
+
+    return rows
+
+
+def update_index(index: INDEX, input_task_xml_fns: List[str], index_path: str) -> Tuple[List[str], List[str]]:
+    """
+    Index the new or changed task-files (by their modification time and size), and drop the indexed task-files which
+    don't exist any more. The task-files are kept with their paths relative to the folder of the index.
+
+    :return: indexed task-files, removed task-files
+    """
+
+    indexed_fns = []
+    for input_fn in dict.fromkeys(map(os.path.realpath, input_task_xml_fns)):
+        key = os.path.relpath(input_fn, os.path.realpath(index_path))
+        stat = os.stat(input_fn)
+        file_index = index[FILES].get(key)
+        if file_index is not None and file_index[MTIME] == stat.st_mtime_ns and file_index[SIZE] == stat.st_size:
+            continue
+        logger.debug(f"INDEXING '{input_fn}'")
+        index[FILES][key] = dict(build_file_index(input_fn), **{MTIME: stat.st_mtime_ns, SIZE: stat.st_size})
+        indexed_fns.append(key)
+
+    removed_fns = [key for key in index[FILES] if not os.path.exists(os.path.join(index_path, key))]
+    for key in removed_fns:
+        del index[FILES][key]
+
+    return indexed_fns, removed_fns
+
+
+def build_file_index(input_task_xml_fn: str) -> INDEX:
+    """
+    :return: {TASKS: {task id: {NAME: ..., CATEGORIES: [...], MINUTES: ..., EFFORTS: ...}},
+              TOKENS: {token: [task ids]}}
+    :raise TaskFormatError: if the task-file is not a well-formed xml file or an effort is not complete
+    """
+
+    tasks = {}
+    task_tokens = {}  # task id : tokens
+    task_categories = []  # (task id, category name), the tasks of a category can follow it in the task-file
+    category_stack = []
+    task_stack = []
+    effort_list = []  # (task id, start, stop)
+
+    try:
+        for event, element in ET.iterparse(input_task_xml_fn, events=("start", "end")):
+            if event == "start":
+                if element.tag == FORMAT.TASK.value:
+                    task_id = element.get(FORMAT.ID.value)
+                    tasks[task_id] = {NAME: element.get(FORMAT.SUBJECT.value, ""), CATEGORIES: [],
+                                      MINUTES: 0, EFFORTS: 0}
+                    task_tokens[task_id] = get_tokens(element.get(FORMAT.SUBJECT.value, ""))
+                    task_stack.append(task_id)
+                elif element.tag == FORMAT.CATEGORY.value:
+                    category_stack.append(element.get(FORMAT.SUBJECT.value, ""))
+                    cat_name = "->".join(category_stack)
+                    task_categories.extend((task_id, cat_name)
+                                           for task_id in element.get(FORMAT.CATEGORIZABLES.value, "").split())
+                continue
+
+            if element.tag == FORMAT.TASK.value:
+                task_stack.pop()
+            elif element.tag == FORMAT.CATEGORY.value:
+                category_stack.pop()
+            elif element.tag == FORMAT.DESCRIPTION.value and task_stack:
+                task_tokens[task_stack[-1]] |= get_tokens(element.text or "")
+            elif element.tag == FORMAT.EFFORT.value and task_stack:
+                start_val = element.get(FORMAT.START.value)
+                stop_val = element.get(FORMAT.STOP.value)
+                if start_val is None or stop_val is None:
+                    raise TaskFormatError(f"An effort does not have a start or stop time. "
+                                          f"Make sure you are not currently running the time tracker. ")
+                effort_list.append((task_stack[-1], start_val, stop_val))
+            # the elements are not needed any more
+            element.clear()
+    except ET.ParseError as e:
+        raise TaskFormatError(f"NOT ASSUMED xml FORMAT: {e}") from e
+
+    for task_id, cat_name in task_categories:
+        # a category can refer to tasks which are not in the file (any more)
+        if task_id in tasks:
+            tasks[task_id][CATEGORIES].append(cat_name)
+            task_tokens[task_id] |= get_tokens(cat_name)
+
+    if effort_list:
+        effort_task_ids, start_vals, stop_vals = zip(*effort_list)
+        effort_indices, _, begin_offsets, end_offsets = split_efforts_by_day(to_seconds(start_vals),
+                                                                             to_seconds(stop_vals))
+        effort_minutes = np.bincount(effort_indices, weights=(end_offsets - begin_offsets) // 60).astype(np.int64)
+        for task_id, minutes in zip(effort_task_ids, effort_minutes.tolist()):
+            tasks[task_id][MINUTES] += minutes
+            tasks[task_id][EFFORTS] += 1
+
+    tokens = {}
+    for task_id, tokens_of_task in task_tokens.items():
+        if not tasks[task_id][CATEGORIES]:
+            tasks[task_id][CATEGORIES].append(SPECIAL_CATEGORIES.MISSING.value)
+        for token in tokens_of_task:
+            tokens.setdefault(token, []).append(task_id)
+
+    return {TASKS: tasks, TOKENS: tokens}
+
+
+def search(index: INDEX, query: str) -> List[List]:
+    """
+    :return: matching tasks (SEARCH_COLUMNS) over all indexed task-files, the task with the most minutes first
+    """
+
+    query_tokens = get_tokens(query, with_parts=False)
+    if not query_tokens:
+        return []
+
+    results = {}  # task id : row
+    for key, file_index in sorted(index[FILES].items()):
+        task_ids = None
+        for token in query_tokens:
+            token_task_ids = set(file_index[TOKENS].get(token, []))
+            task_ids = token_task_ids if task_ids is None else task_ids & token_task_ids
+            if not task_ids:
+                break
+        for task_id in task_ids:
+            task_infos = file_index[TASKS][task_id]
+            row = results.setdefault(task_id, [task_infos[NAME], task_id, [], 0, 0, []])
+            # the name of the last task-file is taken, e.g. of the most recent week
+            row[0] = task_infos[NAME]
+            row[2].extend(category for category in task_infos[CATEGORIES] if category not in row[2])
+            row[3] += task_infos[MINUTES]
+            row[4] += task_infos[EFFORTS]
+            row[5].append(key)
+
+    return sorted(results.values(), key=lambda row: (-row[3], row[0]))
+
+
+def get_tokens(text: str, with_parts: bool = True) -> Set[str]:
+    """
+    :param with_parts: if True, the parts and the sub-compounds of compound tokens (e.g. 'abc', '123', 'fix',
+        'abc-123' and '123/fix' of 'abc-123/fix') are added
+    :return: lower-case tokens of the text
+    """
+
+    tokens = set()
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.add(token)
+        if with_parts:
+            # parts and separators alternate
+            pieces = TOKEN_PART_PATTERN.split(token)
+            tokens.update("".join(pieces[first:last + 1])
+                          for first in range(0, len(pieces), 2) for last in range(first, len(pieces), 2))
+    return tokens
+
+
+def read_index(input_fn: str, rebuild_outdated: bool = False) -> INDEX:
+    """
+    :param rebuild_outdated: if True, an index of another version is replaced with an empty index (so that all
+        task-files are indexed again)
+    """
+
+    try:
+        with open(input_fn, encoding="utf-8") as f:
+            index = json.load(f)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise TaskFormatError(f"NOT ASSUMED task index FORMAT in '{input_fn}': {e}") from e
+    if not isinstance(index, dict) or FILES not in index:
+        raise TaskFormatError(f"NOT ASSUMED task index FORMAT in '{input_fn}'.")
+    if index.get(VERSION) != INDEX_VERSION:
+        if not rebuild_outdated:
+            raise TaskFormatError(f"NOT ASSUMED task index FORMAT in '{input_fn}' "
+                                  f"(version {index.get(VERSION)} instead of {INDEX_VERSION}): index it again.")
+        logger.info(f"- the index has version {index.get(VERSION)} instead of {INDEX_VERSION} "
+                    f"-> all task-files are indexed again")
+        index = {VERSION: INDEX_VERSION, FILES: {}}
+
+    return index
+
+
+def write_index(index: INDEX, output_fn: str) -> None:
+
+    os.makedirs(os.path.realpath(os.path.dirname(output_fn)), exist_ok=True)
+    with open(output_fn, "w", encoding="utf-8") as f:
+        json.dump(index, f)
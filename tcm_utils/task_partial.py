@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+
+"""
+This script builds mergeable partial aggregates of task-files, e.g. for team-wide rollups of many weekly task-files.
+- A partial aggregate contains the tracked seconds (and minutes) per day x task x category, the start and stop
+  time per day and the seconds of each effort of a cell.
+- Any number of partial aggregates can be merged into another partial aggregate (so the merging can be done in a
+  tree, e.g. by several workers), or into the standard summary.
+
+NOTE:
+- an effort is counted only once, even if it is contained in several partial aggregates (e.g. if the same task-file
+  is aggregated twice): the efforts of the cells are merged by their ids, so the merge is exact and doesn't depend on
+  the order of the partial aggregates. If an effort was changed between the task-files, its longer version is taken.
+- the daily timelines are not part of the merged summary, since the single efforts are not kept.
+"""
+
+__author__ = "emm"
+__version__ = "20261019"
+
+
+import json
+import os
+from typing import Dict, List, Union
+import xml.etree.ElementTree as ET
+
+from tcm_utils.__init__ import logger
+from tcm_utils.task_days import format_offset, get_day_names, split_efforts_by_day, to_seconds
+from tcm_utils.task_utils import FORMAT, IO, SPECIAL_CATEGORIES, SUMMARY, FileExtensionError, TaskFormatError
+
+# typing aliases
+PARTIAL = Dict[str, Dict]
+
+PARTIAL_EXTENSION = ".json"
+OUTPUT_EXTENSION = "_partial" + PARTIAL_EXTENSION
+MERGED_OUTPUT_FN = "merged_summary"
+PARTIAL_VERSION = 3  # 2: the efforts over midnight are split into the days they span, 3: seconds per effort
+CELL_SEP = "|"  # cell key: day|task id|category
+
+# partial keys
+VERSION = "version"
+TASKS = "tasks"
+CATEGORY_PARENTS = "category_parents"
+CELLS = "cells"
+DAYS = "days"
+SECONDS = "seconds"
+MINUTES = "minutes"
+EFFORTS = "efforts"  # effort id : seconds of the effort in the cell
+
+
+def aggregate_tasks(input_task_xml_fn: str, output_fn: Union[str, None]) -> None:
+
+    msg = f"The output file name extension should be '{PARTIAL_EXTENSION}'."
+    if not (output_fn is None or output_fn.endswith(PARTIAL_EXTENSION)):
+        raise FileExtensionError(msg)
+
+    logger.info(f"AGGREGATING efforts of '{input_task_xml_fn}'")
+    partial = build_partial(input_task_xml_fn)
+    logger.info(f"- {len(partial[CELLS])} cells on {len(partial[DAYS])} days")
+
+    if output_fn is None:
+        output_fn = os.path.splitext(input_task_xml_fn)[0] + OUTPUT_EXTENSION
+    write_partial(partial, output_fn)
+
+    logger.info("DONE. SEE partial aggregate in '{}'.".format(output_fn))
+
+
+def merge_partials(input_fns: List[str], output_fn: Union[str, None]) -> None:
+
+    extensions = [PARTIAL_EXTENSION] + [extension.value for extension in IO]
+    msg = f"The output file name extension should be one of these values: '{extensions}'."
+    if not (output_fn is None or os.path.splitext(output_fn)[1] in extensions):
+        raise FileExtensionError(msg)
+
+    logger.info(f"MERGING {len(input_fns)} partial aggregates")
+    merged = {}
+    for input_fn in input_fns:
+        __merge_into(merged, read_partial(input_fn))
+
+    if output_fn is None:
+        output_fn = os.path.join(os.path.dirname(input_fns[0]), MERGED_OUTPUT_FN + IO.CSV_EXTENSION.value)
+
+    output_extension = os.path.splitext(output_fn)[1]
+    if output_extension == PARTIAL_EXTENSION:
+        write_partial(merged, output_fn)
+        logger.info("DONE. SEE merged partial aggregate in '{}'.".format(output_fn))
+        return
+
+    # imported here, so that the aggregation of the partials doesn't need pandas
+    from tcm_utils import task_summary
+
+    logger.info("BUILDING SUMMARY TABLE")
+    category_dict, category_parent_dict, task_dict, offsets_per_day_dict = __to_summary_input(merged)
+    task_summary_df, category_summary_df = task_summary.build_summary_tables(category_dict, category_parent_dict,
+                                                                             task_dict, offsets_per_day_dict)
+
+    logger.info(f"WRITING SUMMARY to '{output_fn}'")
+    os.makedirs(os.path.realpath(os.path.dirname(output_fn)), exist_ok=True)
+    task_summary.write_outputs(task_summary_df, category_summary_df, [], [output_fn])
+
+    logger.info("DONE. SEE task summary in '{}'.".format(output_fn))
+
+
+def build_partial(input_task_xml_fn: str) -> PARTIAL:
+    """
+    Aggregate the efforts of a task-file in one streaming pass.
+
+    Like in the summary, the efforts over midnight are split into the days they span.
+    """
+
+    tasks = {}
+    category_parents = {}
+    task_categories = {}  # task id : categories
+    category_stack = []
+    task_stack = []
+    effort_list = []  # (effort id, task id, start, stop)
+
+    for event, element in ET.iterparse(input_task_xml_fn, events=("start", "end")):
+        if event == "start":
+            if element.tag == FORMAT.TASK.value:
+                task_progress = SUMMARY.PROGRESS_WIP.value
+                if element.get(FORMAT.PERCENTAGE_COMPLETE.value) == FORMAT.DONE_VALUE.value:
+                    task_progress = SUMMARY.PROGRESS_DONE.value
+                tasks[element.get(FORMAT.ID.value)] = {SUMMARY.TASK_NAME.value: element.get(FORMAT.SUBJECT.value),
+                                                       SUMMARY.PROGRESS.value: task_progress}
+                task_stack.append(element.get(FORMAT.ID.value))
+            elif element.tag == FORMAT.CATEGORY.value:
+                cat_name = "->".join(category_stack + [element.get(FORMAT.SUBJECT.value)])
+                category_parents[cat_name] = "->".join(category_stack) if category_stack else None
+                for task_id in element.get(FORMAT.CATEGORIZABLES.value, "").split():
+                    task_categories.setdefault(task_id, []).append(cat_name)
+                category_stack.append(element.get(FORMAT.SUBJECT.value))
+            continue
+
+        if element.tag == FORMAT.TASK.value:
+            task_stack.pop()
+        elif element.tag == FORMAT.CATEGORY.value:
+            category_stack.pop()
+        elif element.tag == FORMAT.EFFORT.value:
+            effort_id = element.get(FORMAT.ID.value)
+            start_val = element.get(FORMAT.START.value)
+            stop_val = element.get(FORMAT.STOP.value)
+            if start_val is None or stop_val is None:
+                raise TaskFormatError(f"An effort does not have a start or stop time. "
+                                      f"Make sure you are not currently running the time tracker. ")
+            effort_list.append((effort_id, task_stack[-1], start_val, stop_val))
+        # the elements are not needed any more
+        element.clear()
+
+    # the efforts are split into the days they span at once
+    cells, days = __get_cells_and_days(effort_list)
+
+    # the categories are known only at the end of the file, so the cells are split per category here
+    category_cells = {}
+    for (day, task_id), cell in cells.items():
+        for category in task_categories.get(task_id, [SPECIAL_CATEGORIES.MISSING.value]):
+            category_cells[CELL_SEP.join([day, task_id, category])] = cell
+
+    return {VERSION: PARTIAL_VERSION,
+            TASKS: tasks,
+            CATEGORY_PARENTS: category_parents,
+            CELLS: category_cells,
+            DAYS: days}
+
+
+def merge(partial: PARTIAL, other_partial: PARTIAL) -> PARTIAL:
+    """
+    Merge two partial aggregates into a new one (associative; an empty dict is the neutral element).
+
+    The cells with the same key are merged by their efforts (union of the effort ids), so that each effort is counted
+    once; the merge is commutative, too.
+    """
+
+    merged = {}
+    __merge_into(merged, partial)
+    __merge_into(merged, other_partial)
+
+    return merged
+
+
+def __merge_into(merged: PARTIAL, other_partial: PARTIAL) -> None:
+
+    if not other_partial:
+        return
+    if not merged:
+        merged.update({VERSION: PARTIAL_VERSION, TASKS: {}, CATEGORY_PARENTS: {}, CELLS: {}, DAYS: {}})
+
+    for task_id, task_infos in other_partial[TASKS].items():
+        if merged[TASKS].get(task_id, {}).get(SUMMARY.PROGRESS.value) == SUMMARY.PROGRESS_DONE.value:
+            task_infos = dict(task_infos, **{SUMMARY.PROGRESS.value: SUMMARY.PROGRESS_DONE.value})
+        merged[TASKS][task_id] = task_infos
+    merged[CATEGORY_PARENTS].update(other_partial[CATEGORY_PARENTS])
+
+    for key, other_cell in other_partial[CELLS].items():
+        cell = merged[CELLS].get(key)
+        if cell is None:
+            merged[CELLS][key] = other_cell
+            continue
+        efforts = dict(cell[EFFORTS])
+        for effort_id, seconds in other_cell[EFFORTS].items():
+            # an effort changed between the task-files: the longer version is taken, whatever the order
+            efforts[effort_id] = max(seconds, efforts.get(effort_id, seconds))
+        merged[CELLS][key] = __get_cell(efforts)
+
+    for day, (start_val, stop_val) in other_partial[DAYS].items():
+        bounds = merged[DAYS].get(day, [start_val, stop_val])
+        merged[DAYS][day] = [min(bounds[0], start_val), max(bounds[1], stop_val)]
+
+
+def read_partial(input_fn: str) -> PARTIAL:
+
+    with open(input_fn, encoding="utf-8") as f:
+        partial = json.load(f)
+    if partial.get(VERSION) != PARTIAL_VERSION:
+        raise TaskFormatError(f"NOT ASSUMED partial aggregate FORMAT in '{input_fn}' "
+                              f"(version {partial.get(VERSION)} instead of {PARTIAL_VERSION}): aggregate it again.")
+
+    return partial
+
+
+def write_partial(partial: PARTIAL, output_fn: str) -> None:
+
+    os.makedirs(os.path.realpath(os.path.dirname(output_fn)), exist_ok=True)
+    with open(output_fn, "w", encoding="utf-8") as f:
+        json.dump(partial, f)
+
+
+def __get_cells_and_days(effort_list):
+    """
+    :param effort_list: [(effort id, task id, start, stop)]
+    :return: cells {(day, task id): {SECONDS: ..., MINUTES: ..., EFFORTS: {effort id: seconds}}},
+        days {day: [start, stop]}
+    """
+
+    cells = {}
+    day_offsets = {}
+    if effort_list:
+        effort_ids, task_ids, start_vals, stop_vals = zip(*effort_list)
+        effort_indices, days, begin_offsets, end_offsets = split_efforts_by_day(to_seconds(start_vals),
+                                                                                to_seconds(stop_vals))
+        for effort_idx, day, begin_offset, end_offset in zip(effort_indices.tolist(), get_day_names(days).tolist(),
+                                                             begin_offsets.tolist(), end_offsets.tolist()):
+            cell_efforts = cells.setdefault((day, task_ids[effort_idx]), {})
+            cell_efforts[effort_ids[effort_idx]] = end_offset - begin_offset
+            bounds = day_offsets.setdefault(day, [begin_offset, end_offset])
+            bounds[0] = min(bounds[0], begin_offset)
+            bounds[1] = max(bounds[1], end_offset)
+
+    days = {day: [day + FORMAT.SPACE.value + format_offset(begin_offset),
+                  day + FORMAT.SPACE.value + format_offset(end_offset)]
+            for day, (begin_offset, end_offset) in day_offsets.items()}
+
+    return {key: __get_cell(cell_efforts) for key, cell_efforts in cells.items()}, days
+
+
+def __get_cell(efforts: Dict[str, int]) -> Dict:
+    """
+    :param efforts: {effort id: seconds of the effort in the cell}
+    :return: cell with the summed seconds and minutes (like in the summary: in whole minutes per effort and day)
+    """
+
+    return {SECONDS: sum(efforts.values()),
+            MINUTES: sum(seconds // 60 for seconds in efforts.values()),
+            EFFORTS: efforts}
+
+
+def __to_summary_input(partial: PARTIAL):
+    """
+    Convert a (merged) partial aggregate into the input structures of the summary tables.
+    """
+
+    task_dict = {}
+    # the categories are kept in the order of the task-files
+    category_dict = {category: [] for category in partial[CATEGORY_PARENTS]}
+    # a task with several categories (or with a category changed between the task-files) has a cell per category:
+    # the minutes of a task and day are counted from the union of the efforts of its cells
+    efforts_per_task_and_day = {}  # (day, task id) : effort id : seconds
+    for key, cell in partial[CELLS].items():
+        day, task_id, category = key.split(CELL_SEP, 2)
+        if task_id not in task_dict:
+            task_infos = partial[TASKS][task_id]
+            task_dict[task_id] = {SUMMARY.PROGRESS.value: task_infos[SUMMARY.PROGRESS.value],
+                                  SUMMARY.TASK_NAME.value: task_infos[SUMMARY.TASK_NAME.value],
+                                  SUMMARY.EFFORTS.value: {},  # the single efforts are not kept
+                                  SUMMARY.DURATIONS.value: {},  # day : minutes
+                                  SUMMARY.DESCRIPTION.value: ""}
+        category_task_ids = category_dict.setdefault(category, [])
+        if task_id not in category_task_ids:
+            category_task_ids.append(task_id)
+        efforts = efforts_per_task_and_day.setdefault((day, task_id), {})
+        for effort_id, seconds in cell[EFFORTS].items():
+            efforts[effort_id] = max(seconds, efforts.get(effort_id, seconds))
+    for (day, task_id), efforts in efforts_per_task_and_day.items():
+        task_dict[task_id][SUMMARY.DURATIONS.value][day] = __get_cell(efforts)[MINUTES]
+
+    offsets_per_day_dict = {day: {SUMMARY.START_TIME.value: start_val,
+                                  SUMMARY.STOP_TIME.value: stop_val,
+                                  SUMMARY.UNTRACKED.value: "(todo)"}  # TODO
+                            for day, (start_val, stop_val) in partial[DAYS].items()}
+
+    return category_dict, partial[CATEGORY_PARENTS], task_dict, offsets_per_day_dict
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+
+"""
+This script splits a long-running task-file into period partitions (per ISO week or per month), e.g. so that later
+summaries only read the partitions of the periods they need.
+- Each partition is a task-file with the whole task tree and the categories, but only the efforts started in its
+  period.
+- A manifest (.json) lists the periods with their first and last day, their partition file and their amount of
+  efforts.
+
+NOTE:
+- the task-file is read in a single streaming pass: the events outside of the efforts (the "skeleton" of the
+  task-file) are kept in memory, so that the partition of a period first seen late in the file can be caught up, and
+  the efforts are written directly into their partitions. At most MAX_OPEN_PARTITIONS partition files are open at
+  the same time: the partition used least recently is closed, and caught up with the skeleton when it is reopened
+  (or at the end of the task-file).
+- an effort belongs to the period of its start; an effort over the end of its period is not split (its days after
+  the period are in the summary of its partition).
+"""
+
+__author__ = "emm"
+__version__ = "20261019"
+
+
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+import io
+import json
+import os
+from typing import Dict, List, Union
+import xml.sax
+from xml.sax.handler import ContentHandler
+from xml.sax.saxutils import XMLGenerator
+
+from tcm_utils.__init__ import logger
+from tcm_utils.task_utils import FORMAT, PERIOD, FileExtensionError, TaskFormatError
+
+# typing aliases
+MANIFEST = Dict[str, Union[int, str, List[Dict]]]
+
+TSK_EXTENSION = ".tsk"
+MANIFEST_EXTENSION = ".json"
+OUTPUT_SUFFIX = "_partitions"
+MANIFEST_FN = "manifest" + MANIFEST_EXTENSION
+MANIFEST_VERSION = 1
+DAY_FORMAT = "%Y-%m-%d"
+MAX_OPEN_PARTITIONS = 64
+
+# manifest keys
+VERSION = "version"
+SOURCE = "source"
+PERIOD_TYPE = "period_type"
+PARTITIONS = "partitions"
+PERIOD_NAME = "period"
+FIRST_DAY = "first_day"
+LAST_DAY = "last_day"
+FILE = "file"
+EFFORTS = "efforts"
+
+
+def split_tasks(input_task_xml_fn: str, output_fn: Union[str, None],
+                period_type: str = PERIOD.WEEK.value) -> None:
+    """
+    :param input_task_xml_fn:
+    :param output_fn: manifest (.json); the partitions are written into its folder.
+        Default: manifest.json in the folder '<input_fn>_partitions' next to the input file.
+    :param period_type: task_utils.PERIOD
+    """
+
+    msg = f"The output file name extension should be '{MANIFEST_EXTENSION}'."
+    if not (output_fn is None or output_fn.endswith(MANIFEST_EXTENSION)):
+        raise FileExtensionError(msg)
+
+    if output_fn is None:
+        output_fn = os.path.join(os.path.splitext(input_task_xml_fn)[0] + OUTPUT_SUFFIX, MANIFEST_FN)
+    output_path = os.path.realpath(os.path.dirname(output_fn))
+    os.makedirs(output_path, exist_ok=True)
+
+    logger.info(f"SPLITTING '{input_task_xml_fn}' per {period_type}")
+    partition_prefix = os.path.join(output_path, os.path.basename(os.path.splitext(input_task_xml_fn)[0]) + "_")
+    handler = SplittingHandler(period_type, partition_prefix)
+    try:
+        xml.sax.parse(input_task_xml_fn, handler)
+    except xml.sax.SAXParseException as e:
+        raise TaskFormatError(f"NOT ASSUMED xml FORMAT: {e}") from e
+    finally:
+        handler.close()
+
+    manifest = {VERSION: MANIFEST_VERSION,
+                SOURCE: os.path.basename(input_task_xml_fn),
+                PERIOD_TYPE: period_type,
+                PARTITIONS: [{PERIOD_NAME: period,
+                              FIRST_DAY: first_day,
+                              LAST_DAY: last_day,
+                              FILE: os.path.basename(handler.partition_fns[period]),
+                              EFFORTS: handler.efforts[period]}
+                             for period, (first_day, last_day) in sorted(handler.period_days.items())]}
+    write_manifest(manifest, output_fn)
+    logger.info(f"- {len(manifest[PARTITIONS])} partitions, {sum(handler.efforts.values())} efforts")
+
+    logger.info("DONE. SEE partitions in '{}'.".format(output_fn))
+
+
+def get_partition_fns(manifest_fn: str, first_day: Union[str, None] = None,
+                      last_day: Union[str, None] = None) -> List[str]:
+    """
+    :param manifest_fn:
+    :param first_day: YYYY-MM-DD, default: no lower bound
+    :param last_day: YYYY-MM-DD, default: no upper bound
+    :return: file names of the partitions with efforts between the first and the last day (both inclusive)
+    """
+
+    manifest = read_manifest(manifest_fn)
+    manifest_path = os.path.dirname(manifest_fn)
+
+    return [os.path.join(manifest_path, partition[FILE]) for partition in manifest[PARTITIONS]
+            if (first_day is None or partition[LAST_DAY] >= first_day)
+            and (last_day is None or partition[FIRST_DAY] <= last_day)]
+
+
+def read_manifest(input_fn: str) -> MANIFEST:
+
+    with open(input_fn, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get(VERSION) != MANIFEST_VERSION:
+        raise TaskFormatError(f"NOT ASSUMED partition manifest FORMAT in '{input_fn}'.")
+
+    return manifest
+
+
+def write_manifest(manifest: MANIFEST, output_fn: str) -> None:
+
+    with open(output_fn, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+class PartitionFile(io.TextIOBase):
+    """
+    Text file of a partition which can be closed and reopened (appending) between the writes of its XMLGenerator.
+    """
+
+    def __init__(self, fn: str):
+        super().__init__()
+        self.fn = fn
+        self._file = open(fn, "w", encoding="utf-8")
+
+    def write(self, s: str) -> int:
+        return self._file.write(s)
+
+    def flush(self):
+        self._file.flush()
+
+    def is_open(self) -> bool:
+        return not self._file.closed
+
+    def reopen(self):
+        self._file = open(self.fn, "a", encoding="utf-8")
+
+    def close_file(self):
+        self._file.close()
+
+
+class SplittingHandler(ContentHandler):
+    """
+    SAX handler writing the partitions of a task-file while parsing.
+
+    The skeleton events (all events outside of the efforts) are written into all open partitions and recorded; the
+    events of an effort are written only into the partition of its period, which is opened (and caught up with the
+    recorded skeleton events) at its first effort. If more than MAX_OPEN_PARTITIONS partitions are open, the
+    partition used least recently is closed until its next effort.
+    """
+
+    def __init__(self, period_type: str, partition_prefix: str):
+        super().__init__()
+        self.period_type = period_type
+        self.partition_prefix = partition_prefix
+        self.partition_fns = {}  # period : file name
+        self.period_days = {}  # period : (first day, last day)
+        self.efforts = {}  # period : amount of efforts
+        self._skeleton = []  # recorded (XMLGenerator method name, arguments)
+        self._files = {}  # period : partition file
+        self._generators = {}  # period : XMLGenerator of the partition
+        self._open_periods = OrderedDict()  # periods of the open partitions, the one used least recently first
+        self._skeleton_positions = {}  # period : amount of skeleton events written into its closed partition
+        self._effort_generator = None  # XMLGenerator of the partition of the current effort
+        self._depth = 0  # depth of the current skeleton element
+        self._effort_depth = 0  # > 0 inside of an effort
+        self._pending_whitespace = ""  # written lazily, so that it can be written only into the partition of an effort
+
+    def close(self):
+        for f in self._files.values():
+            if f.is_open():
+                f.close_file()
+
+    def startDocument(self):
+        self._write_skeleton("startDocument")
+
+    def endDocument(self):
+        self._flush_whitespace()
+        self._write_skeleton("ignorableWhitespace", FORMAT.NL.value)
+        self._write_skeleton("endDocument")
+        # catch up the closed partitions, one at a time
+        for period in list(self._skeleton_positions):
+            self._use_partition(period)
+            self._close_partition(period)
+
+    def processingInstruction(self, target, data):
+        self._write_skeleton("processingInstruction", target, data)
+        if self._depth == 0:
+            self._write_skeleton("ignorableWhitespace", FORMAT.NL.value)
+
+    def startElement(self, name, attrs):
+        if self._effort_depth > 0:
+            self._effort_depth += 1
+            self._effort_generator.startElement(name, attrs)
+            return
+
+        if name == FORMAT.EFFORT.value:
+            start_val = attrs.get(FORMAT.START.value)
+            if start_val is None:
+                raise TaskFormatError(f"An effort does not have a start time.")
+            period = self._get_period(start_val.split(FORMAT.SPACE.value)[0])
+            self.efforts[period] += 1
+            self._effort_generator = self._generators[period]
+            self._effort_generator.ignorableWhitespace(self._pending_whitespace)
+            self._pending_whitespace = ""
+            self._effort_depth = 1
+            self._effort_generator.startElement(name, attrs)
+            return
+
+        self._flush_whitespace()
+        self._depth += 1
+        self._write_skeleton("startElement", name, dict(attrs))
+
+    def endElement(self, name):
+        if self._effort_depth > 0:
+            self._effort_depth -= 1
+            self._effort_generator.endElement(name)
+            return
+
+        self._flush_whitespace()
+        self._depth -= 1
+        self._write_skeleton("endElement", name)
+
+    def characters(self, content):
+        if self._effort_depth > 0:
+            self._effort_generator.characters(content)
+            return
+        if content.isspace():
+            self._pending_whitespace += content
+            return
+        self._flush_whitespace()
+        self._write_skeleton("characters", content)
+
+    def ignorableWhitespace(self, whitespace):
+        self.characters(whitespace)
+
+    def _flush_whitespace(self):
+        if self._pending_whitespace:
+            self._write_skeleton("ignorableWhitespace", self._pending_whitespace)
+            self._pending_whitespace = ""
+
+    def _write_skeleton(self, method: str, *args):
+        self._skeleton.append((method, args))
+        for period in self._open_periods:
+            getattr(self._generators[period], method)(*args)
+
+    def _get_period(self, day: str) -> str:
+        try:
+            day_date = datetime.strptime(day, DAY_FORMAT).date()
+        except ValueError as e:
+            raise TaskFormatError(f"NOT ASSUMED effort start FORMAT: '{day}'") from e
+        if self.period_type == PERIOD.MONTH.value:
+            period = f"{day_date.year:04d}-{day_date.month:02d}"
+        else:
+            iso_year, iso_week, _ = day_date.isocalendar()
+            period = f"{iso_year:04d}-W{iso_week:02d}"
+
+        if period not in self._generators:
+            self._open_partition(period, day_date)
+        else:
+            self._use_partition(period)
+        return period
+
+    def _open_partition(self, period: str, day_date: date):
+        if self.period_type == PERIOD.MONTH.value:
+            first_date = day_date.replace(day=1)
+            last_date = (first_date + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+        else:
+            first_date = day_date - timedelta(days=day_date.weekday())
+            last_date = first_date + timedelta(days=6)
+        self.period_days[period] = (first_date.isoformat(), last_date.isoformat())
+        self.efforts[period] = 0
+        self.partition_fns[period] = self.partition_prefix + period + TSK_EXTENSION
+
+        self._files[period] = PartitionFile(self.partition_fns[period])
+        self._generators[period] = XMLGenerator(self._files[period], encoding="utf-8", short_empty_elements=True)
+        # catch up with the skeleton of the task-file upto the current effort
+        self._skeleton_positions[period] = 0
+        self._use_partition(period)
+
+    def _use_partition(self, period: str):
+        if period in self._open_periods:
+            self._open_periods.move_to_end(period)
+            return
+
+        if len(self._open_periods) >= MAX_OPEN_PARTITIONS:
+            self._close_partition(next(iter(self._open_periods)))
+        if not self._files[period].is_open():
+            self._files[period].reopen()
+        generator = self._generators[period]
+        for method, args in self._skeleton[self._skeleton_positions.pop(period):]:
+            getattr(generator, method)(*args)
+        self._open_periods[period] = None
+
+    def _close_partition(self, period: str):
+        del self._open_periods[period]
+        self._skeleton_positions[period] = len(self._skeleton)
+        self._files[period].close_file()
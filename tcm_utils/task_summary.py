@@ -5,81 +5,308 @@ This script generates a daily-wise overview of the efforts for each task in the
 
 NOTE:
 - only efforts with a given category are considered --> Make sure that all task items with effort have a category assigned!
-- categories not considered as "work" are hard coded now in task_utils.NOWORK_CATEGORIES
+- categories not considered as "work" are hard coded now in task_utils.NOWORK_CATEGORIES; their subcategories are
+  not considered as "work", either
+- the task descriptions are included (and can be truncated)
+- per day, focus metrics (task switches, uninterrupted blocks, share of short efforts) are derived from the timeline
+- the task tree is kept (parent task per task): the durations of the subtasks are rolled up into their parent tasks
+  in one post-order pass, and the summary can be built at a chosen depth of the task hierarchy
+- efforts over midnight (or timers running for days) are split into the calendar days they span, for all efforts at
+  once (see task_days), both in the summary table and in the daily timelines
 
 """
 
 __author__ = "emm"
-__version__ = "20220206"  # "20200824" "20200621", "20200607"
+__version__ = "20261019"  # "20220206" "20200824" "20200621", "20200607"
 
 
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 import xml.dom.minidom as mdom
+import xml.etree.ElementTree as ET
+from xml.parsers.expat import ExpatError
 import os
 from pprint import pformat
-from datetime import datetime
-import time
+import tempfile
+import numpy as np
 import pandas as pd
-import sys
 
 from tcm_utils.__init__ import logger
-from tcm_utils.task_utils import IO, FORMAT, SUMMARY, SPECIAL_CATEGORIES, DAY, DAILY_EFFORTS
+from tcm_utils.task_days import DAY_SECONDS, format_offset, get_day_names, split_efforts_by_day, to_seconds
+from tcm_utils.task_utils import IO, FORMAT, SUMMARY, SPECIAL_CATEGORIES, \
+    FileExtensionError, NoEffortError, TaskFormatError
 from typing import List, Dict, Tuple, Union
 # typing aliases
 Document = mdom.Document
 LINES_WITH_AMOUNT_OF_CHANGES = Tuple[List[str], int]
 
+DAILY_EFFORT_COLUMNS = ['Day', 'Begin', 'End', 'Duration (min)', 'Warnings', 'Task name']
+# out-of-core summary: one spilled effort record = task index, begin and end second of the effort piece of the day
+SPILL_RECORD_TYPECODE = "i"
+SPILL_RECORD_LENGTH = 3
+SPILL_EXTENSION = ".bin"
+EFFORT_BATCH_SIZE = 4096  # out-of-core summary: the streamed efforts are split into days in batches of this size
+# daily timelines: one track record = begin second, end second from the day begin, duration (min), track type, task index
+TRACK_RECORD_LENGTH = 5
+TRACK_TRACKED, TRACK_TIME_CLASH, TRACK_NOT_TRACKED = range(3)
+TRACK_TYPES = ["", "TIME-CLASH", "<not tracked>"]  # warnings in the timeline
+DAYS_CHUNKS_PER_JOB = 4
+# daily focus metrics: uninterrupted blocks are consecutive efforts of the same task without any gap
+DAILY_METRICS_COLUMNS = ['Day', 'Tracked (min)', 'Task switches', 'Blocks', 'Mean block (min)', 'Median block (min)',
+                         'Longest block (min)', 'Short efforts (%)']
+SHORT_EFFORT_MINUTES = 15  # efforts shorter than this are counted as short efforts
+
 
 def summarize_tasks(input_task_xml_fn: str, output_fn: Union[str, None],
-                    output_extension=IO.CSV_EXTENSION.value) -> None:
+                    output_extension: Union[str, List[str]] = IO.CSV_EXTENSION.value,
+                    memory_cap: Union[float, None] = None,
+                    description_length: Union[int, None] = None, jobs: int = 1,
+                    depth: Union[int, None] = None, short_effort_minutes: int = SHORT_EFFORT_MINUTES) -> None:
+    """
+    :param input_task_xml_fn:
+    :param output_fn:
+    :param output_extension: extension of the output, or a list of extensions: the summary is computed once and
+        written into an output file per extension (e.g. [".csv", ".xlsx", ".parquet"]), named like the output file
+        with the extension replaced
+    :param memory_cap: if given (in MB), the summary is built out-of-core: the efforts are partitioned per day and
+        spilled into temporary files as soon as the buffered efforts exceed the memory cap, and the daily timelines
+        are built one day at a time.
+    :param description_length: if given, the task descriptions are truncated to this amount of characters
+        (0: no descriptions)
+    :param jobs: number of processes building the daily timelines (not in the out-of-core summary, which builds them
+        one day at a time)
+    :param depth: if given, the summary has one row per task up to this level of the task hierarchy (0: top-level
+        tasks), and the durations of deeper subtasks are rolled up into their ancestor on this level
+    :param short_effort_minutes: efforts shorter than this are counted as short efforts in the daily metrics
+    """
     
+    # the duplicate extensions are dropped, each output file is written once
+    output_extensions = [output_extension] if isinstance(output_extension, str) else \
+        list(dict.fromkeys(output_extension))
     msg = f"The output file name extension should be one of these values: '{list(map(lambda x: x.value, IO))}'."
     if not (output_fn is None or os.path.splitext(output_fn)[1] in list(map(lambda x: x.value, IO))):
-        logger.error(msg)
-        sys.exit(1)
+        raise FileExtensionError(msg)
+    if not set(output_extensions) <= OUTPUT_SINKS.keys():
+        raise FileExtensionError(msg)
+    
+    if output_fn is None:
+        output_fn = os.path.splitext(input_task_xml_fn)[0] + "_summary" + output_extensions[0]
+    else:
+        output_path = os.path.realpath(os.path.dirname(output_fn))
+        os.makedirs(output_path, exist_ok=True)
+    if isinstance(output_extension, str):
+        output_fns = [output_fn]
+    else:
+        output_fns = [os.path.splitext(output_fn)[0] + extension for extension in output_extensions]
+    
+    # the sinks are created before the summary is computed, e.g. a missing optional dependency is reported early
+    output_sinks = [OUTPUT_SINKS[extension](fn) for extension, fn in zip(output_extensions, output_fns)]
+    
+    if memory_cap is not None:
+        with tempfile.TemporaryDirectory() as spill_dir:
+            __summarize_tasks_out_of_core(input_task_xml_fn, output_sinks, memory_cap, spill_dir,
+                                          description_length, depth, short_effort_minutes)
+        return
     
     logger.info(f"READING doctree from '{input_task_xml_fn}'")
     doctree = __read_xml(input_task_xml_fn)
     
-    logger.info(f"GETTING CATEGORIES")
-    category_dict = __get_categories(doctree)
+    category_dict, category_parent_dict, task_dict = get_categories_and_tasks(doctree)
+    
+    logger.info("BUILDING SUMMARY TABLE")
+    task_summary_df, category_summary_df = build_summary_tables(category_dict, category_parent_dict, task_dict,
+                                                                description_length=description_length, depth=depth)
+    daily_metrics = []
+    daily_effort_summary_df_dict = build_daily_timelines(task_dict, jobs, daily_metrics=daily_metrics,
+                                                         short_effort_minutes=short_effort_minutes)
+    
+    output_fns = ", ".join(f"'{sink.output_fn}'" for sink in output_sinks)
+    logger.info(f"WRITING SUMMARY to {output_fns}")
+    write_outputs(task_summary_df, category_summary_df, sorted(daily_effort_summary_df_dict.items()), output_sinks,
+                  daily_metrics=daily_metrics)
+    
+    logger.info("DONE. SEE task summary in {}.".format(output_fns))
+
 
+def __summarize_tasks_out_of_core(input_task_xml_fn: str, output_sinks: List, memory_cap: float, spill_dir: str,
+                                  description_length: Union[int, None], depth: Union[int, None],
+                                  short_effort_minutes: int) -> None:
+    
+    logger.info(f"READING efforts from '{input_task_xml_fn}' (out-of-core, memory cap: {memory_cap} MB)")
+    category_dict, category_parent_dict, task_dict, task_ids, offsets_per_day_dict, effort_buffers = \
+        __stream_and_spill_efforts(input_task_xml_fn, spill_dir, int(memory_cap * 1024 * 1024), description_length,
+                                   depth)
+    
+    logger.info("BUILDING SUMMARY TABLE")
+    task_summary_df, category_summary_df = build_summary_tables(category_dict, category_parent_dict, task_dict,
+                                                                offsets_per_day_dict=offsets_per_day_dict,
+                                                                description_length=description_length, depth=depth)
+    
+    # the daily timelines (and metrics) are built one day partition at a time while writing
+    daily_metrics = []
+    daily_effort_summary_dfs = __iter_spilled_daily_effort_summary(sorted(offsets_per_day_dict), task_dict, task_ids,
+                                                                   effort_buffers, spill_dir, daily_metrics,
+                                                                   short_effort_minutes)
+    
+    output_fns = ", ".join(f"'{sink.output_fn}'" for sink in output_sinks)
+    logger.info(f"WRITING SUMMARY to {output_fns}")
+    write_outputs(task_summary_df, category_summary_df, daily_effort_summary_dfs, output_sinks,
+                  daily_metrics=daily_metrics)
+    
+    logger.info("DONE. SEE task summary in {}.".format(output_fns))
+
+
+def get_categories_and_tasks(doctree: Document) -> Tuple[Dict[str, List[str]], Dict[str, Union[str, None]], Dict]:
+    """
+    :param doctree:
+    :return: category dict {category: task ids}, category parent dict {category: parent category or None},
+        task dict {task id: task infos with efforts and durations per day}
+    """
+    
+    logger.info(f"GETTING CATEGORIES")
+    category_dict, category_parent_dict = __get_categories(doctree)
+    
     logger.info("GETTING EFFORTS")
     task_dict = __get_efforts(doctree)
     
-    # if no efforts found, quit
-    if not __check_effort_presence(task_dict):
-        sys.exit(logger.warning("NO EFFORT detected -> quit."))
+    return category_dict, category_parent_dict, task_dict
+
+
+def build_summary_tables(category_dict, category_parent_dict, task_dict,
+                         offsets_per_day_dict=None, description_length=None,
+                         depth=None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    :param offsets_per_day_dict: start and stop time per day, if the efforts are not given in the task dict
+    :param description_length: if given, the task descriptions are truncated to this amount of characters
+    :param depth: if given, the per-task summary is built on this level of the task hierarchy (see rollup_tasks)
+    :return: per-task summary table, per-category summary table
+    :raise NoEffortError: if there is no effort in the tasks
+    """
     
-    # assign a "missing" category to tasks which have no one assigned
-    category_dict = __complete_category_dict(category_dict, task_dict)
+    if not (offsets_per_day_dict if offsets_per_day_dict is not None else __check_effort_presence(task_dict)):
+        raise NoEffortError("NO EFFORT detected")
     
-    logger.info("BUILDING SUMMARY TABLE")
-    task_summary_df = __build_summary_df(category_dict, task_dict)
-    daily_effort_summary_df_dict = __build_daily_effort_summary(task_dict)
+    # assign a "missing" category to tasks which have no one assigned (the given category dict is not changed)
+    category_dict = __complete_category_dict(dict(category_dict), task_dict)
     
-    if output_fn is None:
-        output_fn = os.path.splitext(input_task_xml_fn)[0] + "_summary" + output_extension
-    else:
-        output_path = os.path.realpath(os.path.dirname(output_fn))
-        os.makedirs(output_path, exist_ok=True)
+    category_ancestor_dict = __get_category_ancestors(category_parent_dict)
+    
+    if offsets_per_day_dict is None:
+        offsets_per_day_dict = __get_offsets_per_day(task_dict)
+    summary_task_dict = task_dict if depth is None else \
+        rollup_tasks(task_dict, depth, __get_task_types(category_dict, category_ancestor_dict))
+    
+    task_summary_df = __build_summary_df(category_dict, summary_task_dict, category_ancestor_dict,
+                                         offsets_per_day_dict=offsets_per_day_dict,
+                                         description_length=description_length, depth=depth)
+    category_summary_df = __build_category_summary_df(category_dict, task_dict, category_ancestor_dict)
     
-    logger.info(f"WRITING SUMMARY to '{output_fn}'")
+    return task_summary_df, category_summary_df
 
-    if output_extension == IO.CSV_EXTENSION.value:
-        __write_summary(task_summary_df, output_fn, mode="w")
-        for day, df in sorted(daily_effort_summary_df_dict.items()):
-            __write_summary(df, output_fn, mode="a")
-            
-    elif output_extension == IO.XLSX_EXTENSION.value:
-        __write_multi_sheet_summary(task_summary_df, daily_effort_summary_df_dict, output_fn)
+
+def rollup_task_durations(task_dict) -> Dict[str, Dict[str, int]]:
+    """
+    Aggregate the inclusive durations per day (the durations of the task and all its subtasks); the exclusive
+    durations of a task are its SUMMARY.DURATIONS. The task dict is not changed.
     
-    logger.info("DONE. SEE task summary in '{}'.".format(output_fn))
+    The task dict is in document order, i.e. each parent task precedes its subtasks, so the reversed task dict is
+    a post-order of the task tree: the durations are aggregated in one pass, linearly in the number of tasks.
+    
+    :return: {task id: {day: minutes of the task and all its subtasks}}
+    """
+    
+    inclusive_durations = {task_id: dict(task_infos[SUMMARY.DURATIONS.value])
+                           for task_id, task_infos in task_dict.items()}
+    
+    for task_id, task_infos in reversed(list(task_dict.items())):
+        parent_id = task_infos[SUMMARY.PARENT.value]
+        if parent_id is None:
+            continue
+        parent_durations = inclusive_durations[parent_id]
+        for day, minutes in inclusive_durations[task_id].items():
+            parent_durations[day] = parent_durations.get(day, 0) + minutes
+    
+    return inclusive_durations
+
+
+def rollup_tasks(task_dict, depth: int, task_types: Union[Dict[str, Dict[str, List[str]]], None] = None) -> Dict:
+    """
+    :param depth: level of the task hierarchy (0: top-level tasks)
+    :param task_types: if given, {task id: {category type: categories of the task with this type}}; the durations of
+        the tasks on the given level are rolled up per category type, too (SUMMARY.TYPE_DURATIONS and
+        SUMMARY.TYPE_CATEGORIES), so that the time of e.g. a 'not working' subtask is kept apart from the time of its
+        'working' ancestor; like in the summary rows, the durations of a task are counted once per category
+    :return: task dict of the tasks up to the given level, whereby the durations of the tasks on this level are their
+        inclusive durations (with all their subtasks), and the durations of the tasks above are their own durations,
+        i.e. each effort is counted exactly once; the task infos get the task path, the own duration and the inclusive
+        durations (SUMMARY.INCLUSIVE_DURATIONS), too. The given task dict is not changed.
+    """
+    
+    inclusive_durations = rollup_task_durations(task_dict)
+    
+    rolled_task_dict = {}
+    depth_ancestors = {}  # task id : id of its ancestor on the given level (or itself)
+    for task_id, task_infos in task_dict.items():
+        level = task_infos[SUMMARY.TASK_LEVEL.value]
+        if level >= depth and task_types is not None:
+            ancestor_id = task_id if level == depth else depth_ancestors[task_infos[SUMMARY.PARENT.value]]
+            depth_ancestors[task_id] = ancestor_id
+            if level > depth:
+                __add_type_durations(rolled_task_dict[ancestor_id], task_infos, task_types.get(task_id, {}))
+        if level > depth:
+            continue
+        parent_id = task_infos[SUMMARY.PARENT.value]
+        task_path = task_infos[SUMMARY.TASK_NAME.value] if parent_id is None else \
+            rolled_task_dict[parent_id][SUMMARY.TASK_PATH.value] + "->" + task_infos[SUMMARY.TASK_NAME.value]
+        
+        rolled_task_infos = dict(task_infos)
+        rolled_task_infos[SUMMARY.INCLUSIVE_DURATIONS.value] = inclusive_durations[task_id]
+        if level == depth:
+            rolled_task_infos[SUMMARY.DURATIONS.value] = inclusive_durations[task_id]
+        rolled_task_infos[SUMMARY.TASK_PATH.value] = task_path
+        rolled_task_infos[SUMMARY.OWN_DURATION.value] = sum(task_infos[SUMMARY.DURATIONS.value].values())
+        if level == depth and task_types is not None:
+            rolled_task_infos[SUMMARY.TYPE_DURATIONS.value] = {}
+            rolled_task_infos[SUMMARY.TYPE_CATEGORIES.value] = {}
+            __add_type_durations(rolled_task_infos, task_infos, task_types.get(task_id, {}))
+        rolled_task_dict[task_id] = rolled_task_infos
     
+    return rolled_task_dict
+
+
+def __add_type_durations(rolled_task_infos, task_infos, types):
+    
+    for category_type, categories in types.items():
+        type_durations = rolled_task_infos[SUMMARY.TYPE_DURATIONS.value].setdefault(category_type, {})
+        for day, minutes in task_infos[SUMMARY.DURATIONS.value].items():
+            type_durations[day] = type_durations.get(day, 0) + minutes * len(categories)
+        type_categories = rolled_task_infos[SUMMARY.TYPE_CATEGORIES.value].setdefault(category_type, [])
+        type_categories.extend(category for category in categories if category not in type_categories)
+
+
+def build_daily_timelines(task_dict, jobs: int = 1, daily_metrics: Union[List, None] = None,
+                          short_effort_minutes: int = SHORT_EFFORT_MINUTES) -> Dict[str, pd.DataFrame]:
+    """
+    :param jobs: number of processes building the timelines of the days
+    :param daily_metrics: if given, the focus metrics of each day (DAILY_METRICS_COLUMNS) are appended to this list,
+        from the same track records as the timelines
+    :param short_effort_minutes: efforts shorter than this are counted as short efforts in the daily metrics
+    :return: {day: timeline of the tracked and untracked durations of the day}
+    :raise NoEffortError: if there is no effort in the tasks
+    """
+    
+    if not __check_effort_presence(task_dict):
+        raise NoEffortError("NO EFFORT detected")
+    
+    return __build_daily_effort_summary(task_dict, jobs, daily_metrics, short_effort_minutes)
 
 
 def __read_xml(input_fn: str) -> Document:
     
-    tree = mdom.parse(input_fn)
+    try:
+        tree = mdom.parse(input_fn)
+    except ExpatError as e:
+        raise TaskFormatError(f"NOT ASSUMED xml FORMAT: {e}") from e
     return tree
 
 
@@ -100,31 +327,37 @@ def __get_categories(doctree:Document):
     root = doctree.documentElement
 
     category_dict = {}  # key: category subject, value: list of task-ids for that category
+    category_parent_dict = {}  # key: category subject, value: subject of the parent category or None
 
     for element in root.childNodes:
         if element.nodeType == mdom.Node.ELEMENT_NODE:
             if element.tagName == FORMAT.CATEGORY.value:
-                __get_category_info_rec(element, parent_names=[], concatenator="->", category_dict=category_dict)
+                __get_category_info_rec(element, parent_names=[], concatenator="->", category_dict=category_dict,
+                                        category_parent_dict=category_parent_dict)
     
     logger.debug(f"CATEGORY_DICT:\n{pformat(category_dict, indent=2, compact=False)}")
-    return category_dict
+    return category_dict, category_parent_dict
 
 
 def __get_efforts(doctree):
     root = doctree.documentElement
     
     task_dict = {}
+    effort_list = []  # (task id, start, stop) of all efforts
     
     for element in root.childNodes:
         if element.nodeType == mdom.Node.ELEMENT_NODE:
             if element.tagName == FORMAT.TASK.value:
-                __get_task_info_rec(element, current_task_id=None, task_dict=task_dict)
+                __get_task_info_rec(element, current_task_id=None, task_dict=task_dict, effort_list=effort_list)
+    
+    # the durations per day of all efforts are computed at once
+    __add_effort_durations(task_dict, effort_list)
     
     logger.debug(f"TASK_DICT:\n{pformat(task_dict, indent=2, compact=False)}")
     return task_dict
 
 
-def __get_task_info_rec(current_task_node, current_task_id=None, task_dict={}):
+def __get_task_info_rec(current_task_node, current_task_id=None, task_dict={}, effort_list=None):
     """
     <task creationDateTime="2020-05-24 17:53:51.714000" expandedContexts="('taskviewer',)" id="c386441e-9dd6-11ea-96ca-7cb27d86f5b4" modificationDateTime="2020-05-29 11:44:24.750000" status="1" subject="SHI">
         <task actualstartdate="2020-05-27 09:36:13" creationDateTime="2020-05-27 09:13:22.096000" id="8c75fb00-9fe9-11ea-b5b5-7cb27d86f5b4" modificationDateTime="2020-05-27 09:36:13.670000" status="1" subject="20200525-results SHfirst">
@@ -135,8 +368,9 @@ def __get_task_info_rec(current_task_node, current_task_id=None, task_dict={}):
         </task>
     </task>
     :param current_task_node:
-    :param parent_names:
+    :param current_task_id: id of the parent task of the current node (None on top level)
     :param task_dict:
+    :param effort_list: if given, (task id, start, stop) of each effort is appended, e.g. to compute the durations
     :return:
     """
     if current_task_node.nodeType != mdom.Node.ELEMENT_NODE:
@@ -149,7 +383,7 @@ def __get_task_info_rec(current_task_node, current_task_id=None, task_dict={}):
         task_progress = SUMMARY.PROGRESS_WIP.value
         
         if not current_task_node.hasAttributes():
-            raise ValueError(f"Node '{current_task_node}' doesn't have any attributes")
+            raise TaskFormatError(f"Node '{current_task_node}' doesn't have any attributes")
         
         curr_attributes = current_task_node.attributes  # xml.dom.minidom.NamedNodeMap
         for attname, attval in curr_attributes.items():
@@ -165,19 +399,23 @@ def __get_task_info_rec(current_task_node, current_task_id=None, task_dict={}):
                               SUMMARY.TASK_NAME.value : task_subject,
                               SUMMARY.EFFORTS.value : {},  # day : start : stop
                               SUMMARY.DURATIONS.value : {},  # day : minutes
-                              SUMMARY.DESCRIPTION.value: ""}
+                              SUMMARY.DESCRIPTION.value: "",
+                              SUMMARY.PARENT.value: current_task_id,
+                              SUMMARY.TASK_LEVEL.value: 0 if current_task_id is None
+                              else task_dict[current_task_id][SUMMARY.TASK_LEVEL.value] + 1}
         
         if current_task_node.hasChildNodes():
             for child_node in current_task_node.childNodes:
                 
                 __get_task_info_rec(child_node,
                                     current_task_id=task_id,
-                                    task_dict=task_dict)
+                                    task_dict=task_dict,
+                                    effort_list=effort_list)
     
     elif current_task_node.tagName == FORMAT.EFFORT.value:
         # <effort id="ff5785f0-a190-11ea-8a28-7cb27d86f5b4" start="2020-05-29 11:44:10" status="1" stop="2020-05-29 11:50:22" />
         if not current_task_node.hasAttributes():
-            raise ValueError(f"Node '{current_task_node}' doesn't have any attributes")
+            raise TaskFormatError(f"Node '{current_task_node}' doesn't have any attributes")
 
         curr_attributes = current_task_node.attributes  # xml.dom.minidom.NamedNodeMap
         start_val = None
@@ -187,51 +425,75 @@ def __get_task_info_rec(current_task_node, current_task_id=None, task_dict={}):
                 start_val = attval
             elif attname == FORMAT.STOP.value:
                 stop_val = attval
-        assert start_val != None
-        assert stop_val != None, f"An effort does not have a stop time. " \
-                                 f"Make sure you are not currently running the time tracker. "
+        if start_val is None:
+            raise TaskFormatError(f"An effort does not have a start time.")
+        if stop_val is None:
+            raise TaskFormatError(f"An effort does not have a stop time. "
+                                  f"Make sure you are not currently running the time tracker. ")
         
-        day_dict = __get_effort_time(start_val, stop_val)
-        for day, minutes in day_dict.items():
-            task_dict[current_task_id][SUMMARY.DURATIONS.value].setdefault(day, 0)
-            task_dict[current_task_id][SUMMARY.DURATIONS.value][day] += minutes
-            
-            task_dict[current_task_id][SUMMARY.EFFORTS.value].setdefault(day, {})
-            task_dict[current_task_id][SUMMARY.EFFORTS.value][day][start_val] = stop_val
+        # the efforts are kept per start day; the durations are added per day spanned (see __add_effort_durations)
+        start_day = start_val.split(FORMAT.SPACE.value)[0]
+        task_dict[current_task_id][SUMMARY.EFFORTS.value].setdefault(start_day, {})
+        task_dict[current_task_id][SUMMARY.EFFORTS.value][start_day][start_val] = stop_val
+        if effort_list is not None:
+            effort_list.append((current_task_id, start_val, stop_val))
+    
+    elif current_task_node.tagName == FORMAT.DESCRIPTION.value:
+        task_dict[current_task_id][SUMMARY.DESCRIPTION.value] = "".join(
+            node.data for node in current_task_node.childNodes
+            if node.nodeType in (mdom.Node.TEXT_NODE, mdom.Node.CDATA_SECTION_NODE)).strip()
         
         
-def __get_effort_time(start_val:str, stop_val:str) -> Dict[str, int]:
-    """NOTE that for now, only the effort on the first day is considered. E.g., if you are working over night, only the part of the effort until midnight is counted.
+def __add_effort_durations(task_dict, effort_list) -> None:
+    """
+    Add the durations per day of all efforts at once: each effort is split into the days it spans, and the duration of
+    each part is counted in whole minutes on its day.
     
-    :param start_val:
-    :param stop_val:
-    :return:
+    :param effort_list: [(task id, start, stop)]
     """
-    # start="2020-05-29 11:44:10"
-    # stop="2020-05-29 11:50:22"
-    # https://stackoverflow.com/questions/2788871/date-difference-in-minutes-in-python
     
+    if not effort_list:
+        return
     
-    start_day = start_val.split(FORMAT.SPACE.value)[0]
-    stop_day = stop_val.split(FORMAT.SPACE.value)[0]
-    if start_day != stop_day:
-        logger.warning(f"Effort done over multiple days ({start_val} -> {stop_val})! "
-                       f"Only the part upto midnight of the first day will be considered!")
-        stop_val = start_day + FORMAT.SPACE.value + DAY.END.value
+    task_ids, start_vals, stop_vals = zip(*effort_list)
+    effort_indices, days, begin_offsets, end_offsets = split_efforts_by_day(to_seconds(start_vals),
+                                                                            to_seconds(stop_vals))
+    __log_multi_day_efforts(__count_multi_day_efforts(effort_indices))
     
+    task_indices = {task_id: task_idx for task_idx, task_id in enumerate(task_dict)}
+    effort_task_indices = np.array([task_indices[task_id] for task_id in task_ids], dtype=np.int64)
+    task_ids = list(task_dict)
+    for task_idx, day, minutes in __sum_minutes_per_task_and_day(effort_task_indices[effort_indices], days,
+                                                                 begin_offsets, end_offsets):
+        durations = task_dict[task_ids[task_idx]][SUMMARY.DURATIONS.value]
+        durations[day] = durations.get(day, 0) + minutes
 
-    fmt = '%Y-%m-%d %H:%M:%S'
-    d1 = datetime.strptime(start_val, fmt)
-    d2 = datetime.strptime(stop_val, fmt)
-    
-    # Convert to Unix timestamp
-    d1_ts = time.mktime(d1.timetuple())
-    d2_ts = time.mktime(d2.timetuple())
 
-    # They are now in seconds, subtract and then divide by 60 to get minutes.
-    effort_in_minutes = int(d2_ts - d1_ts) // 60
+def __sum_minutes_per_task_and_day(task_indices: np.ndarray, days: np.ndarray, begin_offsets: np.ndarray,
+                                   end_offsets: np.ndarray) -> List[Tuple[int, str, int]]:
+    """
+    :param task_indices: task index per effort piece
+    :param days: day per effort piece (see task_days.split_efforts_by_day)
+    :return: [(task index, day, minutes)], whereby each effort piece is counted in whole minutes
+    """
+    
+    minutes = (end_offsets - begin_offsets) // 60
+    first_day = days.min()
+    day_count = days.max() - first_day + 1
+    cell_keys, cell_indices = np.unique(task_indices * day_count + (days - first_day), return_inverse=True)
+    cell_minutes = np.bincount(cell_indices, weights=minutes).astype(np.int64)
+    cell_task_indices, cell_days = np.divmod(cell_keys, day_count)
     
-    return {start_day : effort_in_minutes}
+    return list(zip(cell_task_indices.tolist(), get_day_names(cell_days + first_day).tolist(), cell_minutes.tolist()))
+
+
+def __count_multi_day_efforts(effort_indices: np.ndarray) -> int:
+    return int(np.count_nonzero(np.bincount(effort_indices) > 1))
+
+
+def __log_multi_day_efforts(multi_day_efforts: int) -> None:
+    if multi_day_efforts:
+        logger.info(f"- {multi_day_efforts} efforts over midnight are split into the days they span.")
 
 
 def __check_effort_presence(task_dict):
@@ -240,11 +502,6 @@ def __check_effort_presence(task_dict):
             return True
     return False
 
-def __get_effort_duration(start_val:str, stop_val:str) -> int:
-    
-    duration = tuple(__get_effort_time(start_val, stop_val).items())[0][1]
-    return duration
-
 def __complete_category_dict(category_dict, task_dict):
     
     categories = [value for values in category_dict.values() for value in values]
@@ -261,7 +518,8 @@ def __complete_category_dict(category_dict, task_dict):
 def __get_category_info_rec(current_category_node,
                             parent_names=[],
                             concatenator="->",
-                            category_dict={}):
+                            category_dict={},
+                            category_parent_dict={}):
     
     if current_category_node.nodeType != mdom.Node.ELEMENT_NODE:
         return
@@ -269,7 +527,7 @@ def __get_category_info_rec(current_category_node,
     cat_name = None
     task_ids = []
     if not current_category_node.hasAttributes():
-        raise ValueError(f"Node '{current_category_node}' doesn't have any attributes")
+        raise TaskFormatError(f"Node '{current_category_node}' doesn't have any attributes")
     
     curr_attributes = current_category_node.attributes  # xml.dom.minidom.NamedNodeMap
     for attname, attval in curr_attributes.items():
@@ -278,14 +536,60 @@ def __get_category_info_rec(current_category_node,
         if attname == FORMAT.SUBJECT.value:
             cat_name = concatenator.join(parent_names + [attval])
     category_dict[cat_name] = task_ids
+    category_parent_dict[cat_name] = concatenator.join(parent_names) if parent_names else None
     
     if current_category_node.hasChildNodes():
-        parent_names.append(cat_name)
+        child_parent_names = parent_names + [curr_attributes[FORMAT.SUBJECT.value].value]
         for child_node in current_category_node.childNodes:
             __get_category_info_rec(child_node,
-                                    parent_names=parent_names,
+                                    parent_names=child_parent_names,
                                     concatenator=concatenator,
-                                    category_dict=category_dict)
+                                    category_dict=category_dict,
+                                    category_parent_dict=category_parent_dict)
+
+
+def __get_category_ancestors(category_parent_dict: Dict[str, Union[str, None]]) -> Dict[str, frozenset]:
+    """
+    Precompute the ancestor set (including the category itself) of each category in the category tree.
+    
+    :param category_parent_dict: {category: parent category or None}
+    :return: {category: frozenset of the category and all its ancestors}
+    """
+    
+    category_ancestor_dict = {}
+    
+    def get_ancestors(category):
+        if category not in category_ancestor_dict:
+            parent = category_parent_dict.get(category)
+            ancestors = {category} if parent is None else {category} | get_ancestors(parent)
+            category_ancestor_dict[category] = frozenset(ancestors)
+        return category_ancestor_dict[category]
+    
+    for category in category_parent_dict:
+        get_ancestors(category)
+    
+    return category_ancestor_dict
+
+
+def __get_task_types(category_dict, category_ancestor_dict,
+                     nowork_categories=SPECIAL_CATEGORIES.NOWORK_CATEGORIES.value) -> Dict[str, Dict[str, List[str]]]:
+    
+    task_types = {}  # task id : category type : categories of the task with this type
+    for category, task_id_list in category_dict.items():
+        if category == SPECIAL_CATEGORIES.RECURRING.value:
+            continue
+        category_type = __get_category_type(category, category_ancestor_dict, nowork_categories)
+        for task_id in task_id_list:
+            task_types.setdefault(task_id, {}).setdefault(category_type, []).append(category)
+    
+    return task_types
+
+
+def __get_category_type(category, category_ancestor_dict, nowork_categories):
+    # the category type is inherited from the ancestors, e.g. a subcategory of a "not working" category is not working
+    ancestors = category_ancestor_dict.get(category, frozenset([category]))
+    return SUMMARY.NO_WORK.value if ancestors & set(nowork_categories) else SUMMARY.WORK.value
+
 
 def __get_days(task_dict):
     
@@ -350,83 +654,144 @@ def __cmp_datum(datum, saved_datum):
 
 def __get_offsets_per_day(task_dict):
     
-    days = sorted(list(__get_days(task_dict)))
+    start_vals = []
+    stop_vals = []
+    for task_id, task_info_dict in task_dict.items():
+        for start2stop_dict in task_info_dict[SUMMARY.EFFORTS.value].values():
+            start_vals.extend(start2stop_dict.keys())
+            stop_vals.extend(start2stop_dict.values())
     
-    offsets_per_day_dict = {day: {SUMMARY.START_TIME.value:None,
-                                  SUMMARY.STOP_TIME.value:None,
-                                  SUMMARY.UNTRACKED.value:"(todo)"  # TODO
-                                  } for day in days}
+    _, days, begin_offsets, end_offsets = split_efforts_by_day(to_seconds(start_vals), to_seconds(stop_vals))
+    return __format_offsets_per_day(__get_day_offsets(days, begin_offsets, end_offsets))
+
+
+def __get_day_offsets(days: np.ndarray, begin_offsets: np.ndarray, end_offsets: np.ndarray,
+                      day_offsets: Union[Dict[str, List[int]], None] = None) -> Dict[str, List[int]]:
+    """
+    :param days: day per effort piece (see task_days.split_efforts_by_day)
+    :param day_offsets: if given, it is updated with the given effort pieces
+    :return: {day: [first begin second, last end second from the day begin]}
+    """
     
-    for task_id, task_info_dict in task_dict.items():
-        for day, start2stop_dict in task_info_dict[SUMMARY.EFFORTS.value].items():
-            for start, stop in start2stop_dict.items():
-                saved_start = offsets_per_day_dict[day][SUMMARY.START_TIME.value]
-                saved_stop = offsets_per_day_dict[day][SUMMARY.STOP_TIME.value]
-                
-                if __is_earlier(start, saved_start):
-                    offsets_per_day_dict[day][SUMMARY.START_TIME.value] = start
-                if __is_later(stop, saved_stop):
-                    offsets_per_day_dict[day][SUMMARY.STOP_TIME.value] = stop
+    if day_offsets is None:
+        day_offsets = {}
+    day_values, day_indices = np.unique(days, return_inverse=True)
+    first_begins = np.full(len(day_values), np.iinfo(np.int64).max)
+    np.minimum.at(first_begins, day_indices, begin_offsets)
+    last_ends = np.full(len(day_values), np.iinfo(np.int64).min)
+    np.maximum.at(last_ends, day_indices, end_offsets)
     
-    return offsets_per_day_dict
+    for day, first_begin, last_end in zip(get_day_names(day_values).tolist(), first_begins.tolist(),
+                                          last_ends.tolist()):
+        offsets = day_offsets.setdefault(day, [first_begin, last_end])
+        offsets[0] = min(offsets[0], first_begin)
+        offsets[1] = max(offsets[1], last_end)
+    
+    return day_offsets
+
+
+def __format_offsets_per_day(day_offsets: Dict[str, List[int]]):
+    
+    return {day: {SUMMARY.START_TIME.value: day + FORMAT.SPACE.value + format_offset(first_begin),
+                  SUMMARY.STOP_TIME.value: day + FORMAT.SPACE.value + format_offset(last_end),
+                  SUMMARY.UNTRACKED.value: "(todo)"  # TODO
+                  } for day, (first_begin, last_end) in sorted(day_offsets.items())}
     
 
 def __build_summary_df(category_dict,
                        task_dict,
+                       category_ancestor_dict,
                        nowork_categories=SPECIAL_CATEGORIES.NOWORK_CATEGORIES.value,
-                       drop_task_without_effort=True) -> pd.DataFrame:
+                       drop_task_without_effort=True,
+                       offsets_per_day_dict=None,
+                       description_length=None,
+                       depth=None) -> pd.DataFrame:
 
     days = sorted(list(__get_days(task_dict)))
     item_list = []
 
+    def append_item(task_effort_dict, label, all_categories, duration_per_day_dict, own_duration=None):
+        if drop_task_without_effort:
+            if not duration_per_day_dict:
+                return
+        task_name = task_effort_dict[SUMMARY.TASK_NAME.value]
+        progress = task_effort_dict[SUMMARY.PROGRESS.value]
+        description = __get_description(task_effort_dict, description_length)
+
+        item = {
+            SUMMARY.CATEGORY_TYPE.value : label,
+            # SUMMARY.CATEGORY.value : category,
+            SUMMARY.CATEGORY.value : all_categories,
+            SUMMARY.TASK_NAME.value : task_name,
+            SUMMARY.PROGRESS.value : progress,
+            SUMMARY.DESCRIPTION.value : description
+        }
+        if depth is not None:
+            item[SUMMARY.TASK_PATH.value] = task_effort_dict[SUMMARY.TASK_PATH.value]
+
+        # overall duration
+        overall_duration = 0
+
+        # per-day duration
+        for day in days:
+            duration = 0
+            if day in duration_per_day_dict:
+                duration = duration_per_day_dict[day]
+                # if the user accidentally set an effort end time before the effort start time,
+                # the duration will be negative
+                if duration < 0:
+                    logger.warning(f"Negative duration for task '{task_name}': {duration} minutes")
+                    logger.warning(f"{task_effort_dict}")
+                overall_duration += duration
+            item[day] = duration
+        item[SUMMARY.OVERALL_DURATION.value] = overall_duration
+        if depth is not None:
+            item[SUMMARY.OWN_DURATION.value] = own_duration
+
+        item_list.append(item)
+
+    def append_type_items(task_effort_dict, own_types):
+        # one row per category type of a rolled up task, e.g. for its 'not working' subtasks
+        type_durations = task_effort_dict[SUMMARY.TYPE_DURATIONS.value]
+        for category_type in sorted(type_durations, key=lambda category_type: (category_type not in own_types,
+                                                                                category_type)):
+            append_item(task_effort_dict, category_type,
+                        ",".join(task_effort_dict[SUMMARY.TYPE_CATEGORIES.value][category_type]),
+                        type_durations[category_type],
+                        task_effort_dict[SUMMARY.OWN_DURATION.value] if category_type in own_types else 0)
+
+    rolled_up_task_ids = {task_id for task_id, task_infos in task_dict.items()
+                          if SUMMARY.TYPE_DURATIONS.value in task_infos}
     for category, task_id_list in category_dict.items():
         # ignore item with category 'recurring', since it additionally lists the tasks
         if category == SPECIAL_CATEGORIES.RECURRING.value:
             continue
-        label = SUMMARY.NO_WORK.value if category in nowork_categories else SUMMARY.WORK.value
+        label = __get_category_type(category, category_ancestor_dict, nowork_categories)
 
         for task_id in task_id_list:
+            # a category can refer to tasks which are not in the file (any more), e.g. in cleaned or archived files
+            if task_id not in task_dict:
+                continue
             task_effort_dict = task_dict[task_id]
-            if drop_task_without_effort:
-                if not task_effort_dict[SUMMARY.DURATIONS.value]:
-                    continue
-            task_name = task_effort_dict[SUMMARY.TASK_NAME.value]
-            duration_per_day_dict = task_effort_dict[SUMMARY.DURATIONS.value]
-            progress = task_effort_dict[SUMMARY.PROGRESS.value]
-            description = task_effort_dict[SUMMARY.DESCRIPTION.value]
 
             # restructure category
             all_categories = ",".join([cat
                                        for cat, tid_list in category_dict.items() for tid in tid_list
                                        if tid == task_id])
 
-            item = {
-                SUMMARY.CATEGORY_TYPE.value : label,
-                # SUMMARY.CATEGORY.value : category,
-                SUMMARY.CATEGORY.value : all_categories,
-                SUMMARY.TASK_NAME.value : task_name,
-                SUMMARY.PROGRESS.value : progress,
-                SUMMARY.DESCRIPTION.value : description
-            }
-
-            # overall duration
-            overall_duration = 0
-
-            # per-day duration
-            for day in days:
-                duration = 0
-                if day in duration_per_day_dict:
-                    duration = duration_per_day_dict[day]
-                    # if the user accidentally set an effort end time before the effort start time,
-                    # the duration will be negative
-                    if duration < 0:
-                        logger.warning(f"Negative duration for task '{task_name}': {duration} minutes")
-                        logger.warning(f"{task_effort_dict}")
-                    overall_duration += duration
-                item[day] = duration
-            item[SUMMARY.OVERALL_DURATION.value] = overall_duration
-
-            item_list.append(item)
+            if SUMMARY.TYPE_DURATIONS.value not in task_effort_dict:
+                append_item(task_effort_dict, label, all_categories, task_effort_dict[SUMMARY.DURATIONS.value],
+                            task_effort_dict.get(SUMMARY.OWN_DURATION.value))
+            elif task_id in rolled_up_task_ids:
+                # the rows of a rolled up task are appended at its first category
+                rolled_up_task_ids.remove(task_id)
+                append_type_items(task_effort_dict, {
+                    __get_category_type(cat, category_ancestor_dict, nowork_categories)
+                    for cat, tid_list in category_dict.items()
+                    if task_id in tid_list and cat != SPECIAL_CATEGORIES.RECURRING.value})
+    # e.g. rolled up tasks only in the category 'recurring'
+    for task_id in [task_id for task_id in task_dict if task_id in rolled_up_task_ids]:
+        append_type_items(task_dict[task_id], set())
 
     item_start = {
         SUMMARY.CATEGORY_TYPE.value: "",
@@ -451,7 +816,8 @@ def __build_summary_df(category_dict,
     }
 
     # duration
-    offsets_per_day_dict = __get_offsets_per_day(task_dict)
+    if offsets_per_day_dict is None:
+        offsets_per_day_dict = __get_offsets_per_day(task_dict)
     for day in days:
         item_start[day] = offsets_per_day_dict[day][SUMMARY.START_TIME.value].split()[1]
         item_stop[day] = offsets_per_day_dict[day][SUMMARY.STOP_TIME.value].split()[1]
@@ -503,107 +869,528 @@ def __build_summary_df(category_dict,
     return task_summary_df
     
 
-def __build_daily_effort_summary(task_dict):
+def __get_description(task_infos, description_length=None) -> str:
+    
+    return truncate_description(task_infos[SUMMARY.DESCRIPTION.value], description_length)
+
+
+def truncate_description(description: str, description_length=None) -> str:
+    
+    if description_length is None or len(description) <= description_length:
+        return description
+    if description_length == 0:
+        return ""
+    return description[:description_length].rstrip() + SUMMARY.TRUNCATION_MARK.value
+
+
+def __build_category_summary_df(category_dict,
+                                task_dict,
+                                category_ancestor_dict,
+                                nowork_categories=SPECIAL_CATEGORIES.NOWORK_CATEGORIES.value) -> pd.DataFrame:
+    """
+    Subtotals per category on every level of the category hierarchy.
+    
+    The efforts of a task are added once to each category the task belongs to and to all ancestors of these
+    categories (in a single pass over the tasks).
+    """
+    
+    days = sorted(list(__get_days(task_dict)))
+    
+    # task id : categories of the task, together with their ancestors
+    task_category_dict = {}
+    for category, task_id_list in category_dict.items():
+        # ignore item with category 'recurring', since it additionally lists the tasks
+        if category == SPECIAL_CATEGORIES.RECURRING.value:
+            continue
+        ancestors = category_ancestor_dict.get(category, frozenset([category]))
+        for task_id in task_id_list:
+            task_category_dict.setdefault(task_id, set()).update(ancestors)
     
-    # get all efforts per day
-    daily_efforts = {}
+    category_durations = {category: {} for category in category_dict
+                          if category != SPECIAL_CATEGORIES.RECURRING.value}
+    for task_id, categories in task_category_dict.items():
+        if task_id not in task_dict:
+            continue
+        duration_per_day_dict = task_dict[task_id][SUMMARY.DURATIONS.value]
+        for category in categories:
+            subtotal_dict = category_durations.setdefault(category, {})
+            for day, duration in duration_per_day_dict.items():
+                subtotal_dict[day] = subtotal_dict.get(day, 0) + duration
+    
+    item_list = []
+    for category, subtotal_dict in sorted(category_durations.items(), key=lambda x: x[0].split("->")):
+        item = {
+            SUMMARY.CATEGORY_TYPE.value: __get_category_type(category, category_ancestor_dict, nowork_categories),
+            SUMMARY.CATEGORY.value: category,
+            SUMMARY.CATEGORY_LEVEL.value: len(category_ancestor_dict.get(category, [category])) - 1,
+        }
+        for day in days:
+            item[day] = subtotal_dict.get(day, 0)
+        item[SUMMARY.OVERALL_DURATION.value] = sum(subtotal_dict.values())
+        item_list.append(item)
+    
+    return pd.DataFrame(item_list, columns=[SUMMARY.CATEGORY_TYPE.value, SUMMARY.CATEGORY.value,
+                                            SUMMARY.CATEGORY_LEVEL.value] + days + [SUMMARY.OVERALL_DURATION.value])
+
+
+def __build_daily_effort_summary(task_dict, jobs=1, daily_metrics=None, short_effort_minutes=SHORT_EFFORT_MINUTES):
+    
+    # get all efforts split into the days they span, as compact records per day (task index, begin and end second
+    # from the day begin)
+    task_names = []
+    task_indices = []
+    start_vals = []
+    stop_vals = []
     for task_id, task_infos in task_dict.items():
         task_efforts = task_infos[SUMMARY.EFFORTS.value]
         if not task_efforts:
             continue
-        for day, efforts in task_efforts.items():
-            daily_efforts.setdefault(day, [])
-            for effort_begin, effort_end in efforts.items():
-                daily_efforts[day].append({
-                    DAILY_EFFORTS.BEGIN.value : effort_begin,
-                    DAILY_EFFORTS.END.value : effort_end,
-                    DAILY_EFFORTS.TASK.value: task_infos
-                })
-    
-    # get the tracked and untracked durations for each day in chronological order
-    daily_effort_tracks = {}
-    for day, effort_dict_list in daily_efforts.items():
-        effort_dict_list = sorted(sorted(effort_dict_list, key=lambda x: x[DAILY_EFFORTS.END.value]),
-                                        key=lambda x: x[DAILY_EFFORTS.BEGIN.value])
+        task_idx = len(task_names)
+        task_names.append(task_infos[SUMMARY.TASK_NAME.value])
+        for efforts in task_efforts.values():
+            task_indices.extend([task_idx] * len(efforts))
+            start_vals.extend(efforts.keys())
+            stop_vals.extend(efforts.values())
+    effort_indices, days, begin_offsets, end_offsets = split_efforts_by_day(to_seconds(start_vals),
+                                                                            to_seconds(stop_vals))
+    daily_effort_records = __get_effort_records_per_day(np.array(task_indices, dtype=np.int64)[effort_indices], days,
+                                                        begin_offsets, end_offsets)
+    
+    # get the tracked and untracked durations for each day, in parallel for chunks of days
+    days = sorted(daily_effort_records)
+    daily_track_records = __build_track_records_of_days(days, [daily_effort_records[day] for day in days], jobs)
+    
+    # get a list of dataframes in chronological order
+    daily_effort_tracks_df_dict = {}
+    for day, track_records in zip(days, daily_track_records):
+        daily_effort_tracks_df_dict[day] = __get_day_effort_tracks_df(day, track_records, task_names)
+        if daily_metrics is not None:
+            daily_metrics.append(__get_day_metrics(day, track_records, short_effort_minutes))
+    
+    return daily_effort_tracks_df_dict
+
+
+def __get_effort_records_per_day(task_indices: np.ndarray, days: np.ndarray, begin_offsets: np.ndarray,
+                                 end_offsets: np.ndarray) -> Dict[str, array]:
+    """
+    :param task_indices: task index per effort piece
+    :param days: day per effort piece (see task_days.split_efforts_by_day)
+    :return: {day: SPILL_RECORD_LENGTH integers per effort piece of the day: task index, begin and end second from
+        the day begin}, the pieces of a day in the given order
+    """
+    
+    order = np.argsort(days, kind="stable")
+    day_values, day_begins = np.unique(days[order], return_index=True)
+    day_ends = np.append(day_begins[1:], len(order))
+    records = np.column_stack([task_indices, begin_offsets, end_offsets])[order] \
+        .astype(f"i{array(SPILL_RECORD_TYPECODE).itemsize}")
+    
+    return {day: array(SPILL_RECORD_TYPECODE, records[begin:end].tobytes())
+            for day, begin, end in zip(get_day_names(day_values).tolist(), day_begins.tolist(), day_ends.tolist())}
+
+
+def __build_track_records_of_days(days: List[str], effort_records_list: List[array], jobs=1) -> List[array]:
+    """
+    Build the track records of the given days; with more than one job, chunks of days are handed to a process pool.
+    The results are returned in the order of the days.
+    """
+    
+    if jobs <= 1 or len(days) <= 1:
+        return [__build_day_track_records(effort_records) for effort_records in effort_records_list]
+    
+    chunk_size = max(1, -(-len(days) // (jobs * DAYS_CHUNKS_PER_JOB)))
+    chunks = [effort_records_list[idx:idx + chunk_size] for idx in range(0, len(days), chunk_size)]
+    logger.debug(f"BUILDING timelines of {len(days)} days in {len(chunks)} chunks with {jobs} processes")
+    
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # the results of map are in the order of the chunks
+        return [track_records
+                for chunk_track_records in executor.map(__build_track_records_of_chunk, chunks)
+                for track_records in chunk_track_records]
+
+
+def __build_track_records_of_chunk(effort_records_list: List[array]) -> List[array]:
+    return [__build_day_track_records(effort_records) for effort_records in effort_records_list]
+
+
+def __build_day_track_records(effort_records: array) -> array:
+    """
+    Get the tracked and untracked durations of a day in chronological order.
+    
+    :param effort_records: SPILL_RECORD_LENGTH integers per effort: task index, start and stop second from the day begin
+    :return: TRACK_RECORD_LENGTH integers per track: begin and end second from the day begin, duration in minutes,
+        track type (TRACK_TYPES index), task index (-1 if not tracked)
+    """
+    
+    efforts = sorted((tuple(effort_records[idx:idx + SPILL_RECORD_LENGTH])
+                      for idx in range(0, len(effort_records), SPILL_RECORD_LENGTH)),
+                     key=lambda effort: (effort[1], effort[2]))
+    
+    track_records = array(SPILL_RECORD_TYPECODE)
+    tracked_end = 0  # start with the day
+    for task_idx, effort_begin, effort_end in efforts:
         
-        effort_tracks = []
-        tracked_end = day + FORMAT.SPACE.value + DAY.BEGIN.value  # start with the day
-        for idx, effort_dict in enumerate(effort_dict_list):
-            effort_begin = effort_dict[DAILY_EFFORTS.BEGIN.value]
-            effort_end = effort_dict[DAILY_EFFORTS.END.value]
-            effort_task_dict = effort_dict[DAILY_EFFORTS.TASK.value]
-            task_name = effort_task_dict[SUMMARY.TASK_NAME.value]
-            
-            if __is_later(tracked_end, effort_begin):
-                # take the duration from effort_begin to time_end as clash time
-                duration = __get_effort_duration(effort_begin, tracked_end)
-                track_begin = effort_begin.split()[1]
-                track_end = tracked_end.split()[1]
-                if duration > 0:
-                    effort_tracks.append( [day, track_begin, track_end, duration, "TIME-CLASH", task_name] )
-                    logger.warning(f"! On {day}, {duration} minutes are tracked multiple times "
-                                   f"({track_begin}-{track_end}) for task '{task_name}'.")
-                effort_begin = tracked_end
+        if tracked_end > effort_begin:
+            # the part of the effort which is already tracked is clash time (an effort can lie entirely inside,
+            # e.g. in the whole-day piece of an effort over several days)
+            clash_end = min(effort_end, tracked_end)
+            duration = __get_offset_duration(effort_begin, clash_end)
+            if duration > 0:
+                track_records.extend([effort_begin, clash_end, duration, TRACK_TIME_CLASH, task_idx])
+            effort_begin = clash_end
+        
+        if effort_begin > tracked_end:
+            # this duration is not tracked
+            duration = __get_offset_duration(tracked_end, effort_begin)
+            if duration > 0:
+                track_records.extend([tracked_end, effort_begin, duration, TRACK_NOT_TRACKED, -1])
+                tracked_end = effort_begin
+        
+        # normal case: the current effort begins with the end of the previous one; only the part after the tracked
+        # time is tracked (an effort with negative duration is not part of the timeline)
+        if effort_end > tracked_end and effort_end >= effort_begin:
+            duration = __get_offset_duration(effort_begin, effort_end)
+            track_records.extend([effort_begin, effort_end, duration, TRACK_TRACKED, task_idx])
+            tracked_end = max(tracked_end, effort_end)
+    
+    # take the efforts upto the end of the day
+    day_end = DAY_SECONDS - 1
+    if day_end > tracked_end:
+        duration = __get_offset_duration(tracked_end, day_end)
+        track_records.extend([tracked_end, day_end, duration, TRACK_NOT_TRACKED, -1])
+    
+    return track_records
+
+
+def __get_offset_duration(begin_offset: int, end_offset: int) -> int:
+    # the efforts are split into days, i.e. the offsets are within the day (upto DAY_SECONDS, the next midnight)
+    return (end_offset - begin_offset) // 60
+
+
+def __get_day_effort_tracks_df(day: str, track_records: array, task_names: List[str]) -> pd.DataFrame:
+    
+    effort_tracks = []
+    for idx in range(0, len(track_records), TRACK_RECORD_LENGTH):
+        begin_offset, end_offset, duration, track_type, task_idx = track_records[idx:idx + TRACK_RECORD_LENGTH]
+        track_begin = format_offset(begin_offset)
+        track_end = format_offset(end_offset)
+        task_name = task_names[task_idx] if task_idx >= 0 else ""
+        if track_type == TRACK_TIME_CLASH:
+            logger.warning(f"! On {day}, {duration} minutes are tracked multiple times "
+                           f"({track_begin}-{track_end}) for task '{task_name}'.")
+        effort_tracks.append([day, track_begin, track_end, duration, TRACK_TYPES[track_type], task_name])
+    
+    return pd.DataFrame(effort_tracks, columns=DAILY_EFFORT_COLUMNS)
+
+
+def __get_day_metrics(day: str, track_records: array, short_effort_minutes: int) -> List:
+    """
+    Get the focus metrics of a day (DAILY_METRICS_COLUMNS) from its track records in chronological order, vectorized
+    over the tracked durations.
+    """
+    
+    tracks = np.frombuffer(track_records, dtype=f"i{track_records.itemsize}").reshape(-1, TRACK_RECORD_LENGTH)
+    tracked = tracks[tracks[:, 3] == TRACK_TRACKED]
+    if not len(tracked):
+        return [day, 0, 0, 0, 0., 0., 0, 0.]
+    
+    minutes = tracked[:, 2]
+    task_indices = tracked[:, 4]
+    task_switches = task_indices[1:] != task_indices[:-1]
+    # a block begins with another task or after a gap (a time clash ends where the next effort begins)
+    block_begins = np.concatenate([[True], task_switches | (tracked[1:, 0] != tracked[:-1, 1])])
+    block_minutes = np.bincount(np.cumsum(block_begins) - 1, weights=minutes)
+    tracked_minutes = int(minutes.sum())
+    short_minutes = int(minutes[minutes < short_effort_minutes].sum())
+    
+    return [day, tracked_minutes, int(np.count_nonzero(task_switches)), len(block_minutes),
+            round(float(block_minutes.mean()), 2), round(float(np.median(block_minutes)), 2),
+            int(block_minutes.max()), round(100. * short_minutes / tracked_minutes, 2) if tracked_minutes else 0.]
+
+
+def __stream_and_spill_efforts(input_fn: str, spill_dir: str, memory_cap_bytes: int,
+                               description_length: Union[int, None] = None, depth: Union[int, None] = None):
+    """
+    Read the categories, tasks and efforts in one streaming pass (without building a doctree).
+    
+    The efforts are split into the days they span in batches of EFFORT_BATCH_SIZE efforts, and partitioned per day
+    into compact buffers of SPILL_RECORD_LENGTH integers per effort piece; as soon as the buffers exceed the memory
+    cap, they are spilled (appended) to one binary file per day in the spill directory.
+    Only the per-day durations of the tasks, the per-day start and stop times and the (truncated) descriptions of the
+    reported tasks (with effort, or up to the given depth of the task hierarchy) are kept in memory.
+    """
+    
+    category_dict = {}
+    category_parent_dict = {}
+    category_stack = []  # subjects of the currently open categories
+    task_dict = {}
+    task_ids = []  # task index : task id
+    task_stack = []  # indices of the currently open tasks
+    day_offsets = {}  # day : first begin and last end second
+    effort_buffers = {}  # day : array of effort records
+    buffered_bytes = 0
+    effort_batch = []  # (task index, start, stop) of the efforts not yet split into days
+    tasks_with_effort = set()  # task indices
+    multi_day_efforts = 0
+    
+    for event, element in ET.iterparse(input_fn, events=("start", "end")):
+        if event == "start":
+            if element.tag == FORMAT.TASK.value:
+                task_progress = SUMMARY.PROGRESS_WIP.value
+                if element.get(FORMAT.PERCENTAGE_COMPLETE.value) == FORMAT.DONE_VALUE.value:
+                    task_progress = SUMMARY.PROGRESS_DONE.value
+                task_dict[element.get(FORMAT.ID.value)] = {SUMMARY.PROGRESS.value: task_progress,
+                                                           SUMMARY.TASK_NAME.value: element.get(FORMAT.SUBJECT.value),
+                                                           SUMMARY.EFFORTS.value: {},  # not used out-of-core
+                                                           SUMMARY.DURATIONS.value: {},  # day : minutes
+                                                           SUMMARY.DESCRIPTION.value: "",
+                                                           SUMMARY.PARENT.value: task_ids[task_stack[-1]]
+                                                           if task_stack else None,
+                                                           SUMMARY.TASK_LEVEL.value: len(task_stack)}
+                task_stack.append(len(task_ids))
+                task_ids.append(element.get(FORMAT.ID.value))
+            elif element.tag == FORMAT.CATEGORY.value:
+                cat_name = "->".join(category_stack + [element.get(FORMAT.SUBJECT.value)])
+                categorizables = element.get(FORMAT.CATEGORIZABLES.value)
+                category_dict[cat_name] = categorizables.strip().split(" ") if categorizables is not None else []
+                category_parent_dict[cat_name] = "->".join(category_stack) if category_stack else None
+                category_stack.append(element.get(FORMAT.SUBJECT.value))
+            continue
+        
+        if element.tag == FORMAT.TASK.value:
+            task_idx = task_stack.pop()
+            task_infos = task_dict[task_ids[task_idx]]
+            # the description of a task without effort won't be reported (except for the rolled-up tasks)
+            if task_idx not in tasks_with_effort and (depth is None or len(task_stack) > depth):
+                task_infos[SUMMARY.DESCRIPTION.value] = ""
+        elif element.tag == FORMAT.DESCRIPTION.value and task_stack and description_length != 0:
+            task_infos = task_dict[task_ids[task_stack[-1]]]
+            task_infos[SUMMARY.DESCRIPTION.value] = truncate_description((element.text or "").strip(),
+                                                                         description_length)
+        elif element.tag == FORMAT.CATEGORY.value:
+            category_stack.pop()
+        elif element.tag == FORMAT.EFFORT.value:
+            start_val = element.get(FORMAT.START.value)
+            stop_val = element.get(FORMAT.STOP.value)
+            if start_val is None:
+                raise TaskFormatError(f"An effort does not have a start time.")
+            if stop_val is None:
+                raise TaskFormatError(f"An effort does not have a stop time. "
+                                      f"Make sure you are not currently running the time tracker. ")
+            tasks_with_effort.add(task_stack[-1])
+            effort_batch.append((task_stack[-1], start_val, stop_val))
             
-            if __is_later(effort_begin, tracked_end):
-                # this duration is not tracked
-                duration = __get_effort_duration(tracked_end, effort_begin)
-                if duration > 0:
-                    track_begin = tracked_end.split()[1]
-                    track_end = effort_begin.split()[1]
-                    if duration > 0:
-                        effort_tracks.append( [day, track_begin, track_end, duration, "<not tracked>", ""] )
-                    tracked_end = effort_begin
+            if len(effort_batch) >= EFFORT_BATCH_SIZE:
+                batch_bytes, batch_multi_day_efforts = __add_effort_batch(effort_batch, task_dict, task_ids,
+                                                                          day_offsets, effort_buffers)
+                buffered_bytes += batch_bytes
+                multi_day_efforts += batch_multi_day_efforts
             
-            # normal case: the current effort begins with the end of the previous one
-            duration = __get_effort_duration(effort_begin, effort_end)
-            track_begin = effort_begin.split()[1]
-            track_end = effort_end.split()[1]
-            effort_tracks.append( [day, track_begin, track_end, duration, "", task_name] )
-            tracked_end = effort_end
+            if buffered_bytes > memory_cap_bytes:
+                logger.debug(f"SPILLING {buffered_bytes} bytes of efforts to '{spill_dir}'")
+                __spill_effort_buffers(effort_buffers, spill_dir)
+                buffered_bytes = 0
+        
+        # the elements are not needed any more
+        element.clear()
+    
+    if effort_batch:
+        multi_day_efforts += __add_effort_batch(effort_batch, task_dict, task_ids, day_offsets, effort_buffers)[1]
+    __log_multi_day_efforts(multi_day_efforts)
+    offsets_per_day_dict = __format_offsets_per_day(day_offsets)
+    
+    return category_dict, category_parent_dict, task_dict, task_ids, offsets_per_day_dict, effort_buffers
+
+
+def __add_effort_batch(effort_batch, task_dict, task_ids, day_offsets, effort_buffers) -> Tuple[int, int]:
+    """
+    Split a batch of streamed efforts into the days they span, and add them to the durations of the tasks, to the
+    offsets per day and to the effort buffers per day. The batch is emptied.
+    
+    :param effort_batch: [(task index, start, stop)]
+    :return: buffered bytes, amount of efforts over midnight
+    """
+    
+    task_indices, start_vals, stop_vals = zip(*effort_batch)
+    effort_batch.clear()
+    effort_indices, days, begin_offsets, end_offsets = split_efforts_by_day(to_seconds(start_vals),
+                                                                            to_seconds(stop_vals))
+    piece_task_indices = np.array(task_indices, dtype=np.int64)[effort_indices]
+    
+    for task_idx, day, minutes in __sum_minutes_per_task_and_day(piece_task_indices, days, begin_offsets,
+                                                                 end_offsets):
+        durations = task_dict[task_ids[task_idx]][SUMMARY.DURATIONS.value]
+        durations[day] = durations.get(day, 0) + minutes
+    
+    __get_day_offsets(days, begin_offsets, end_offsets, day_offsets)
+    
+    buffered_bytes = 0
+    for day, records in __get_effort_records_per_day(piece_task_indices, days, begin_offsets, end_offsets).items():
+        effort_buffers.setdefault(day, array(SPILL_RECORD_TYPECODE)).extend(records)
+        buffered_bytes += records.itemsize * len(records)
+    
+    return buffered_bytes, __count_multi_day_efforts(effort_indices)
+
+
+def __spill_effort_buffers(effort_buffers, spill_dir):
+    for day, effort_buffer in effort_buffers.items():
+        with open(os.path.join(spill_dir, day + SPILL_EXTENSION), "ab") as f:
+            effort_buffer.tofile(f)
+    effort_buffers.clear()
+
+
+def __iter_spilled_daily_effort_summary(days, task_dict, task_ids, effort_buffers, spill_dir,
+                                        daily_metrics=None, short_effort_minutes=SHORT_EFFORT_MINUTES):
+    """
+    Build the daily timelines one day partition at a time: the spilled and the still buffered efforts of a day are
+    loaded, and only the dataframe of the current day is in memory. The metrics of each day are appended to the
+    given daily metrics while iterating.
+    """
+    
+    task_names = [task_dict[task_id][SUMMARY.TASK_NAME.value] for task_id in task_ids]
+    for day in days:
+        records = array(SPILL_RECORD_TYPECODE)
+        spill_fn = os.path.join(spill_dir, day + SPILL_EXTENSION)
+        if os.path.exists(spill_fn):
+            with open(spill_fn, "rb") as f:
+                records.fromfile(f, os.path.getsize(spill_fn) // records.itemsize)
+        records.extend(effort_buffers.get(day, []))
         
-        # take the efforts upto the end of the day
-        day_end = day + FORMAT.SPACE.value + DAY.END.value
-        if __is_later(day_end, tracked_end):
-            duration = __get_effort_duration(tracked_end, day_end)
-            track_begin = tracked_end.split()[1]
-            track_end = day_end.split()[1]
-            effort_tracks.append( [day, track_begin, track_end, duration, "<not tracked>", ""] )
+        # like in the doctree based summary, an effort of a task with the same start time is taken only once
+        effort_dict = {}
+        for idx in range(0, len(records), SPILL_RECORD_LENGTH):
+            task_idx, start_offset, stop_offset = records[idx:idx + SPILL_RECORD_LENGTH]
+            effort_dict[(task_idx, start_offset)] = stop_offset
+        effort_records = array(SPILL_RECORD_TYPECODE, [value
+                                                       for (task_idx, start_offset), stop_offset in effort_dict.items()
+                                                       for value in (task_idx, start_offset, stop_offset)])
         
-        daily_effort_tracks[day] = effort_tracks
+        track_records = __build_day_track_records(effort_records)
+        if daily_metrics is not None:
+            daily_metrics.append(__get_day_metrics(day, track_records, short_effort_minutes))
+        yield day, __get_day_effort_tracks_df(day, track_records, task_names)
+
+
+def write_outputs(task_summary_df, category_summary_df, daily_effort_summary_dfs, output_sinks,
+                  daily_metrics=None) -> None:
+    """
+    :param daily_effort_summary_dfs: (day, dataframe) pairs in chronological order, e.g. also a generator
+    :param output_sinks: sinks (see OUTPUT_SINKS) or output file names; all sinks are fed from the same tables, and
+        the daily timelines are passed to all sinks one day at a time
+    :param daily_metrics: if given, the rows of the daily metrics table, written after the daily timelines (they can
+        be collected while the daily timelines are generated)
+    """
     
-    # get a list of dataframes
-    daily_effort_tracks_df_dict = {}
-    for day, daily_efforts in daily_effort_tracks.items():
-        df = pd.DataFrame(daily_efforts, columns =['Day', 'Begin', 'End', 'Duration (min)', 'Warnings', 'Task name'])
-        daily_effort_tracks_df_dict[day] = df
+    output_sinks = [OUTPUT_SINKS[os.path.splitext(sink)[1]](sink) if isinstance(sink, str) else sink
+                    for sink in output_sinks]
+    for sink in output_sinks:
+        sink.write_tables(task_summary_df, category_summary_df)
+    for day, df in daily_effort_summary_dfs:
+        for sink in output_sinks:
+            sink.write_day(day, df)
+    if daily_metrics is not None:
+        daily_metrics_df = pd.DataFrame(daily_metrics, columns=DAILY_METRICS_COLUMNS)
+        for sink in output_sinks:
+            sink.write_metrics(daily_metrics_df)
+    for sink in output_sinks:
+        sink.close()
+
+
+class CsvSummarySink:
+    """All tables one after another (separated by an empty line) in a .csv file."""
     
-    return daily_effort_tracks_df_dict
+    def __init__(self, output_fn: str):
+        self.output_fn = output_fn
+        self._f = None
+    
+    def write_tables(self, task_summary_df: pd.DataFrame, category_summary_df: pd.DataFrame) -> None:
+        os.makedirs(os.path.realpath(os.path.dirname(self.output_fn)), exist_ok=True)
+        self._f = open(self.output_fn, "w", encoding="utf-8")
+        task_summary_df.to_csv(self._f, index=False)
+        self.write_day(None, category_summary_df)
+    
+    def write_day(self, day: Union[str, None], df: pd.DataFrame) -> None:
+        self._f.write(FORMAT.NL.value)
+        df.to_csv(self._f, index=False)
+    
+    def write_metrics(self, daily_metrics_df: pd.DataFrame) -> None:
+        self.write_day(None, daily_metrics_df)
+    
+    def close(self) -> None:
+        self._f.close()
 
 
-def __write_summary(overview_df: pd.DataFrame, output_fn: str, mode="w") -> None:
+class XlsxSummarySink:
+    """The summary tables and the timeline of each day in separate sheets of a .xlsx file."""
     
-    path_name = os.path.realpath(os.path.dirname(output_fn))
-    os.makedirs(path_name, exist_ok=True)
+    def __init__(self, output_fn: str):
+        self.output_fn = output_fn
+        self._writer = None
     
-    if mode=="a":
-        with open(output_fn, mode, encoding="utf-8") as f:
-            f.write(FORMAT.NL.value)
+    def write_tables(self, task_summary_df: pd.DataFrame, category_summary_df: pd.DataFrame) -> None:
+        self._writer = pd.ExcelWriter(self.output_fn, engine='xlsxwriter')  # python -m pip install XlsxWriter
+        task_summary_df.to_excel(self._writer, sheet_name="SUMMARY", index=False)
+        category_summary_df.to_excel(self._writer, sheet_name="CATEGORIES", index=False)
     
-    with open(output_fn, mode, encoding="utf-8") as f:
-        overview_df.to_csv(f, index=False)
+    def write_day(self, day: str, df: pd.DataFrame) -> None:
+        df.to_excel(self._writer, sheet_name=day, index=False)
     
+    def write_metrics(self, daily_metrics_df: pd.DataFrame) -> None:
+        daily_metrics_df.to_excel(self._writer, sheet_name="METRICS", index=False)
+    
+    def close(self) -> None:
+        self._writer.close()
+
 
-def __write_multi_sheet_summary(task_summary_df, daily_effort_summary_df_dict, output_fn):
+class ParquetSummarySink:
+    """
+    The per-task summary in a .parquet file, the per-category summary, the timelines of all days and the daily metrics
+    in further .parquet files ('<output>_categories.parquet', '<output>_timelines.parquet', '<output>_metrics.parquet').
+    NOTE that the columns with mixed values (e.g. start times and durations in a day column) are written as strings.
+    """
     
-    writer = pd.ExcelWriter(output_fn, engine='xlsxwriter')  # python -m pip install XlsxWriter
+    def __init__(self, output_fn: str):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("The parquet output needs pyarrow: python -m pip install pyarrow") from e
+        self._pyarrow = pyarrow
+        self.output_fn = output_fn
+        self._timelines_fn = os.path.splitext(output_fn)[0] + "_timelines" + IO.PARQUET_EXTENSION.value
+        self._timelines_writer = None
     
-    task_summary_df.to_excel(writer, sheet_name="SUMMARY", index=False)
+    def write_tables(self, task_summary_df: pd.DataFrame, category_summary_df: pd.DataFrame) -> None:
+        os.makedirs(os.path.realpath(os.path.dirname(self.output_fn)), exist_ok=True)
+        self._to_strings(task_summary_df).to_parquet(self.output_fn, index=False)
+        self._to_strings(category_summary_df).to_parquet(
+            os.path.splitext(self.output_fn)[0] + "_categories" + IO.PARQUET_EXTENSION.value, index=False)
     
-    for day, df in sorted(daily_effort_summary_df_dict.items()):
+    def write_day(self, day: str, df: pd.DataFrame) -> None:
+        # the timelines of all days are written as row groups of one file
+        table = self._pyarrow.Table.from_pandas(self._to_strings(df), preserve_index=False)
+        if self._timelines_writer is None:
+            self._timelines_writer = self._pyarrow.parquet.ParquetWriter(self._timelines_fn, table.schema)
+        self._timelines_writer.write_table(table.cast(self._timelines_writer.schema))
+    
+    def write_metrics(self, daily_metrics_df: pd.DataFrame) -> None:
+        daily_metrics_df.to_parquet(os.path.splitext(self.output_fn)[0] + "_metrics" + IO.PARQUET_EXTENSION.value,
+                                    index=False)
+    
+    def close(self) -> None:
+        if self._timelines_writer is not None:
+            self._timelines_writer.close()
+    
+    @staticmethod
+    def _to_strings(df: pd.DataFrame) -> pd.DataFrame:
+        object_columns = [column for column in df.columns if df[column].dtype == object]
+        return df.astype({column: str for column in object_columns})
+
+
+# output extension : summary sink; a sink has the methods write_tables, write_day (in chronological order),
+# write_metrics and close
+OUTPUT_SINKS = {IO.CSV_EXTENSION.value: CsvSummarySink,
+                IO.XLSX_EXTENSION.value: XlsxSummarySink,
+                IO.PARQUET_EXTENSION.value: ParquetSummarySink}
+
 
-        df.to_excel(writer, sheet_name=day, index=False)
-        workbook = writer.book
-        worksheet = writer.sheets[day]
-        
-    writer.save()
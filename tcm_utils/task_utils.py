@@ -5,15 +5,48 @@ Constants and util functions
 """
 
 __author__ = "emm"
-__version__ = "20200607"
+__version__ = "20261019"  # "20200607"
 
 
 from enum import Enum
 import re
 
+class TaskFileError(Exception):
+    """Base class of the errors on task-files, raised instead of quitting the process."""
+
+
+class FileExtensionError(TaskFileError, ValueError):
+    """The given file name has not the expected file extension."""
+
+
+class TaskFormatError(TaskFileError, ValueError):
+    """The task-file has not the assumed format."""
+
+
+class NoEffortError(TaskFileError):
+    """There is no effort tracked in the task-file."""
+
+
 class IO(Enum):
     CSV_EXTENSION = ".csv"
     XLSX_EXTENSION = ".xlsx"
+    PARQUET_EXTENSION = ".parquet"  # only for summaries, needs pyarrow
+
+class CLEANER_ENGINE(Enum):
+    LINES = "lines"  # line-based: each tag is assumed to be on one line
+    EVENTS = "events"  # xml event-based: streaming with bounded memory, any tag layout
+    RANGES = "ranges"  # byte-range based: unchanged byte ranges are copied from the input file, any tag layout
+
+
+class HEATMAP_RESOLUTION(Enum):
+    HOUR = "hour"
+    MINUTE = "minute"
+
+
+class PERIOD(Enum):
+    WEEK = "week"  # ISO week, e.g. 2020-W03
+    MONTH = "month"  # e.g. 2020-01
+
 
 class FORMAT(Enum):
     # NOTE that a task is formulated in a task tag. It can be an empty or a filled element, it can also embed another
@@ -45,6 +78,10 @@ class FORMAT(Enum):
     EFFORT = "effort"
     START = "start"
     STOP = "stop"
+    DESCRIPTION = "description"
+    DATETIME = "%Y-%m-%d %H:%M:%S"  # e.g. start="2020-05-29 11:44:10"
+    MODIFICATION_DATETIME = "modificationDateTime"
+    EXPANDED_CONTEXTS = "expandedContexts"
     
     ATTVAL_PATTERN = re.compile('(?P<attribute>[^=]+)="(?P<value>[^"]+)"')
     GROUP_ATTRIBUTE = "attribute"
@@ -56,6 +93,7 @@ class SUMMARY(Enum):
     
     TASK_NAME = "Task name"
     DESCRIPTION = "Description"
+    TRUNCATION_MARK = "..."
     CATEGORY = "Category"
     PROGRESS = "Progress"
     PROGRESS_WIP = "wip"
@@ -65,7 +103,16 @@ class SUMMARY(Enum):
     DURATIONS = "Durations"
     OVERALL_DURATION = "Period duration (min)"
     
+    PARENT = "Parent"  # id of the parent task, None for top-level tasks
+    TASK_LEVEL = "Task level"  # 0: top-level task
+    TASK_PATH = "Task path"  # subjects of the task and its parent tasks, e.g. 'project->subtask'
+    INCLUSIVE_DURATIONS = "Inclusive durations"  # day : minutes of the task and all its subtasks
+    OWN_DURATION = "Own duration (min)"  # period duration without the subtasks
+    TYPE_DURATIONS = "Type durations"  # category type : day : minutes of the task and its subtasks of this type
+    TYPE_CATEGORIES = "Type categories"  # category type : categories of the task and its subtasks of this type
+    
     CATEGORY_TYPE = "Type"
+    CATEGORY_LEVEL = "Level"
     WORK = "WORK"
     NO_WORK = "NO-WORK"
     
@@ -86,6 +133,13 @@ class DAILY_EFFORTS(Enum):
     TASK = "task"
 
 
+class CHECK(Enum):
+    # exit codes of the check modus (e.g. for pre-commit hooks)
+    OK = 0
+    WARNING = 1
+    ERROR = 2
+
+
 class DAY(Enum):
     BEGIN = "00:00:00"
     END = "23:59:59"
@@ -0,0 +1,46 @@
+from tcm_utils import task_checker
+from tcm_utils.task_utils import CHECK
+
+TASK_FILE = """<?xml version="1.0" encoding="utf-8"?>
+<?taskcoach release="1.4.6" tskversion="37"?>
+<tasks>
+<task id="t1" status="1" subject="Task 1">
+{efforts_1}
+</task>
+<task id="t2" status="1" subject="Task 2">
+{efforts_2}
+</task>
+<category categorizables="t1 t2" id="c1" status="1" subject="Work" />
+</tasks>
+"""
+
+
+def effort(start_val, stop_val):
+    return f'<effort id="{start_val}" start="{start_val}" status="1" stop="{stop_val}" />'
+
+
+def check(tmp_path, efforts_1, efforts_2=()):
+    task_fn = tmp_path / "tasks.tsk"
+    task_fn.write_text(TASK_FILE.format(efforts_1="\n".join(effort(*e) for e in efforts_1),
+                                        efforts_2="\n".join(effort(*e) for e in efforts_2)), encoding="utf-8")
+    return task_checker.__collect_issues(str(task_fn))
+
+
+def test_no_issues(tmp_path):
+    assert check(tmp_path, [("2020-01-13 09:00:00", "2020-01-13 10:00:00")],
+                 [("2020-01-13 10:00:00", "2020-01-13 11:00:00")]) == []
+
+
+def test_overlap_after_midnight(tmp_path):
+    issues = check(tmp_path, [("2020-01-13 22:00:00", "2020-01-14 02:00:00")],
+                   [("2020-01-14 01:00:00", "2020-01-14 03:00:00")])
+    assert issues == [
+        (CHECK.WARNING, "Effort done over multiple days for task 'Task 1' (2020-01-13 22:00:00 -> 2020-01-14 02:00:00)."),
+        (CHECK.WARNING, "On 2020-01-14, 60 minutes are tracked multiple times (01:00:00-02:00:00) "
+                        "for tasks 'Task 1' and 'Task 2'."),
+    ]
+
+
+def test_overlap_under_one_minute_is_discarded(tmp_path):
+    assert check(tmp_path, [("2020-01-13 09:00:00", "2020-01-13 10:00:30")],
+                 [("2020-01-13 10:00:00", "2020-01-13 11:00:00")]) == []
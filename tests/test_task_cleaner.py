@@ -0,0 +1,126 @@
+import re
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from tcm_utils import task_cleaner
+from tcm_utils.task_utils import CLEANER_ENGINE
+
+# layout of TaskCoach: one tag per line, no indentation
+TASK_FILE = """<?xml version="1.0" encoding="utf-8"?>
+<?taskcoach release="1.4.6" tskversion="37"?>
+
+<tasks>
+<!-- exported for the tests -->
+<task id="t1" status="1" subject="Project">
+<task actualstartdate="2020-01-13 09:00:00" completiondate="2020-01-14 10:00:00" id="t2" percentageComplete="100" status="1" subject="Done subtask">
+<task completiondate="2020-01-14 10:00:00" id="t3" percentageComplete="100" status="1" subject="Done subsubtask">
+<effort id="e1" start="2020-01-13 09:00:00" status="1" stop="2020-01-13 09:30:00" />
+</task>
+<effort id="e2" start="2020-01-13 10:00:00" status="1" stop="2020-01-13 10:15:00" />
+</task>
+<task actualstartdate="2020-01-13 11:00:00" id="t4" status="1" subject="Open subtask">
+<description>
+Open &amp; indented
+description
+</description>
+<?tcm keep?>
+<effort id="e3" start="2020-01-13 11:00:00" status="1" stop="2020-01-13 12:00:00" />
+</task>
+</task>
+<task actualstartdate="2020-01-13 13:00:00" completiondate="2020-01-13 14:00:00" id="t5" percentageComplete="100" status="1" subject="Weekly report">
+<effort id="e4" start="2020-01-13 13:00:00" status="1" stop="2020-01-13 14:00:00" />
+</task>
+<task completiondate="2020-01-15 10:00:00" id="t6" percentageComplete="100" status="1" subject="Done project">
+<task id="t7" status="1" subject="Subtask of the done project">
+<effort id="e5" start="2020-01-14 09:00:00" status="1" stop="2020-01-14 09:45:00" />
+</task>
+</task>
+<task id="t8" status="1" subject="Empty task" />
+<category categorizables="t5" id="c1" status="1" subject="recurring" />
+<guid>
+0001
+</guid>
+</tasks>
+"""
+
+
+def to_multi_line_tags(content):
+    # the attributes of the task and effort tags on separate lines
+    return re.sub(r'(<(?:task|effort) [^>]*?) (status=)', r"\1\n    \2", content)
+
+
+def to_indented(content):
+    return "\n".join("  " + line if line.startswith(("<task", "<effort", "</task", "<description", "<?tcm"))
+                     else line for line in content.split("\n"))
+
+
+def clean(tmp_path, content, engine):
+    input_fn = tmp_path / f"tasks_{engine}.tsk"
+    input_fn.write_text(content, encoding="utf-8")
+    output_fn = tmp_path / f"tasks_{engine}_cleaned.tsk"
+    archive_fn = tmp_path / f"tasks_{engine}_archived.tsk"
+    task_cleaner.clean_tasks(str(input_fn), str(output_fn), archive=True, archive_task_xml_fn=str(archive_fn),
+                             engine=engine)
+    return output_fn.read_bytes(), archive_fn.read_bytes()
+
+
+def test_events_engine_equals_line_engine(tmp_path):
+    assert clean(tmp_path, TASK_FILE, CLEANER_ENGINE.EVENTS.value) == \
+        clean(tmp_path, TASK_FILE, CLEANER_ENGINE.LINES.value)
+
+
+def test_events_engine_handles_multi_line_tags(tmp_path):
+    assert to_multi_line_tags(TASK_FILE) != TASK_FILE
+    expected = clean(tmp_path, TASK_FILE, CLEANER_ENGINE.LINES.value)
+    assert clean(tmp_path, to_multi_line_tags(TASK_FILE), CLEANER_ENGINE.EVENTS.value) == expected
+    assert clean(tmp_path, to_indented(to_multi_line_tags(TASK_FILE)), CLEANER_ENGINE.EVENTS.value) == expected
+    # the line-based engine assumes each tag on a separate line
+    with pytest.raises(task_cleaner.TaskFormatError):
+        clean(tmp_path, to_multi_line_tags(TASK_FILE), CLEANER_ENGINE.LINES.value)
+
+
+def join_whitespace(content):
+    return b" ".join(content.split())
+
+
+def test_ranges_engine_equals_line_engine(tmp_path):
+    expected = clean(tmp_path, TASK_FILE, CLEANER_ENGINE.LINES.value)
+    assert clean(tmp_path, TASK_FILE, CLEANER_ENGINE.RANGES.value) == expected
+
+
+def test_ranges_engine_keeps_the_layout(tmp_path):
+    expected_cleaned, expected_archive = clean(tmp_path, TASK_FILE, CLEANER_ENGINE.LINES.value)
+    cleaned, archive = clean(tmp_path, to_multi_line_tags(TASK_FILE), CLEANER_ENGINE.RANGES.value)
+    # the task tags are rewritten, the archived tags are copied
+    assert cleaned == expected_cleaned
+    assert join_whitespace(archive) == join_whitespace(expected_archive) and archive != expected_archive
+    
+    cleaned, archive = clean(tmp_path, to_indented(to_multi_line_tags(TASK_FILE)), CLEANER_ENGINE.RANGES.value)
+    assert b'\n  <task id="t1" status="1" subject="Project" >\n' in cleaned
+    assert b"\n".join(line.strip() for line in cleaned.split(b"\n")) == expected_cleaned
+    assert join_whitespace(archive) == join_whitespace(expected_archive)
+
+
+@pytest.mark.parametrize("engine", [engine.value for engine in CLEANER_ENGINE])
+def test_archive_is_valid_task_file(tmp_path, engine):
+    cleaned, archive = clean(tmp_path, TASK_FILE, engine)
+    cleaned_root, archive_root = ET.fromstring(cleaned), ET.fromstring(archive)
+    
+    assert not cleaned_root.findall(".//effort")
+    assert [task.get("id") for task in cleaned_root.iter("task")] == ["t1", "t4", "t5", "t8"]
+    # the removed tasks and efforts are archived within their (not cleaned) parent tasks
+    assert [effort.get("id") for effort in archive_root.iter("effort")] == ["e1", "e2", "e3", "e4", "e5"]
+    assert [task.get("id") for task in archive_root.iter("task")] == ["t1", "t2", "t3", "t4", "t5", "t6", "t7"]
+    assert [effort.get("id") for effort in archive_root.find("task/task[@id='t4']")] == ["e3"]
+    assert archive_root.find("task[@id='t5']").get("percentageComplete") == "100"
+    assert archive_root.find("category").get("subject") == "recurring"
+    assert archive_root.find("guid").text.strip() == "0001"
+
+
+def test_default_archive_fn(tmp_path):
+    input_fn = tmp_path / "tasks.tsk"
+    input_fn.write_text(TASK_FILE, encoding="utf-8")
+    task_cleaner.clean_tasks(str(input_fn), None, archive=True)
+    assert (tmp_path / "tasks_cleaned.tsk").exists()
+    assert ET.parse(tmp_path / "tasks_archived.tsk").getroot().find("task/task[@id='t2']") is not None
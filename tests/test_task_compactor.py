@@ -0,0 +1,72 @@
+import xml.dom.minidom as mdom
+
+from tcm_utils import task_compactor, task_summary
+from tcm_utils.task_utils import SUMMARY
+
+TASK_FILE = """<?xml version="1.0" encoding="utf-8"?>
+<?taskcoach release="1.4.6" tskversion="37"?>
+<tasks>
+<task id="t1" status="1" subject="Task 1">
+{efforts_1}
+</task>
+<task id="t2" status="1" subject="Task 2">
+{efforts_2}
+</task>
+<task id="t3" status="1" subject="Task 3">
+{efforts_3}
+</task>
+<category categorizables="t1 t2 t3" id="c1" status="1" subject="Work" />
+</tasks>
+"""
+
+
+def effort(start_val, stop_val):
+    return f'<effort id="{start_val}" start="{start_val}" status="1" stop="{stop_val}" />'
+
+
+def compact(tmp_path, *task_efforts):
+    input_fn = tmp_path / "tasks.tsk"
+    input_fn.write_text(TASK_FILE.format(**{f"efforts_{i + 1}": "\n".join(effort(*e) for e in efforts)
+                                            for i, efforts in enumerate(task_efforts)}), encoding="utf-8")
+    output_fn = tmp_path / "tasks_compacted.tsk"
+    task_compactor.compact_tasks(str(input_fn), str(output_fn), "2030-01-01")
+    return get_task_dict(input_fn), get_task_dict(output_fn)
+
+
+def get_task_dict(task_fn):
+    _, _, task_dict = task_summary.get_categories_and_tasks(mdom.parse(str(task_fn)))
+    return task_dict
+
+
+def get_timeline(task_dict, day):
+    timeline_df = task_summary.build_daily_timelines(task_dict)[day]
+    return [tuple(row) for row in timeline_df[["Begin", "End", "Warnings"]].values.tolist()]
+
+
+def count_efforts(task_dict, task_id):
+    return sum(len(efforts) for efforts in task_dict[task_id][SUMMARY.EFFORTS.value].values())
+
+
+def test_compaction_keeps_totals_without_clashes(tmp_path):
+    task_dict, compacted_task_dict = compact(
+        tmp_path,
+        [("2020-01-13 09:00:00", "2020-01-13 09:30:00"), ("2020-01-13 10:00:00", "2020-01-13 10:30:00")],
+        [("2020-01-13 10:40:00", "2020-01-13 11:00:00"), ("2020-01-13 23:00:00", "2020-01-14 01:00:00")],
+        [("2020-01-13 11:00:00", "2020-01-13 11:20:00"), ("2020-01-13 11:30:00", "2020-01-13 11:50:30"),
+         ("2020-01-13 12:00:00", "2020-01-13 12:30:00")])
+
+    for task_id in ["t1", "t2", "t3"]:
+        assert compacted_task_dict[task_id][SUMMARY.DURATIONS.value] == task_dict[task_id][SUMMARY.DURATIONS.value]
+    assert [count_efforts(compacted_task_dict, task_id) for task_id in ["t1", "t2", "t3"]] == [1, 2, 1]
+    timeline = get_timeline(compacted_task_dict, "2020-01-13")
+    assert "TIME-CLASH" not in [warning for _, _, warning in timeline]
+    # the synthetic efforts are laid out in the free time, the start and the stop of the day are kept
+    assert [(begin, end) for begin, end, warning in timeline if warning == ""] == \
+        [("09:00:00", "10:00:00"), ("10:40:00", "11:00:00"), ("11:00:00", "12:10:00"), ("23:00:00", "23:59:59")]
+
+
+def test_efforts_without_free_time_are_kept(tmp_path):
+    efforts_1 = [("2020-01-13 09:00:00", "2020-01-13 09:30:00"), ("2020-01-13 10:00:00", "2020-01-13 10:30:00")]
+    task_dict, compacted_task_dict = compact(tmp_path, efforts_1, [("2020-01-13 09:40:00", "2020-01-13 09:50:00")], [])
+
+    assert compacted_task_dict["t1"][SUMMARY.EFFORTS.value] == task_dict["t1"][SUMMARY.EFFORTS.value]
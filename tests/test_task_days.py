@@ -0,0 +1,48 @@
+import numpy as np
+
+from tcm_utils.task_days import DAY_SECONDS, format_offset, get_day_names, split_efforts_by_day, to_seconds
+
+
+def split(start_vals, stop_vals):
+    effort_indices, days, begin_offsets, end_offsets = split_efforts_by_day(to_seconds(start_vals),
+                                                                            to_seconds(stop_vals))
+    return list(zip(effort_indices.tolist(), get_day_names(days).tolist(), begin_offsets.tolist(),
+                    end_offsets.tolist()))
+
+
+def test_effort_within_a_day():
+    assert split(["2020-01-13 09:00:00"], ["2020-01-13 09:30:15"]) == [(0, "2020-01-13", 32400, 34215)]
+
+
+def test_effort_over_midnight():
+    assert split(["2020-01-13 23:00:00"], ["2020-01-14 01:00:00"]) == [(0, "2020-01-13", 82800, DAY_SECONDS),
+                                                                       (0, "2020-01-14", 0, 3600)]
+
+
+def test_effort_ending_at_midnight():
+    assert split(["2020-01-13 23:30:00"], ["2020-01-14 00:00:00"]) == [(0, "2020-01-13", 84600, DAY_SECONDS)]
+
+
+def test_week_long_timer():
+    pieces = split(["2020-01-13 22:00:00", "2020-01-13 10:00:00"], ["2020-01-20 09:30:00", "2020-01-13 11:00:00"])
+    assert [piece[1] for piece in pieces[:8]] == [f"2020-01-{day}" for day in range(13, 21)]
+    assert pieces[0] == (0, "2020-01-13", 79200, DAY_SECONDS)
+    assert all(piece[2:] == (0, DAY_SECONDS) for piece in pieces[1:7])
+    assert pieces[7] == (0, "2020-01-20", 0, 34200)
+    assert pieces[8] == (1, "2020-01-13", 36000, 39600)
+    assert sum(end - begin for _, _, begin, end in pieces[:8]) == 6 * DAY_SECONDS + 2 * 3600 + 34200
+
+
+def test_negative_effort_is_not_split():
+    assert split(["2020-01-14 01:00:00"], ["2020-01-13 23:00:00"]) == [(0, "2020-01-14", 3600, -3600)]
+
+
+def test_no_efforts():
+    assert split([], []) == []
+
+
+def test_format_offset():
+    assert format_offset(0) == "00:00:00"
+    assert format_offset(3661) == "01:01:01"
+    assert format_offset(DAY_SECONDS) == "23:59:59"
+    assert np.array_equal(to_seconds(["1970-01-02 00:00:00"]), [DAY_SECONDS])
@@ -0,0 +1,11 @@
+from tcm_utils import task_diff
+
+
+def test_effort_minutes_are_counted_per_day():
+    assert task_diff.__get_effort_minutes(["2020-01-13 09:00:00", "2020-01-13 23:59:30", "2020-01-13 22:00:30"],
+                                          ["2020-01-13 09:30:59", "2020-01-14 00:00:30", "2020-01-15 01:00:00"]) == \
+        [30, 0, 119 + 1440 + 60]
+
+
+def test_no_effort_minutes():
+    assert task_diff.__get_effort_minutes([], []) == []
@@ -0,0 +1,89 @@
+import io
+from pathlib import Path
+import subprocess
+import sys
+
+import pytest
+
+from tcm_utils import task_diff, task_summary
+from tcm_utils.task_file import TaskFile
+from tcm_utils.task_utils import FORMAT, NoEffortError, TaskFormatError
+
+TASK_FILE = """<?xml version="1.0" encoding="utf-8"?>
+<?taskcoach release="1.4.6" tskversion="37"?>
+<tasks>
+<task id="t1" status="1" subject="Task 1">
+{efforts}
+</task>
+<task completiondate="2020-01-13 12:00:00" id="t2" percentageComplete="100" status="1" subject="Done task">
+<effort id="e2" start="2020-01-13 11:00:00" status="1" stop="2020-01-13 11:30:00" />
+</task>
+<category categorizables="t1 t2" id="c1" status="1" subject="Work" />
+</tasks>
+"""
+EFFORT = '<effort id="e1" start="2020-01-13 09:00:00" status="1" stop="2020-01-13 10:00:00" />'
+MANAGER_FN = str(Path(__file__).parents[1] / "taskcoach_manager.py")
+
+
+def test_task_file_sources(tmp_path):
+    content = TASK_FILE.format(efforts=EFFORT)
+    task_fn = tmp_path / "tasks.tsk"
+    task_fn.write_text(content, encoding="utf-8")
+    
+    task_files = [TaskFile(str(task_fn)), TaskFile(task_fn), TaskFile(content.encode("utf-8")),
+                  TaskFile(io.BytesIO(content.encode("utf-8"))), TaskFile(io.StringIO(content))]
+    for task_file in task_files:
+        assert task_file.content == content.encode("utf-8")
+        assert task_file.categories == {"Work": ["t1", "t2"]}
+        assert task_file.efforts == [{FORMAT.TASK.value: "t1", FORMAT.START.value: "2020-01-13 09:00:00",
+                                      FORMAT.STOP.value: "2020-01-13 10:00:00"},
+                                     {FORMAT.TASK.value: "t2", FORMAT.START.value: "2020-01-13 11:00:00",
+                                      FORMAT.STOP.value: "2020-01-13 11:30:00"}]
+        assert task_file.summary_table.equals(task_files[0].summary_table)
+
+
+def test_task_file_results_equal_the_cli_outputs(tmp_path):
+    content = TASK_FILE.format(efforts=EFFORT)
+    task_fn = tmp_path / "tasks.tsk"
+    task_fn.write_text(content, encoding="utf-8")
+    task_file = TaskFile(task_fn)
+    
+    # the results are computed once
+    assert task_file.summary_table is task_file.summary_table
+    category_dict, category_parent_dict, task_dict = task_summary.get_categories_and_tasks(task_file.doctree)
+    assert task_file.summary_table.equals(task_summary.build_summary_tables(category_dict, category_parent_dict,
+                                                                            task_dict)[0])
+    assert list(task_file.daily_timelines) == ["2020-01-13"]
+    assert task_file.daily_metrics["Tracked (min)"].tolist() == [90]
+    
+    subprocess.run([sys.executable, MANAGER_FN, "-c", str(task_fn), "-o", str(tmp_path / "cleaned.tsk"),
+                    "-a", str(tmp_path / "archived.tsk")], check=True, capture_output=True)
+    assert task_file.cleaned == (tmp_path / "cleaned.tsk").read_text(encoding="utf-8")
+    assert task_file.archived == (tmp_path / "archived.tsk").read_text(encoding="utf-8")
+
+
+def test_task_file_errors(tmp_path):
+    # the errors are raised on access, not on construction
+    broken_task_file = TaskFile(b"<tasks><task></tasks>")
+    with pytest.raises(TaskFormatError):
+        broken_task_file.tasks
+    with pytest.raises(NoEffortError):
+        TaskFile(TASK_FILE.format(efforts="").replace(
+            '<effort id="e2" start="2020-01-13 11:00:00" status="1" stop="2020-01-13 11:30:00" />', "").encode(
+            "utf-8")).summary_table
+    
+    broken_fn = tmp_path / "broken.tsk"
+    broken_fn.write_bytes(b"<tasks><task></tasks>")
+    with pytest.raises(TaskFormatError):
+        task_summary.summarize_tasks(str(broken_fn), None)
+    with pytest.raises(TaskFormatError):
+        task_diff.diff_tasks(str(broken_fn), str(broken_fn), None)
+    
+    # the command line quits with an error message instead of a traceback
+    result = subprocess.run([sys.executable, MANAGER_FN, "-s", str(broken_fn)], capture_output=True, text=True)
+    assert result.returncode == 1
+    assert "NOT ASSUMED xml FORMAT" in result.stderr and "Traceback" not in result.stderr
+    result = subprocess.run([sys.executable, MANAGER_FN, "-s", str(broken_fn), "-o", str(tmp_path / "summary.txt")],
+                            capture_output=True, text=True)
+    assert result.returncode == 1
+    assert "extension" in result.stderr and "Traceback" not in result.stderr
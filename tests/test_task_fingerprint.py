@@ -0,0 +1,52 @@
+from tcm_utils import task_fingerprint
+from tcm_utils.task_fingerprint import MODIFIED, OWN, ROOT, SUBTREE
+
+TASK_FILE = """<?xml version="1.0" encoding="utf-8"?>
+<?taskcoach release="1.4.6" tskversion="37"?>
+<tasks>
+<task id="t1" modificationDateTime="{modified}" status="1" subject="Task 1">
+<effort id="e1" start="2020-01-13 09:00:00" status="1" stop="2020-01-13 10:00:00" />
+<task id="t11" status="1" subject="Subtask">
+<effort id="e2" start="2020-01-13 10:00:00" status="1" stop="{stop}" />
+</task>
+</task>
+<task id="t2" status="1" subject="Task 2">
+<effort id="e3" start="2020-01-13 11:00:00" status="1" stop="2020-01-13 11:15:00" />
+</task>
+<category categorizables="t1 t2" id="c1" status="1" subject="Work" />
+</tasks>
+"""
+
+
+def build_fingerprints(tmp_path, name, stop="2020-01-13 10:30:00", modified="2020-01-13 08:00:00"):
+    task_fn = tmp_path / name
+    task_fn.write_text(TASK_FILE.format(stop=stop, modified=modified), encoding="utf-8")
+    return task_fingerprint.build_fingerprints(str(task_fn))
+
+
+def test_fingerprints_are_stable(tmp_path):
+    fingerprints = build_fingerprints(tmp_path, "tasks.tsk")
+    assert build_fingerprints(tmp_path, "tasks.tsk") == fingerprints
+    # the modification times are ignored
+    assert build_fingerprints(tmp_path, "touched.tsk", modified="2020-01-14 08:00:00") == fingerprints
+    
+    fingerprint_fn = tmp_path / "tasks_fingerprints.json"
+    task_fingerprint.write_fingerprints(fingerprints, str(fingerprint_fn))
+    assert task_fingerprint.read_fingerprints(str(fingerprint_fn)) == fingerprints
+    assert task_fingerprint.get_changed_subtrees(fingerprints, fingerprints) == []
+
+
+def test_fingerprints_change_with_an_effort(tmp_path):
+    fingerprints = build_fingerprints(tmp_path, "tasks.tsk")
+    changed_fingerprints = build_fingerprints(tmp_path, "changed.tsk", stop="2020-01-13 10:31:00")
+    
+    assert changed_fingerprints[ROOT] != fingerprints[ROOT]
+    tasks, changed_tasks = fingerprints["task"], changed_fingerprints["task"]
+    assert changed_tasks["t11"][OWN] != tasks["t11"][OWN]
+    # the fingerprints of the ancestors change only in their subtree
+    assert changed_tasks["t1"][SUBTREE] != tasks["t1"][SUBTREE] and changed_tasks["t1"][OWN] == tasks["t1"][OWN]
+    assert changed_tasks["t2"] == tasks["t2"]
+    assert changed_fingerprints["category"] == fingerprints["category"]
+    # only the root of the changed subtree is reported
+    assert task_fingerprint.get_changed_subtrees(fingerprints, changed_fingerprints) == \
+        [["task", MODIFIED, "t11", "Subtask"]]
@@ -0,0 +1,64 @@
+from datetime import date
+import xml.dom.minidom as mdom
+
+import pytest
+
+from tcm_utils import task_heatmap, task_summary
+from tcm_utils.task_utils import HEATMAP_RESOLUTION, SUMMARY, TaskFormatError
+
+TASK_FILE = """<?xml version="1.0" encoding="utf-8"?>
+<?taskcoach release="1.4.6" tskversion="37"?>
+<tasks>
+<task id="t1" status="1" subject="Task 1">
+<effort id="e1" start="2020-01-13 09:00:00" status="1" stop="2020-01-13 10:15:00" />
+<effort id="e2" start="2020-01-19 23:00:00" status="1" stop="2020-01-20 01:30:00" />
+<effort id="e3" start="2020-01-20 09:40:00" status="1" stop="2020-01-20 10:05:00" />
+</task>
+<task id="t2" status="1" subject="Break">
+<effort id="e4" start="2020-01-14 12:00:00" status="1" stop="2020-01-14 12:45:00" />
+<effort id="e5" start="2020-01-15 22:30:00" status="1" stop="2020-01-17 00:30:00" />
+</task>
+<category categorizables="t1" id="c1" status="1" subject="Work" />
+<category categorizables="t2" id="c2" status="1" subject="Pause" />
+</tasks>
+"""
+
+
+def get_weekday_minutes(task_dict, task_ids):
+    weekday_minutes = dict.fromkeys(task_heatmap.WEEKDAYS, 0)
+    for task_id in task_ids:
+        for day, minutes in task_dict[task_id][SUMMARY.DURATIONS.value].items():
+            weekday_minutes[task_heatmap.WEEKDAYS[date.fromisoformat(day).weekday()]] += minutes
+    return weekday_minutes
+
+
+def test_heatmaps_sum_to_the_summary_totals():
+    category_dict, _, task_dict = task_summary.get_categories_and_tasks(mdom.parseString(TASK_FILE))
+    heatmap_df_dict = task_heatmap.build_heatmaps(category_dict, task_dict)
+    
+    assert sorted(heatmap_df_dict) == [task_heatmap.ALL_CATEGORIES, "Pause", "Work"]
+    for category, task_ids in [(task_heatmap.ALL_CATEGORIES, ["t1", "t2"]), ("Work", ["t1"]), ("Pause", ["t2"])]:
+        assert heatmap_df_dict[category][task_heatmap.WEEKDAYS].sum().to_dict() == \
+            get_weekday_minutes(task_dict, task_ids)
+    
+    # the efforts over midnight are split at midnight into the bins of their days
+    heatmap_df = heatmap_df_dict["Work"].set_index("Work")
+    assert heatmap_df.loc["23:00", "Sunday"] == 60 and heatmap_df.loc["00:00", "Monday"] == 60
+    assert heatmap_df.loc["01:00", "Monday"] == 30
+    assert heatmap_df.loc["09:00", "Monday"] == 60 + 20 and heatmap_df.loc["10:00", "Monday"] == 15 + 5
+    assert heatmap_df_dict["Pause"].set_index("Pause")["Thursday"].sum() == 24 * 60
+
+
+def test_heatmap_minute_resolution():
+    category_dict, _, task_dict = task_summary.get_categories_and_tasks(mdom.parseString(TASK_FILE))
+    hour_df = task_heatmap.build_heatmaps(category_dict, task_dict)[task_heatmap.ALL_CATEGORIES]
+    minute_df = task_heatmap.build_heatmaps(category_dict, task_dict, HEATMAP_RESOLUTION.MINUTE.value)[task_heatmap.ALL_CATEGORIES]
+    assert len(minute_df) == 24 * 60
+    assert minute_df[task_heatmap.WEEKDAYS].sum().to_dict() == hour_df[task_heatmap.WEEKDAYS].sum().to_dict()
+
+
+def test_heatmap_of_malformed_file(tmp_path):
+    broken_fn = tmp_path / "broken.tsk"
+    broken_fn.write_bytes(b"<tasks><task></tasks>")
+    with pytest.raises(TaskFormatError):
+        task_heatmap.heatmap_tasks(str(broken_fn), None)
@@ -0,0 +1,75 @@
+import json
+import os
+
+from tcm_utils import task_index
+from tcm_utils.task_utils import SPECIAL_CATEGORIES
+
+TASK_FILE = """<?xml version="1.0" encoding="utf-8"?>
+<?taskcoach release="1.4.6" tskversion="37"?>
+<tasks>
+{categories_before}
+<task id="t1" status="1" subject="{subject}">
+<description>Crash in the importer</description>
+<effort id="e1" start="2020-01-13 09:00:00" status="1" stop="2020-01-13 09:30:00" />
+</task>
+<task id="t2" status="1" subject="Lunch">
+<effort id="e2" start="2020-01-13 23:00:00" status="1" stop="2020-01-14 01:00:00" />
+</task>
+{categories_after}
+</tasks>
+"""
+CATEGORY = '<category categorizables="t1" id="c1" status="1" subject="Project X" />'
+
+
+def write_task_file(task_fn, subject="abc-123/fix: retry", categories_first=False):
+    task_fn.write_text(TASK_FILE.format(subject=subject, categories_before=CATEGORY if categories_first else "",
+                                        categories_after="" if categories_first else CATEGORY), encoding="utf-8")
+    return str(task_fn)
+
+
+def search(index, query):
+    return [row[:5] for row in task_index.search(index, query)]
+
+
+def test_categories_before_and_after_the_tasks(tmp_path):
+    for categories_first in [True, False]:
+        file_index = task_index.build_file_index(write_task_file(tmp_path / "tasks.tsk",
+                                                                 categories_first=categories_first))
+        assert file_index[task_index.TASKS]["t1"][task_index.CATEGORIES] == ["Project X"]
+        assert file_index[task_index.TASKS]["t2"][task_index.CATEGORIES] == [SPECIAL_CATEGORIES.MISSING.value]
+        assert "t1" in file_index[task_index.TOKENS]["project"]
+
+
+def test_search_compound_tokens(tmp_path):
+    index = {task_index.VERSION: task_index.INDEX_VERSION, task_index.FILES: {}}
+    task_index.update_index(index, [write_task_file(tmp_path / "tasks.tsk")], str(tmp_path))
+    expected_row = ["abc-123/fix: retry", "t1", ["Project X"], 30, 1]
+    assert search(index, "ABC-123") == [expected_row]
+    assert search(index, "123/fix") == [expected_row]
+    assert search(index, "abc-123/fix importer") == [expected_row]
+    assert search(index, "abc-124") == []
+    # like in the summary, the minutes are counted per day
+    assert search(index, "lunch") == [["Lunch", "t2", [SPECIAL_CATEGORIES.MISSING.value], 120, 1]]
+
+
+def test_incremental_index(tmp_path):
+    task_fns = [write_task_file(tmp_path / f"tasks_{i}.tsk") for i in range(3)]
+    index_fn = str(tmp_path / task_index.INDEX_FN)
+    task_index.index_tasks(task_fns, index_fn)
+
+    index = task_index.read_index(index_fn)
+    write_task_file(tmp_path / "tasks_1.tsk", subject="abc-456 changed subject")
+    os.remove(task_fns[2])
+    indexed_fns, removed_fns = task_index.update_index(index, task_fns[:2], str(tmp_path))
+    assert indexed_fns == ["tasks_1.tsk"]
+    assert removed_fns == ["tasks_2.tsk"]
+    assert sorted(index[task_index.FILES]) == ["tasks_0.tsk", "tasks_1.tsk"]
+    assert [row[5] for row in task_index.search(index, "abc-456")] == [["tasks_1.tsk"]]
+    assert [row[5] for row in task_index.search(index, "abc-123")] == [["tasks_0.tsk"]]
+
+
+def test_outdated_index_is_rebuilt(tmp_path):
+    index_fn = tmp_path / task_index.INDEX_FN
+    index_fn.write_text(json.dumps({task_index.VERSION: 1, task_index.FILES: {"old.tsk": {}}}), encoding="utf-8")
+    task_index.index_tasks([write_task_file(tmp_path / "tasks.tsk")], str(index_fn))
+    assert list(task_index.read_index(str(index_fn))[task_index.FILES]) == ["tasks.tsk"]
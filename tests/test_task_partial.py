@@ -0,0 +1,52 @@
+from tcm_utils import task_partial
+from tcm_utils.task_utils import SUMMARY
+
+TASK_FILE = """<?xml version="1.0" encoding="utf-8"?>
+<?taskcoach release="1.4.6" tskversion="37"?>
+<tasks>
+<task id="t1" status="1" subject="Task 1">
+{efforts}
+</task>
+<category categorizables="t1" id="c1" status="1" subject="{category}" />
+</tasks>
+"""
+
+EFFORTS = {"e1": ("2020-01-13 09:00:00", "2020-01-13 09:30:30"),
+           "e2": ("2020-01-13 10:00:00", "2020-01-13 10:20:40"),
+           "e3": ("2020-01-13 23:00:00", "2020-01-14 01:00:00")}
+
+
+def build_partial(tmp_path, effort_ids, category="Work"):
+    task_fn = tmp_path / ("_".join(effort_ids) + category + ".tsk")
+    task_fn.write_text(TASK_FILE.format(
+        efforts="\n".join(f'<effort id="{effort_id}" start="{EFFORTS[effort_id][0]}" status="1" '
+                          f'stop="{EFFORTS[effort_id][1]}" />' for effort_id in effort_ids),
+        category=category), encoding="utf-8")
+    return task_partial.build_partial(str(task_fn))
+
+
+def get_durations(partial):
+    _, _, task_dict, _ = task_partial.__to_summary_input(partial)
+    return task_dict["t1"][SUMMARY.DURATIONS.value]
+
+
+def test_merge_disjoint_partials(tmp_path):
+    merged = task_partial.merge(build_partial(tmp_path, ["e1"]), build_partial(tmp_path, ["e2", "e3"]))
+    assert merged == build_partial(tmp_path, ["e1", "e2", "e3"])
+    assert get_durations(merged) == {"2020-01-13": 30 + 20 + 60, "2020-01-14": 60}
+
+
+def test_merge_overlapping_partials(tmp_path):
+    partial = build_partial(tmp_path, ["e1", "e2"])
+    other_partial = build_partial(tmp_path, ["e2", "e3"])
+    merged = task_partial.merge(partial, other_partial)
+    assert merged[task_partial.CELLS] == task_partial.merge(other_partial, partial)[task_partial.CELLS]
+    assert merged[task_partial.CELLS] == build_partial(tmp_path, ["e1", "e2", "e3"])[task_partial.CELLS]
+    assert get_durations(merged) == {"2020-01-13": 30 + 20 + 60, "2020-01-14": 60}
+
+
+def test_merge_partials_with_changed_category(tmp_path):
+    merged = task_partial.merge(build_partial(tmp_path, ["e1"], "Work"),
+                                build_partial(tmp_path, ["e1", "e2"], "Meetings"))
+    assert sorted(merged[task_partial.CELLS]) == ["2020-01-13|t1|Meetings", "2020-01-13|t1|Work"]
+    assert get_durations(merged) == {"2020-01-13": 30 + 20}
@@ -0,0 +1,79 @@
+from datetime import date
+import os
+from pathlib import Path
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from tcm_utils import task_splitter
+
+TASK_FILE = """<?xml version="1.0" encoding="utf-8"?>
+<?taskcoach release="1.4.6" tskversion="37"?>
+<tasks>
+<task id="t1" status="1" subject="Task 1">
+{efforts_1}
+<task id="t11" status="1" subject="Subtask">
+{efforts_11}
+</task>
+</task>
+<task id="t2" status="1" subject="Task 2">
+{efforts_2}
+</task>
+<category categorizables="t1 t2" id="c1" status="1" subject="Work" />
+</tasks>
+"""
+
+# days of the ISO weeks 2020-W03 to 2020-W06
+EFFORT_DAYS = {"efforts_1": ["2020-01-13", "2020-01-20", "2020-01-27"],
+               "efforts_11": ["2020-02-03", "2020-01-14"],
+               "efforts_2": ["2020-01-28", "2020-02-04", "2020-01-21", "2020-01-15"]}
+
+
+def write_task_file(tmp_path):
+    task_fn = tmp_path / "tasks.tsk"
+    task_fn.write_text(TASK_FILE.format(**{
+        key: "\n".join(f'<effort id="{key}_{idx}" start="{day} 09:00:00" status="1" stop="{day} 10:00:00" />'
+                       for idx, day in enumerate(days)) for key, days in EFFORT_DAYS.items()}), encoding="utf-8")
+    return str(task_fn)
+
+
+def split(tmp_path, output_dir):
+    manifest_fn = str(tmp_path / output_dir / task_splitter.MANIFEST_FN)
+    task_splitter.split_tasks(write_task_file(tmp_path), manifest_fn)
+    return manifest_fn
+
+
+def read_partitions(manifest_fn):
+    return {os.path.basename(fn): Path(fn).read_bytes() for fn in task_splitter.get_partition_fns(manifest_fn)}
+
+
+def test_partitions_are_caught_up_after_eviction(tmp_path, monkeypatch):
+    partitions = read_partitions(split(tmp_path, "all_open"))
+    assert sorted(partitions) == ["tasks_2020-W03.tsk", "tasks_2020-W04.tsk", "tasks_2020-W05.tsk",
+                                  "tasks_2020-W06.tsk"]
+    
+    monkeypatch.setattr(task_splitter, "MAX_OPEN_PARTITIONS", 1)
+    assert read_partitions(split(tmp_path, "one_open")) == partitions
+    
+    for name, content in partitions.items():
+        root = ET.fromstring(content)
+        # the whole task tree and the categories, but only the efforts of the period
+        assert [task.get("id") for task in root.iter("task")] == ["t1", "t11", "t2"]
+        assert root.find("category").get("subject") == "Work"
+        week = name[len("tasks_"):-len(".tsk")]
+        efforts = [effort.get("start").split()[0] for effort in root.iter("effort")]
+        assert efforts and all("{:04d}-W{:02d}".format(*date.fromisoformat(day).isocalendar()[:2]) == week
+                               for day in efforts)
+    assert sum(len(ET.fromstring(content).findall(".//effort")) for content in partitions.values()) == \
+        sum(len(days) for days in EFFORT_DAYS.values())
+
+
+@pytest.mark.parametrize("first_day, last_day, weeks", [(None, None, ["W03", "W04", "W05", "W06"]),
+                                                         ("2020-01-19", None, ["W03", "W04", "W05", "W06"]),
+                                                         ("2020-01-20", "2020-01-26", ["W04"]),
+                                                         ("2020-01-26", "2020-01-27", ["W04", "W05"]),
+                                                         (None, "2020-01-12", [])])
+def test_partition_fns_of_days(tmp_path, first_day, last_day, weeks):
+    manifest_fn = split(tmp_path, "partitions")
+    assert task_splitter.get_partition_fns(manifest_fn, first_day, last_day) == \
+        [str(tmp_path / "partitions" / f"tasks_2020-{week}.tsk") for week in weeks]
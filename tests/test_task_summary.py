@@ -0,0 +1,187 @@
+import logging
+import xml.dom.minidom as mdom
+
+import pytest
+
+from tcm_utils import task_summary
+from tcm_utils.task_utils import SUMMARY, NoEffortError
+
+TASK_FILE = """<?xml version="1.0" encoding="utf-8"?>
+<?taskcoach release="1.4.6" tskversion="37"?>
+<tasks>
+<task id="t1" status="1" subject="Task 1">
+{efforts_1}
+</task>
+<task id="t2" status="1" subject="Task 2">
+{efforts_2}
+</task>
+<category categorizables="t1 t2" id="c1" status="1" subject="Work" />
+</tasks>
+"""
+
+
+def effort(start_val, stop_val):
+    return f'<effort id="{start_val}" start="{start_val}" status="1" stop="{stop_val}" />'
+
+
+def get_tasks(efforts_1, efforts_2=()):
+    doctree = mdom.parseString(TASK_FILE.format(efforts_1="\n".join(effort(*e) for e in efforts_1),
+                                                efforts_2="\n".join(effort(*e) for e in efforts_2)))
+    return task_summary.get_categories_and_tasks(doctree)
+
+
+def get_timeline(task_dict, day):
+    timeline_df = task_summary.build_daily_timelines(task_dict)[day]
+    return [tuple(row) for row in timeline_df[["Begin", "End", "Duration (min)", "Warnings"]].values.tolist()]
+
+
+def test_multi_day_effort_durations():
+    _, _, task_dict = get_tasks([("2020-01-13 22:00:00", "2020-01-16 01:30:00")])
+    assert task_dict["t1"][SUMMARY.DURATIONS.value] == {"2020-01-13": 120, "2020-01-14": 1440,
+                                                         "2020-01-15": 1440, "2020-01-16": 90}
+
+
+def test_effort_ending_at_midnight_timeline():
+    _, _, task_dict = get_tasks([("2020-01-13 23:30:00", "2020-01-14 00:00:00")])
+    assert task_dict["t1"][SUMMARY.DURATIONS.value] == {"2020-01-13": 30}
+    assert get_timeline(task_dict, "2020-01-13")[-1] == ("23:30:00", "23:59:59", 30, "")
+
+
+def test_contained_effort_is_a_clash_only():
+    _, _, task_dict = get_tasks([("2020-01-13 22:00:00", "2020-01-15 02:00:00")],
+                                [("2020-01-14 08:00:00", "2020-01-14 08:20:00")])
+    assert get_timeline(task_dict, "2020-01-14") == [("00:00:00", "23:59:59", 1440, ""),
+                                                     ("08:00:00", "08:20:00", 20, "TIME-CLASH")]
+
+
+def test_overlapping_effort_is_tracked_after_the_clash():
+    _, _, task_dict = get_tasks([("2020-01-13 09:00:00", "2020-01-13 10:00:00")],
+                                [("2020-01-13 09:30:00", "2020-01-13 10:30:00")])
+    assert get_timeline(task_dict, "2020-01-13") == [("00:00:00", "09:00:00", 540, "<not tracked>"),
+                                                     ("09:00:00", "10:00:00", 60, ""),
+                                                     ("09:30:00", "10:00:00", 30, "TIME-CLASH"),
+                                                     ("10:00:00", "10:30:00", 30, ""),
+                                                     ("10:30:00", "23:59:59", 809, "<not tracked>")]
+
+
+def test_no_effort():
+    _, _, task_dict = get_tasks([])
+    with pytest.raises(NoEffortError):
+        task_summary.build_daily_timelines(task_dict)
+
+
+def get_metrics(task_dict, day):
+    daily_metrics = []
+    task_summary.build_daily_timelines(task_dict, daily_metrics=daily_metrics)
+    return dict(zip(task_summary.DAILY_METRICS_COLUMNS, next(row for row in daily_metrics if row[0] == day)))
+
+
+def test_metrics_with_contained_effort():
+    _, _, task_dict = get_tasks([("2020-01-13 09:00:00", "2020-01-13 11:00:00")],
+                                [("2020-01-13 09:30:00", "2020-01-13 09:40:00"),
+                                 ("2020-01-13 11:00:00", "2020-01-13 11:10:00")])
+    metrics = get_metrics(task_dict, "2020-01-13")
+    assert metrics["Tracked (min)"] == 130
+    assert metrics["Task switches"] == 1
+    assert metrics["Blocks"] == 2
+    assert metrics["Longest block (min)"] == 120
+    assert metrics["Short efforts (%)"] == round(100. * 10 / 130, 2)
+
+
+def test_metrics_with_multi_day_effort():
+    _, _, task_dict = get_tasks([("2020-01-13 22:00:00", "2020-01-15 02:00:00")],
+                                [("2020-01-14 08:00:00", "2020-01-14 08:20:00")])
+    metrics = get_metrics(task_dict, "2020-01-14")
+    assert metrics["Tracked (min)"] == 1440
+    assert metrics["Task switches"] == 0
+    assert metrics["Blocks"] == 1
+    assert metrics["Longest block (min)"] == 1440
+    assert get_metrics(task_dict, "2020-01-13")["Tracked (min)"] == 120
+    assert get_metrics(task_dict, "2020-01-15")["Tracked (min)"] == 120
+
+
+def test_rollup_tasks_keeps_the_task_dict():
+    doctree = mdom.parseString(TASK_FILE.format(
+        efforts_1=effort("2020-01-13 09:00:00", "2020-01-13 10:00:00") + '\n<task id="t11" status="1" subject="Sub">\n'
+                  + effort("2020-01-13 10:00:00", "2020-01-13 10:30:00") + "\n</task>",
+        efforts_2=effort("2020-01-13 11:00:00", "2020-01-13 11:15:00")))
+    _, _, task_dict = task_summary.get_categories_and_tasks(doctree)
+    task_infos_before = {task_id: dict(task_infos) for task_id, task_infos in task_dict.items()}
+
+    rolled_task_dict = task_summary.rollup_tasks(task_dict, 0)
+    assert {task_id: task_infos[SUMMARY.DURATIONS.value] for task_id, task_infos in rolled_task_dict.items()} == \
+        {"t1": {"2020-01-13": 90}, "t2": {"2020-01-13": 15}}
+    assert rolled_task_dict["t1"][SUMMARY.OWN_DURATION.value] == 60
+    assert task_dict == task_infos_before
+    assert task_summary.rollup_tasks(task_dict, 0) == rolled_task_dict
+
+
+def test_descriptions_are_plain_strings():
+    doctree = mdom.parseString(TASK_FILE.format(
+        efforts_1="<description>\n  Fix ABC-123 &amp; more  \n</description>\n"
+                  + effort("2020-01-13 09:00:00", "2020-01-13 10:00:00"),
+        efforts_2=""))
+    _, _, task_dict = task_summary.get_categories_and_tasks(doctree)
+    assert task_dict["t1"][SUMMARY.DESCRIPTION.value] == "Fix ABC-123 & more"
+    assert task_dict["t2"][SUMMARY.DESCRIPTION.value] == ""
+    assert task_summary.truncate_description(task_dict["t1"][SUMMARY.DESCRIPTION.value], 3) == "Fix..."
+
+
+def test_rollup_keeps_the_category_types():
+    doctree = mdom.parseString(TASK_FILE.format(
+        efforts_1=effort("2020-01-13 09:00:00", "2020-01-13 10:00:00")
+                  + '\n<task id="t11" status="1" subject="Break">\n'
+                  + effort("2020-01-13 10:00:00", "2020-01-13 10:30:00") + "\n</task>"
+                  + '\n<task id="t12" status="1" subject="Sub">\n'
+                  + effort("2020-01-13 10:30:00", "2020-01-13 10:45:00") + "\n</task>",
+        efforts_2=effort("2020-01-13 11:00:00", "2020-01-13 11:15:00")).replace(
+        "</tasks>", '<category categorizables="t11" id="c2" status="1" subject="Pause" />\n</tasks>').replace(
+        'categorizables="t1 t2"', 'categorizables="t1 t12 t2"'))
+    category_dict, category_parent_dict, task_dict = task_summary.get_categories_and_tasks(doctree)
+    
+    summary_df, _ = task_summary.build_summary_tables(category_dict, category_parent_dict, task_dict)
+    rolled_summary_df, _ = task_summary.build_summary_tables(category_dict, category_parent_dict, task_dict, depth=0)
+    rows = rolled_summary_df[rolled_summary_df[SUMMARY.TASK_NAME.value].isin(["Task 1", "Task 2"])]
+    assert rows[[SUMMARY.CATEGORY_TYPE.value, SUMMARY.CATEGORY.value, SUMMARY.TASK_NAME.value, "2020-01-13",
+                 SUMMARY.OWN_DURATION.value]].values.tolist() == [["WORK", "Work", "Task 1", 60 + 15, 60],
+                                                                  ["NO-WORK", "Pause", "Task 1", 30, 0],
+                                                                  ["WORK", "Work", "Task 2", 15, 15]]
+    for sum_row in ["SUMMED ALL (minutes)", "SUMMED WORK (minutes)", "SUMMED NO-WORK (minutes)"]:
+        assert rolled_summary_df[rolled_summary_df[SUMMARY.TASK_NAME.value] == sum_row]["2020-01-13"].tolist() == \
+            summary_df[summary_df[SUMMARY.TASK_NAME.value] == sum_row]["2020-01-13"].tolist()
+
+
+def test_output_formats_replace_the_output_extension(tmp_path):
+    task_fn = tmp_path / "tasks.tsk"
+    task_fn.write_text(TASK_FILE.format(efforts_1=effort("2020-01-13 09:00:00", "2020-01-13 10:00:00"), efforts_2=""),
+                       encoding="utf-8")
+    task_summary.summarize_tasks(str(task_fn), str(tmp_path / "only.xlsx"), [".csv"])
+    assert (tmp_path / "only.csv").exists() and not (tmp_path / "only.xlsx").exists()
+    task_summary.summarize_tasks(str(task_fn), str(tmp_path / "summary.csv"), ".csv")
+    assert (tmp_path / "summary.csv").read_text() == (tmp_path / "only.csv").read_text()
+
+
+@pytest.mark.parametrize("depth, description_length", [(None, None), (0, 5), (1, 0)])
+def test_out_of_core_summary_equals_in_memory_summary(tmp_path, monkeypatch, caplog, depth, description_length):
+    efforts_1 = [(f"2020-01-{day:02d} {hour:02d}:00:00", f"2020-01-{day:02d} {hour:02d}:{minutes:02d}:30")
+                 for day in range(13, 20) for hour, minutes in [(8, 45), (13, 20), (16, 5)]]
+    efforts_2 = [(f"2020-01-{day:02d} 23:10:00", f"2020-01-{day + 1:02d} 00:40:00") for day in range(13, 20, 2)]
+    task_fn = tmp_path / "tasks.tsk"
+    task_fn.write_text(TASK_FILE.format(
+        efforts_1="<description>\nDescription of task 1\n</description>\n"
+                  + "\n".join(effort(*e) for e in efforts_1[::2])
+                  + '\n<task id="t11" status="1" subject="Break">\n' + "\n".join(effort(*e) for e in efforts_1[1::2])
+                  + "\n</task>",
+        efforts_2="\n".join(effort(*e) for e in efforts_2)).replace(
+        "</tasks>", '<category categorizables="t11" id="c2" status="1" subject="Pause" />\n</tasks>'),
+        encoding="utf-8")
+    
+    task_summary.summarize_tasks(str(task_fn), str(tmp_path / "in_memory.csv"), ".csv",
+                                 description_length=description_length, depth=depth)
+    # a memory cap of some bytes and small batches: the efforts are spilled after each batch
+    monkeypatch.setattr(task_summary, "EFFORT_BATCH_SIZE", 2)
+    caplog.set_level(logging.DEBUG, logger=task_summary.logger.name)
+    task_summary.summarize_tasks(str(task_fn), str(tmp_path / "out_of_core.csv"), ".csv", memory_cap=0.0001,
+                                 description_length=description_length, depth=depth)
+    assert sum("SPILLING" in message for message in caplog.messages) > 1
+    assert (tmp_path / "out_of_core.csv").read_bytes() == (tmp_path / "in_memory.csv").read_bytes()